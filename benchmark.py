@@ -0,0 +1,149 @@
+import argparse
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from benchmarks.mockbing import MockBingServer
+
+def _get_process_tree_rss(pid):
+    '''
+        @return
+        Resident set size (in kB) of the given process and all of its descendants
+        (e.g., the webdriver processes), read from /proc.
+    '''
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join('/proc', entry, 'stat'), 'r') as stat_file_ptr:
+                # The parent pid is the 2nd field after the parenthesized command name.
+                parent_pid = int(stat_file_ptr.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent_pid, []).append(int(entry))
+
+    total_rss = 0
+    pids = [pid]
+    while pids:
+        current_pid = pids.pop()
+        pids.extend(children.get(current_pid, []))
+        try:
+            with open(os.path.join('/proc', str(current_pid), 'status'), 'r') as status_file_ptr:
+                for line in status_file_ptr:
+                    if line.startswith('VmRSS:'):
+                        total_rss += int(line.split()[1])
+        except (IOError, OSError):
+            continue
+    return total_rss
+
+class PeakMemorySampler(threading.Thread):
+    def __init__(self, interval = 0.5):
+        '''
+            @description
+            Samples the resident set size of this process and its descendants every
+            interval seconds, and keeps the peak; falls back to this process's own
+            peak (getrusage) on platforms without /proc.
+        '''
+        super(PeakMemorySampler, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.peak_rss = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        if not os.path.isdir('/proc'):
+            return
+        while not self.stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, _get_process_tree_rss(os.getpid()))
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+        if not self.peak_rss:
+            # ru_maxrss is in kB on Linux, but in bytes on macOS.
+            self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return self.peak_rss
+
+def run_benchmark(args, server):
+    # The bot modules read the Bing URL when they are imported.
+    os.environ['BING_REWARDS_BASE_URL'] = server.url
+    from bot.botconfig import ManagerConfig, PhantomJSBotConfig
+    from bot.manager import BingRewardsBotManager
+    from bot.account_manager.credentials.models import AccountCredentialsCollection
+    from bot.account_manager.credentials.simplesecurity import Password
+    from bot import profiling
+
+    email_list = ['benchmark' + str(i) + '@example.com' for i in range(0, args.accounts)]
+    creds = AccountCredentialsCollection(email_list, [Password('password') for email in email_list])
+
+    (profile_fd, profile_filename) = tempfile.mkstemp(suffix = '.jsonl')
+    os.close(profile_fd)
+    profiler = profiling.Profiler(profile_filename)
+    manager_config = ManagerConfig(args.max_workers, shared_session = args.shared_session, \
+        async_engine = args.async_engine)
+
+    sampler = PeakMemorySampler()
+    sampler.start()
+    start = time.time()
+    mgr = BingRewardsBotManager( \
+        PhantomJSBotConfig(30, 0, profiler = profiler, http_search = args.http_search, \
+            http_stats = args.http_stats), creds, \
+        PhantomJSBotConfig(20, 0, profiler = profiler, http_search = args.http_search, \
+            http_stats = args.http_stats), creds, \
+        manager_config)
+    mgr.run()
+    mgr.wait()
+    duration = time.time() - start
+    peak_rss = sampler.stop()
+    profiler.close()
+
+    server_stats = server.get_stats()
+    print(profiling.format_summary(profiling.summarize(profile_filename)))
+    os.remove(profile_filename)
+    print('')
+    print('Accounts:           ' + str(args.accounts) + ' (' + str(server_stats['completed_accounts']) + \
+        ' reached every daily maximum)')
+    print('Wall time:          %.2f s' % duration)
+    print('Throughput:         %.2f accounts/min' % (args.accounts * 60.0 / duration))
+    print('Peak RSS:           %.1f MB' % (peak_rss / 1024.0))
+    print('Requests served:    ' + str(server_stats['requests']) + ' (' + str(server_stats['failures']) + \
+        ' injected failures)')
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the Bing Rewards bots against a local ' + \
+        'mock Bing server, without any network access or real accounts.')
+    parser.add_argument('-c', '--accounts', type = int, default = 10, \
+        help = 'Number of synthetic accounts to run.')
+    parser.add_argument('-w', '--max_workers', type = int, required = False, \
+        help = 'Maximum number of bots that may run at the same time (see driver.py).')
+    parser.add_argument('-s', '--shared_session', action = 'store_true', \
+        help = 'Reuse the same browser session for each account\'s desktop and mobile searches.')
+    parser.add_argument('-a', '--async_engine', action = 'store_true', \
+        help = 'Run the bots on the asyncio engine.')
+    parser.add_argument('--http_search', action = 'store_true', \
+        help = 'Send the searches as plain HTTP requests (see driver.py).')
+    parser.add_argument('--http_stats', action = 'store_true', \
+        help = 'Read the points over HTTP (see driver.py).')
+    parser.add_argument('--min_latency', type = float, default = 0, \
+        help = 'Minimum delay (in seconds) that the mock server adds to every response.')
+    parser.add_argument('--max_latency', type = float, default = 0, \
+        help = 'Maximum delay (in seconds) that the mock server adds to every response.')
+    parser.add_argument('--failure_rate', type = float, default = 0, \
+        help = 'Fraction of requests that the mock server fails with a 500 error.')
+    parser.add_argument('--seed', type = int, required = False, \
+        help = 'Seed for the mock server\'s latency and failure injection.')
+    args = parser.parse_args()
+
+    server = MockBingServer(min_latency = args.min_latency, max_latency = args.max_latency, \
+        failure_rate = args.failure_rate, seed = args.seed).start()
+    try:
+        run_benchmark(args, server)
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import random
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+'''
+    Local imitation of the Bing pages that the bots depend on:
+    - /rewards/signin: "id_s" button -> "id_link_text" link -> loginfmt/passwd form
+    - /rewards/dashboard: desktop offers list, or mobile #status-bar/#credit-progress
+      counters (?showOffers=1 for the mobile #activities offers list)
+    - Every desktop page: "q" search form, "id_rc" points button, "bepfm" flyout
+      iframe with the #credits counters, and the "id_n"/"b_idProviders" sign-out menu
+    - /search, /offer/N, /signout, /favicon.ico
+    Points follow Bing's rules: 1 device point per 2 searches (up to a daily maximum),
+    and 1 offer point per distinct offer visited.
+'''
+_SESSION_COOKIE = 'MOCKBINGSESSION'
+_MAX_DEVICE_POINTS = {'PC': 15, 'Mobile': 10}
+_NUM_OFFERS = 3
+_INITIAL_TOTAL_POINTS = 1000
+
+class _Account:
+    def __init__(self, email):
+        self.email = email
+        self.num_searches = {'PC': 0, 'Mobile': 0}
+        self.visited_offers = set()
+
+    def get_device_points(self, device_class):
+        return min(_MAX_DEVICE_POINTS[device_class], self.num_searches[device_class] // 2)
+
+    def get_offer_points(self):
+        return len(self.visited_offers)
+
+    def get_total_points(self):
+        return _INITIAL_TOTAL_POINTS + self.get_device_points('PC') + self.get_device_points('Mobile') + \
+            self.get_offer_points()
+
+def _render(title, body):
+    return '<html><head><title>' + title + '</title></head><body>' + body + '</body></html>'
+
+class _MockBingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def _get_device_class(self):
+        user_agent = self.headers.get('User-Agent', '')
+        return 'Mobile' if ('Mobile' in user_agent or 'Android' in user_agent) else 'PC'
+
+    def _get_account(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        if _SESSION_COOKIE not in cookie:
+            return None
+        return self.mock.get_account(unquote(cookie[_SESSION_COOKIE].value))
+
+    def _send(self, status, body = '', headers = None, content_type = 'text/html; charset=utf-8'):
+        encoded_body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(encoded_body)))
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(encoded_body)
+        self.mock.record_response(len(encoded_body))
+
+    def _redirect(self, location, headers = None):
+        redirect_headers = {'Location': self.mock.url + location}
+        redirect_headers.update(headers or {})
+        self._send(302, '', redirect_headers)
+
+    def _render_desktop_header(self, account):
+        return ''.join([
+            '<form action="/search" method="get"><input type="text" name="q" /></form>',
+            '<a id="id_rc" href="javascript:void(0)">', str(account.get_total_points()), '</a>',
+            '<a id="id_n" href="javascript:void(0)" onclick="document.getElementById(\'b_idProviders\')',
+            '.style.display = \'block\';">', account.email.split('@')[0], '</a>',
+            '<ul id="b_idProviders" style="display: none"><li><a href="/signout">',
+            '<span>MS</span><span>Sign out</span></a></li></ul>',
+            '<iframe id="bepfm" src="/rewards/flyout"></iframe>'
+        ])
+
+    def _render_page(self, account, title, body):
+        if account and self._get_device_class() == 'PC':
+            body = self._render_desktop_header(account) + body
+        elif account:
+            body = '<form action="/search" method="get"><input type="text" name="q" /></form>' + body
+        return _render(title, body)
+
+    def _render_flyout(self, account):
+        device_points = '/'.join([str(account.get_device_points('PC')), str(_MAX_DEVICE_POINTS['PC'])])
+        offer_points = '/'.join([str(account.get_offer_points()), str(_NUM_OFFERS)])
+        return _render('Flyout', '<div id="credits"><div>Today</div><div>' + \
+            '<span><span>' + offer_points + '</span></span>' + \
+            '<span><span>' + device_points + '</span></span></div></div>')
+
+    def _render_offer_links(self):
+        return ''.join(['<a href="/offer/' + str(i) + '">Offer ' + str(i) + '</a>' \
+            for i in range(0, _NUM_OFFERS)])
+
+    def _render_dashboard(self, account, show_offers):
+        if self._get_device_class() == 'PC':
+            return self._render_page(account, 'Dashboard', '<div id="dashboard_wrapper"><div><div><ul>' + \
+                ''.join(['<li><a href="/offer/' + str(i) + '">Offer ' + str(i) + '</a></li>' \
+                    for i in range(0, _NUM_OFFERS)]) + '</ul></div></div></div>')
+
+        if show_offers:
+            # The mobile page lists 3 unrelated links after the offers.
+            extra_links = ''.join(['<a href="/more/' + str(i) + '">More</a>' for i in range(0, 3)])
+            return self._render_page(account, 'Offers', '<div id="activities"><div>Activities</div>' + \
+                '<div><div>' + self._render_offer_links() + extra_links + '</div></div></div>')
+
+        return self._render_page(account, 'Dashboard', ''.join([
+            '<div id="status-bar"><span>', str(account.get_total_points()), '</span></div>',
+            '<div id="credit-progress"><div>Today</div><div>Offers</div>',
+            '<div><span>', str(account.get_offer_points()), '</span><span>/', str(_NUM_OFFERS), '</span></div>',
+            '<div>Searches</div>',
+            '<div><span>', str(account.get_device_points('Mobile')), '</span><span>/', \
+                str(_MAX_DEVICE_POINTS['Mobile']), '</span></div>',
+            '</div>'
+        ]))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.mock.record_request()
+        self.mock.inject_latency()
+        if self.mock.should_fail():
+            self._send(500, _render('Error', 'Injected failure'))
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        account = self._get_account()
+
+        if url.path == '/favicon.ico':
+            self._send(200, '', content_type = 'image/x-icon')
+        elif url.path == '/rewards/signin':
+            if 'providers' in query:
+                self._send(200, _render('Sign in', '<a class="id_link_text" href="/login">Microsoft account</a>'))
+            else:
+                self._send(200, _render('Rewards', '<a id="id_s" href="/rewards/signin?providers=1">Sign in</a>'))
+        elif url.path == '/login':
+            self._send(200, _render('Login', '<form action="/login/submit" method="get">' + \
+                '<input type="email" name="loginfmt" /><input type="password" name="passwd" /></form>'))
+        elif url.path == '/login/submit':
+            email = query.get('loginfmt', [''])[0]
+            self.mock.get_account(email)
+            self._redirect('/rewards/dashboard', \
+                {'Set-Cookie': _SESSION_COOKIE + '=' + quote(email) + '; Path=/'})
+        elif url.path == '/signout':
+            self._redirect('/', {'Set-Cookie': _SESSION_COOKIE + '=; Path=/; Max-Age=0'})
+        elif not account and url.path.startswith('/rewards/'):
+            self._redirect('/rewards/signin')
+        elif url.path == '/rewards/dashboard':
+            self._send(200, self._render_dashboard(account, 'showOffers' in query))
+        elif url.path == '/rewards/flyout':
+            self._send(200, self._render_flyout(account))
+        elif url.path == '/search':
+            if account:
+                self.mock.record_search(account, self._get_device_class())
+            self._send(200, self._render_page(account, 'Results', '<ol><li>Result</li></ol>'))
+        elif url.path.startswith('/offer/'):
+            if account:
+                self.mock.record_offer(account, url.path)
+            self._send(200, self._render_page(account, 'Offer', 'Offer'))
+        else:
+            self._send(200, self._render_page(account, 'Bing', ''))
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class MockBingServer:
+    def __init__(self, port = 0, min_latency = 0, max_latency = 0, failure_rate = 0, seed = None):
+        '''
+            @description
+            Local HTTP server that imitates the Bing pages which the bots depend on,
+            so that the bots can be benchmarked without hitting live Bing.
+            Point the bots at it by setting the BING_REWARDS_BASE_URL environment
+            variable to its url before importing the bot modules.
+
+            @param port
+            (Optional) Port to listen on; by default, any free port.
+
+            @param min_latency, max_latency
+            (Optional) Bounds (in seconds) of the random delay added to every response.
+
+            @param failure_rate
+            (Optional) Fraction (between 0 and 1) of requests that fail with a 500 error.
+
+            @param seed
+            (Optional) Seed for the latency and failure injection.
+        '''
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+
+        # Guards the accounts and counters below.
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.num_requests = 0
+        self.num_failures = 0
+        self.num_bytes_sent = 0
+
+        self.server = _ThreadingHTTPServer(('127.0.0.1', port), _MockBingRequestHandler)
+        self.server.mock = self
+        self.url = 'http://127.0.0.1:' + str(self.server.server_address[1])
+        self.thread = None
+
+    def get_account(self, email):
+        with self.lock:
+            if email not in self.accounts:
+                self.accounts[email] = _Account(email)
+            return self.accounts[email]
+
+    def record_request(self):
+        with self.lock:
+            self.num_requests += 1
+
+    def record_response(self, num_bytes):
+        with self.lock:
+            self.num_bytes_sent += num_bytes
+
+    def record_search(self, account, device_class):
+        with self.lock:
+            account.num_searches[device_class] += 1
+
+    def record_offer(self, account, offer_path):
+        with self.lock:
+            account.visited_offers.add(offer_path)
+
+    def inject_latency(self):
+        with self.lock:
+            latency = self.rng.uniform(self.min_latency, self.max_latency)
+        if latency > 0:
+            time.sleep(latency)
+
+    def should_fail(self):
+        with self.lock:
+            failed = self.rng.random() < self.failure_rate
+            if failed:
+                self.num_failures += 1
+        return failed
+
+    def get_stats(self):
+        '''
+            @return
+            A dictionary with the server's request, failure and byte counters, along
+            with the number of accounts that have reached every daily maximum.
+        '''
+        with self.lock:
+            num_completed_accounts = len([account for account in self.accounts.values() \
+                if account.get_device_points('PC') == _MAX_DEVICE_POINTS['PC'] and \
+                    account.get_device_points('Mobile') == _MAX_DEVICE_POINTS['Mobile'] and \
+                    account.get_offer_points() == _NUM_OFFERS])
+            return {
+                'requests': self.num_requests,
+                'failures': self.num_failures,
+                'bytes_sent': self.num_bytes_sent,
+                'accounts': len(self.accounts),
+                'completed_accounts': num_completed_accounts
+            }
+
+    def start(self):
+        self.thread = threading.Thread(target = self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
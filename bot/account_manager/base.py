@@ -1,13 +1,73 @@
+import os
+import time
+
+import requests
+
 from browser_automation_utils.browser import AttributeType
 
 # Constants
-SIGN_IN_URL = 'https://www.bing.com/rewards/signin'
-DASHBOARD_URL = 'https://www.bing.com/rewards/dashboard'
+# Root of every Bing URL that the bots visit; can be pointed at a mock server
+# (see benchmarks/mockbing.py) with the BING_REWARDS_BASE_URL environment variable.
+BING_URL = os.environ.get('BING_REWARDS_BASE_URL', 'https://www.bing.com')
+SIGN_IN_URL = BING_URL + '/rewards/signin'
+DASHBOARD_URL = BING_URL + '/rewards/dashboard'
+# Small page on the Bing domain; opened before restoring cookies, since cookies
+# can only be added for the domain of the page that is currently open.
+COOKIE_DOMAIN_URL = BING_URL + '/favicon.ico'
+# Number of seconds after which the check of a saved session (see restore_session)
+# is abandoned
+_SESSION_CHECK_TIMEOUT_SECONDS = 10
+
+def parse_points(text, default = -1):
+    '''
+        @return
+            The number of points in the given scraped text (e.g., " 15 " -> 15),
+            or default if the text is missing or is not a number.
+    '''
+    try:
+        return int(text.strip().strip('/'))
+    except (AttributeError, ValueError):
+        return default
+
+def parse_point_ratio(text):
+    '''
+        @return
+            [current, maximum] for the given scraped "current/maximum" text
+            (e.g., "15/30" -> [15, 30]); unreadable values are -1.
+    '''
+    tokens = text.split('/') if text else []
+    if len(tokens) != 2:
+        return [-1, -1]
+    return [parse_points(tokens[0]), parse_points(tokens[1])]
 
 class AbstractAccountManager:
-    def __init__(self, browser = None, account_creds = None):
+    def __init__(self, browser = None, account_creds = None, profiler = None, max_concurrent_offers = 4):
+        '''
+            @param browser
+                Browser that is used to access the account.
+
+            @param account_creds
+                AccountCredentials of the account.
+
+            @param profiler
+                (Optional) profiling.Profiler to record stats scrapes with.
+
+            @param max_concurrent_offers
+                (Optional) Maximum number of special offer links that are visited at
+                the same time (see accumulate_special_offer_points).
+        '''
         self.browser = browser
         self.account_creds = account_creds
+        self.profiler = profiler
+        self.max_concurrent_offers = max_concurrent_offers
+        # Optional HTTP client (see httpsearch.HttpSearchClient), synced with the
+        # browser's session; if set, the point counters are fetched and the special
+        # offers are visited over HTTP.
+        self.http_client = None
+        # Special offer links that have already been visited successfully
+        self.visited_offer_links = set()
+        # Snapshot of the account's point counters; see get_stats.
+        self._stats = None
 
     # Abstract Methods
     def get_device_class(self):
@@ -16,22 +76,96 @@ class AbstractAccountManager:
     def get_special_offer_links(self):
         raise NotImplementedError()
 
+    def _scrape_stats(self):
+        '''
+            @description
+                Read all of the account's point counters in one go.
+
+            @return
+                A dictionary with the following key-value pairs:
+                - 'total_points': The total # of points in the account (0 if unreadable)
+                - 'daily_device_points': [current, maximum] device points for today
+                - 'daily_offer_points': [current, maximum] offer points for today
+                Unreadable daily values are -1.
+        '''
+        raise NotImplementedError()
+
+    def _fetch_stats(self):
+        '''
+            @description
+                Read all of the account's point counters by fetching and parsing the
+                pages that display them over self.http_client, without the browser.
+
+            @return
+                The same dictionary as _scrape_stats, or None if the counters could
+                not be read this way.
+        '''
+        return None
+
     def accumulate_special_offer_points(self):
-        special_offers = self.get_special_offer_links()
-        base_url = self.browser.get_current_url()
-        for link in special_offers:
-            self.browser.open(link)
-        if self.browser.get_current_url() != base_url:
-            self.browser.open(base_url)
+        '''
+            @description
+                Visit every special offer link that has not been visited successfully
+                yet, up to max_concurrent_offers at a time: as parallel HTTP requests if
+                there is an HTTP client, or in browser tabs otherwise.
+        '''
+        special_offers = [link for link in self.get_special_offer_links() if link not in self.visited_offer_links]
+        if self.http_client:
+            visited_links = self.http_client.get_pages(special_offers, self.max_concurrent_offers)
+        else:
+            visited_links = self.browser.open_in_tabs(special_offers, self.max_concurrent_offers)
+        self.visited_offer_links.update(visited_links)
+        self.invalidate_stats()
+
+    def get_stats(self):
+        '''
+            @return
+                The account's point counters (see _scrape_stats). They are only
+                read the first time that they are needed after the last call to
+                invalidate_stats; every other call returns the cached snapshot.
+                If there is an HTTP client, they are fetched with it, and only scraped
+                from the browser if that fails.
+        '''
+        if self._stats is None and self.http_client:
+            start = time.time()
+            self._stats = self._fetch_stats()
+            if self.profiler:
+                self.profiler.record('stats_fetch', start, time.time() - start, \
+                    'ok' if self._stats else 'error', email = self.account_creds.email, \
+                    device_class = self.get_device_class())
+        if self._stats is None:
+            start = time.time()
+            self._stats = self._scrape_stats()
+            if self.profiler:
+                self.profiler.record('stats_scrape', start, time.time() - start, \
+                    email = self.account_creds.email, device_class = self.get_device_class())
+        return self._stats
+
+    def get_cached_stats(self):
+        '''
+            @return
+                The last point counters that have been read (see get_stats), without
+                reading them again; None if they have not been read since the last
+                call to invalidate_stats.
+        '''
+        return self._stats
+
+    def invalidate_stats(self):
+        '''
+            @description
+                Discard the cached point counters; call after any action that can
+                change the number of points (searches, offers), or to force a re-read.
+        '''
+        self._stats = None
 
     def get_total_num_points(self):
-        raise NotImplementedError()
+        return self.get_stats()['total_points']
 
     def get_daily_device_points(self):
-        raise NotImplementedError()
+        return self.get_stats()['daily_device_points']
 
     def get_daily_offer_points(self):
-        raise NotImplementedError()
+        return self.get_stats()['daily_offer_points']
 
     def _load_login_form(self):
         '''
@@ -69,25 +203,106 @@ class AbstractAccountManager:
         )
         return (not self.browser.contains_element(AttributeType.Id, 'idTd_Tile_ErrorMsg_Login'))
 
+    def is_session_signed_in(self, cookies):
+        '''
+            @description
+                Check whether the given cookies still hold a signed-in session, with a
+                single request for the dashboard (without following redirects, or
+                reading the page); signed-out users are redirected away from it.
+
+            @param cookies
+                List of cookie dictionaries (as returned by Browser.get_cookies).
+
+            @return
+                True if the cookies are signed in to the account, False otherwise.
+        '''
+        cookie_jar = requests.cookies.RequestsCookieJar()
+        for cookie in cookies:
+            cookie_jar.set(cookie['name'], cookie['value'], domain = cookie.get('domain', ''), \
+                path = cookie.get('path', '/'))
+        try:
+            response = requests.get(DASHBOARD_URL, cookies = cookie_jar, allow_redirects = False, stream = True, \
+                headers = {'User-Agent': self.browser.get_user_agent()}, timeout = _SESSION_CHECK_TIMEOUT_SECONDS)
+        except requests.RequestException:
+            return False
+        response.close()
+        return response.status_code == 200
+
+    def restore_session(self, cookies):
+        '''
+            @description
+                Sign in to the account by restoring the cookies of an earlier session,
+                instead of going through the login form. The cookies are checked first
+                (see is_session_signed_in), and only handed to the browser if they
+                are still signed in.
+
+            @param cookies
+                List of cookie dictionaries saved from an earlier session.
+
+            @return
+                True if the restored session is signed in, False otherwise (the
+                caller should then fall back to sign_in); the browser is then left
+                without any of the given cookies.
+        '''
+        if not self.is_session_signed_in(cookies):
+            return False
+        self.browser.open(COOKIE_DOMAIN_URL)
+        if not self.browser.add_cookies(cookies):
+            self.browser.delete_cookies()
+            return False
+        return True
+
     def sign_out(self):
         pass
 
-    def __str__(self):
+    def get_report(self):
+        '''
+            @return
+                A dictionary with this account's email address, device class,
+                total number of points, and daily [current, maximum] device and
+                offer points.
+        '''
+        return {
+            'email': self.account_creds.email,
+            'device_class': self.get_device_class(),
+            'total_points': self.get_total_num_points(),
+            'daily_device_points': self.get_daily_device_points(),
+            'daily_offer_points': self.get_daily_offer_points()
+        }
+
+    @staticmethod
+    def format_report(report):
         '''
             abc@def.com - 2200 points
             Daily Point Breakdown:
                 Daily [PC/Mobile/DeviceClass] Points = 15/15
                 Daily Offer Points = 5/5
+            Searches = 12 (18 avoided)
+            Requests Blocked = 140 (~1850 KB saved, 420 KB loaded)
         '''
-        account_details = [self.account_creds.email, ' - ', str(self.get_total_num_points()), \
-            ' points\n']
+        account_details = [report['email'], ' - ', str(report['total_points']), ' points\n']
         account_details.append('Daily Point Breakdown:\n')
 
-        daily_device_points =   '/'.join([str(elem) for elem in self.get_daily_device_points()])
-        account_details.extend(['\tDaily ', self.get_device_class(), ' Points = ', \
+        daily_device_points = '/'.join([str(elem) for elem in report['daily_device_points']])
+        account_details.extend(['\tDaily ', report['device_class'], ' Points = ', \
             daily_device_points, '\n'])
 
-        daily_offer_points = '/'.join([str(elem) for elem in self.get_daily_offer_points()])
+        daily_offer_points = '/'.join([str(elem) for elem in report['daily_offer_points']])
         account_details.extend(['\tDaily Offer Points = ', daily_offer_points, '\n'])
-        
-        return ''.join(account_details)
\ No newline at end of file
+
+        # Only present in reports of bots that have performed searches.
+        if 'num_searches' in report:
+            account_details.extend(['Searches = ', str(report['num_searches']), ' (', \
+                str(report['num_searches_avoided']), ' avoided)\n'])
+
+        # Only present in reports of bots whose browsers block resources.
+        if 'resource_stats' in report:
+            resource_stats = report['resource_stats']
+            account_details.extend(['Requests Blocked = ', str(resource_stats['num_blocked']), ' (~', \
+                str(resource_stats['estimated_bytes_saved'] // 1024), ' KB saved, ', \
+                str(resource_stats['bytes_loaded'] // 1024), ' KB loaded)\n'])
+
+        return ''.join(account_details)
+
+    def __str__(self):
+        return AbstractAccountManager.format_report(self.get_report())
\ No newline at end of file
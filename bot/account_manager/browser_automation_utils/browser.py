@@ -1,16 +1,101 @@
 import enum
 import time
 
+import psutil
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ExpectedCondition
 
 import webdrivermanager
+from pacing import Pacing, PacingAction
+from retrypolicy import RetryPolicy, is_driver_dead
 
 _WAIT_TIME_SECONDS = 5
 _NUM_RETRIES = 1
 
+# Readiness polling - a page is ready once document.readyState is "complete" and
+# no new resources have been requested for _NETWORK_IDLE_SECONDS.
+_POLL_INTERVAL_SECONDS = 0.1
+_NETWORK_IDLE_SECONDS = 0.5
+_READY_STATE_SCRIPT = 'return [document.readyState, ' + \
+    '(window.performance && performance.getEntriesByType) ? ' + \
+    'performance.getEntriesByType("resource").length : 0];'
+
+_COOKIE_KEYS = ['name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry']
+
+def _combine_resource_stats(stats, other_stats, sign = 1):
+    '''
+        @return
+            stats + sign * other_stats, counter by counter (see
+            browsertypes.WebDriver.get_resource_stats); None counts as all zeros.
+    '''
+    combined = {'num_blocked': 0, 'estimated_bytes_saved': 0, 'bytes_loaded': 0, 'num_blocked_by_type': {}}
+    for (resource_stats, factor) in [(stats, 1), (other_stats, sign)]:
+        if not resource_stats:
+            continue
+        for key in ['num_blocked', 'estimated_bytes_saved', 'bytes_loaded']:
+            combined[key] += factor * resource_stats.get(key, 0)
+        for (resource_type, num_blocked) in resource_stats.get('num_blocked_by_type', {}).items():
+            combined['num_blocked_by_type'][resource_type] = \
+                combined['num_blocked_by_type'].get(resource_type, 0) + factor * num_blocked
+    return combined
+
+# Resolves every ElementQuery passed in arguments[0] (see Browser.query) within
+# the current frame, and returns a {name: text/attribute value(s)} object.
+_BULK_QUERY_SCRIPT = '''
+    function findElements(by, value, root) {
+        var elements = [];
+        if (by === 'id') {
+            var element = document.getElementById(value);
+            return element ? [element] : [];
+        }
+        if (by === 'xpath') {
+            var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var i = 0; i < snapshot.snapshotLength; i++) {
+                elements.push(snapshot.snapshotItem(i));
+            }
+            return elements;
+        }
+        if (by === 'class name') { return Array.prototype.slice.call(root.getElementsByClassName(value)); }
+        if (by === 'name') { return Array.prototype.slice.call(document.getElementsByName(value)); }
+        if (by === 'css selector') { return Array.prototype.slice.call(root.querySelectorAll(value)); }
+        if (by === 'tag name') { return Array.prototype.slice.call(root.getElementsByTagName(value)); }
+        if (by === 'link text') {
+            return Array.prototype.slice.call(root.getElementsByTagName('a')).filter(function(a) {
+                return (a.innerText || a.textContent || '').trim() === value;
+            });
+        }
+        return elements;
+    }
+
+    function readElement(element, attribute) {
+        if (!attribute) {
+            return (element.innerText || element.textContent || '').trim();
+        }
+        // Prefer the DOM property (e.g., the absolute URL for "href"), like Selenium does.
+        var value = element[attribute];
+        if (value === undefined || value === null || typeof value === 'object') {
+            value = element.getAttribute(attribute);
+        }
+        return value === null || value === undefined ? null : String(value);
+    }
+
+    var queries = arguments[0];
+    var results = {};
+    for (var i = 0; i < queries.length; i++) {
+        var query = queries[i];
+        var elements = findElements(query.by, query.value, document);
+        if (query.child_levels > 0) {
+            var childrenXPath = '.' + new Array(query.child_levels + 1).join('//*');
+            elements = elements.length ? findElements('xpath', childrenXPath, elements[0]) : [];
+        }
+        var values = elements.map(function(element) { return readElement(element, query.attribute); });
+        results[query.name] = query.multiple ? values : (values.length ? values[0] : null);
+    }
+    return results;
+'''
+
 class AttributeType(enum.Enum):
     Id = By.ID
     ClassName = By.CLASS_NAME
@@ -20,8 +105,38 @@ class AttributeType(enum.Enum):
     TagName = By.TAG_NAME
     LinkText = By.LINK_TEXT
 
+class ElementQuery:
+    def __init__(self, attribute_type_enum, attribute_value, target_attribute = None, multiple = False, \
+            child_levels = 0):
+        '''
+            @description
+                Describes one value to read with Browser.query.
+
+            @param attribute_type_enum, attribute_value
+                (Required) <span id="example"> Value </span> -> AttributeType.Id, "example"
+
+            @param target_attribute
+                (Optional) Name of the attribute to read (e.g., "href"); by default,
+                read the element's text.
+
+            @param multiple
+                (Optional) If true, read every matching element and return a list;
+                otherwise, only read the first matching element.
+
+            @param child_levels
+                (Optional) If greater than 0, read the descendants of the first matching
+                element that are this many levels down, instead of the element itself
+                (see Browser.get_child_attributes).
+        '''
+        self.attribute_type_enum = attribute_type_enum
+        self.attribute_value = attribute_value
+        self.target_attribute = target_attribute
+        self.multiple = multiple
+        self.child_levels = child_levels
+
 class Browser:
-    def __init__(self, browser_type, url = None, mobile = False):
+    def __init__(self, browser_type, url = None, mobile = False, driver_pool = None, pacing = None, \
+            command_counter = None, resource_filter = None):
         '''
             @param browser_type
                 (Required) A browsertypes.BrowserType enum value
@@ -33,8 +148,47 @@ class Browser:
             @param mobile
                 (Optional) If true, emulate a mobile browser; otherwise, operate
                 like a desktop browser (the default behavior).
-        '''
-        self.browser = webdrivermanager.get_selenium_webdriver(browser_type, mobile)
+
+            @param driver_pool
+                (Optional) webdrivermanager.WebDriverPool to take the webdriver from
+                (and hand it back to on close) instead of spawning a new one.
+
+            @param pacing
+                (Optional) pacing.Pacing policy that adds human-like delays after
+                page loads, clicks and typed fields; by default, there are no such
+                delays, and the browser only waits for pages to be ready.
+
+            @param command_counter
+                (Optional) profiling.WebDriverCommandCounter that counts every command
+                that this browser sends to its webdriver.
+
+            @param resource_filter
+                (Optional) resourceblocking.ResourceFilter with the resources (images,
+                fonts, ads, etc.) that the webdriver should not download. A pooled
+                webdriver uses the pool's filter instead.
+        '''
+        self.pacing = pacing if pacing else Pacing()
+        # Backoff between the attempts at finding an element that is not on the page yet
+        self.retry_policy = RetryPolicy(base_delay = 1, max_delay = _WAIT_TIME_SECONDS)
+        self.command_counter = command_counter
+        self.browser_type = browser_type
+        self.mobile = mobile
+        # Desktop user-agent of the driver; read lazily, the first time that we
+        # switch this browser over to a mobile user-agent.
+        self.desktop_user_agent = None
+        self.driver_pool = driver_pool
+        self.resource_filter = driver_pool.resource_filter if driver_pool else resource_filter
+        if driver_pool:
+            self.browser = driver_pool.acquire()
+        else:
+            self.browser = webdrivermanager.get_selenium_webdriver(browser_type, mobile, resource_filter)
+        if command_counter:
+            command_counter.attach(self.browser)
+        # A webdriver's resource counters are cumulative (and a pooled one has served
+        # other accounts before), so only the growth since now belongs to this browser.
+        self.resource_stats_baseline = self._read_resource_stats()
+        # Counts of the webdrivers that this browser has replaced (see set_mobile)
+        self.resource_stats_carried = None
         if url:
             self.browser.get(url)
 
@@ -57,16 +211,27 @@ class Browser:
 
             @return
                 True if the wait_condition was satisified (e.g., we find the element),
-                False if not.
+                False if not. If the webdriver has died, the error is raised instead,
+                since no amount of waiting can bring the element back.
         '''
         attr = (attribute_type, attribute_value)
         try:
             WebDriverWait(self.browser, _WAIT_TIME_SECONDS).until(wait_condition(attr))
             wait_cond_satisfied = True
-        except:
+        except Exception as e:
+            if is_driver_dead(e):
+                raise
             wait_cond_satisfied = False
         return wait_cond_satisfied
 
+    def _is_page_loaded(self):
+        try:
+            return self.browser.execute_script('return document.readyState;') == 'complete'
+        except Exception as e:
+            if is_driver_dead(e):
+                raise
+            return False
+
     def __try_finding_element(self, attribute_type_enum, attribute_value, wait_condition = \
             ExpectedCondition.presence_of_element_located, num_retries = _NUM_RETRIES):
         '''
@@ -74,8 +239,8 @@ class Browser:
                 (1st 2 required, 3rd optional) See descriptions in _wait above.
 
             @params num_retries
-                (Optional) # of times script needs to back off and wait for element
-                to be loaded if it can't be found yet
+                (Optional) # of times script needs to back off (see retry_policy) and
+                wait for element to be loaded if it can't be found yet
 
             @return
                 True if wait condition was ever satisfied and specified element(s)
@@ -83,18 +248,19 @@ class Browser:
         '''
         attribute_type = attribute_type_enum.value
 
-        # Try to get the element num_retries times (best effort). After that, if
-        # the element still can't be retrieved, return None.
-        wait_successful = self._wait(attribute_type, attribute_value, wait_condition)
-        count = 1
-        while not wait_successful and count <= num_retries:
-            self.sleep(_WAIT_TIME_SECONDS)
-            wait_successful = self._wait(attribute_type, attribute_value, wait_condition)
-            print('Retry #' + str(count) + '/' + str(num_retries)  + ' for ' + attribute_value)
-            count = count + 1
-            self.browser.get(self.browser.current_url)  # Refresh the page.
-
-        return wait_successful
+        # Try to get the element up to num_retries more times (best effort), within
+        # the current phase's budget. After that, if the element still can't be
+        # retrieved, return False.
+        for attempt in self.retry_policy.attempts(num_retries + 1):
+            if attempt > 0:
+                print('Retry #' + str(attempt) + '/' + str(num_retries)  + ' for ' + attribute_value)
+                # Only reload a page that never finished loading; reloading a loaded
+                # page just starts the wait over.
+                if not self._is_page_loaded():
+                    self.browser.refresh()
+            if self._wait(attribute_type, attribute_value, wait_condition):
+                return True
+        return False
 
     def _get_element(self, attribute_type_enum, attribute_value, wait_condition = \
             ExpectedCondition.presence_of_element_located, num_retries = _NUM_RETRIES):
@@ -153,10 +319,107 @@ class Browser:
                 False otherwise.
         '''
         self.browser.get(url)
-        self.sleep(_WAIT_TIME_SECONDS)
+        self.wait_until_ready()
+        self.pacing.pause(PacingAction.PageLoad)
         return self.browser.current_url == url
 
-    def click(self, attribute_type_enum, attribute_value):
+    def open_in_tabs(self, urls, max_tabs = 4):
+        '''
+            @description
+                Open the given urls in new tabs, up to max_tabs at a time, so that their
+                pages load concurrently; each tab is closed once its page is ready, and
+                the browser is left on its current page.
+
+            @param urls
+                (Required) List of URLs to open.
+
+            @param max_tabs
+                (Optional) Maximum number of tabs that may be loading at the same time.
+
+            @return
+                The list of urls whose pages became ready.
+        '''
+        main_window = self.browser.current_window_handle
+        loaded_urls = []
+        for i in range(0, len(urls), max_tabs):
+            # Take each tab's handle right after opening it, since window_handles does
+            # not necessarily list the tabs in the order that they were opened.
+            urls_by_window = {}
+            for url in urls[i:i + max_tabs]:
+                existing_windows = set(self.browser.window_handles)
+                self.browser.execute_script('window.open(arguments[0], "_blank");', url)
+                new_windows = [window for window in self.browser.window_handles if window not in existing_windows]
+                if new_windows:
+                    urls_by_window[new_windows[0]] = url
+
+            # Sample the tabs in turn, so that their network idle waits overlap.
+            readiness = dict([(window, None) for window in urls_by_window])
+            deadline = time.time() + _WAIT_TIME_SECONDS
+            while readiness and time.time() < deadline:
+                for window in list(readiness):
+                    self.browser.switch_to.window(window)
+                    (ready, readiness[window]) = self._sample_readiness(readiness[window])
+                    if ready:
+                        loaded_urls.append(urls_by_window[window])
+                        self.browser.close()
+                        del readiness[window]
+                if readiness:
+                    time.sleep(_POLL_INTERVAL_SECONDS)
+            for window in readiness:
+                self.browser.switch_to.window(window)
+                self.browser.close()
+            self.browser.switch_to.window(main_window)
+            self.pacing.pause(PacingAction.PageLoad)
+        return loaded_urls
+
+    def _sample_readiness(self, last_sample):
+        '''
+            @description
+                Take one sample of the current page's readiness (see wait_until_ready).
+
+            @param last_sample
+                (Required) The sample that the previous call returned for the same
+                page, or None if this is the first one.
+
+            @return
+                A (ready, sample) tuple, where ready is True if the page is ready, and
+                sample is to be passed to the next call.
+        '''
+        try:
+            (ready_state, num_resources) = self.browser.execute_script(_READY_STATE_SCRIPT)
+        except Exception as e:
+            if is_driver_dead(e):
+                raise
+            # The page is being swapped out under us; try again.
+            (ready_state, num_resources) = ('loading', -1)
+        now = time.time()
+        (last_num_resources, idle_since) = last_sample if last_sample else (-1, now)
+        if num_resources != last_num_resources:
+            return (False, (num_resources, now))
+        return (ready_state == 'complete' and now - idle_since >= _NETWORK_IDLE_SECONDS, last_sample)
+
+    def wait_until_ready(self, timeout = _WAIT_TIME_SECONDS):
+        '''
+            @description
+                Block until the current page has finished loading (document.readyState
+                is "complete") and the network has been idle for a short while.
+
+            @param timeout
+                (Optional) Maximum number of seconds to wait for.
+
+            @return
+                True if the page became ready within the timeout, False otherwise.
+        '''
+        deadline = time.time() + timeout
+        sample = None
+        while time.time() < deadline:
+            (ready, sample) = self._sample_readiness(sample)
+            if ready:
+                return True
+            time.sleep(_POLL_INTERVAL_SECONDS)
+        return False
+
+    def click(self, attribute_type_enum, attribute_value, wait_for_navigation = False):
         ''' 
             @param attribute_type_enum
                 An AttributeType enum value (e.g., AttributeType.Name).
@@ -165,6 +428,10 @@ class Browser:
                 The value corresponding to attribute_type_enum (as in login 
                 in <input name="login">).
 
+            @param wait_for_navigation
+                (Optional) If true, the click is expected to load a new page, so
+                wait until the current page is gone and the new one is ready.
+
             @return
                 True if the specified element was found and clicked successfully,
                 False otherwise.
@@ -172,7 +439,16 @@ class Browser:
         elem = self._get_element(attribute_type_enum, attribute_value, ExpectedCondition.element_to_be_clickable)
         if not elem:
             return False
+        current_page = self.browser.find_element(AttributeType.TagName.value, 'html') \
+            if wait_for_navigation else None
         elem.click()
+        if current_page:
+            try:
+                WebDriverWait(self.browser, _WAIT_TIME_SECONDS).until(ExpectedCondition.staleness_of(current_page))
+            except:
+                pass
+            self.wait_until_ready()
+        self.pacing.pause(PacingAction.Click)
         return True
 
     def clear(self, attribute_type_enum, attribute_value):
@@ -284,7 +560,7 @@ class Browser:
                 # Find each field, and type the specified message into it.
                 message = field_attr_values[field_attr_value]
                 status = status and self.type(field_attr_type_enum, field_attr_value, message)
-                self.sleep(1)
+                self.pacing.pause(PacingAction.Field)
 
         if field_attr_type_enum and field_attr_value:
             status = status and self.submit(field_attr_type_enum, field_attr_value)
@@ -341,6 +617,119 @@ class Browser:
         child_attributes = [element.get_attribute(target_attribute) for element in child_elements]
         return [elem for elem in child_attributes if elem]
 
+    def query(self, element_queries, required_names = None, timeout = _WAIT_TIME_SECONDS):
+        '''
+            @description
+                Read the values described by element_queries with a single JavaScript
+                round-trip to the webdriver, instead of one round-trip per element.
+                If some of the required elements are not on the page yet, the script is
+                re-run until they are (or until the timeout expires).
+
+            @param element_queries
+                (Required) Dictionary mapping a name to an ElementQuery, e.g.:
+                {
+                    'total': ElementQuery(AttributeType.Id, 'id_rc'),
+                    'links': ElementQuery(AttributeType.XPath, '//ul', 'href', True, 2)
+                }
+
+            @param required_names
+                (Optional) Names of the queries whose elements must be present before
+                returning; by default, all of them.
+
+            @param timeout
+                (Optional) Maximum number of seconds to wait for the required elements.
+
+            @return
+                A dictionary mapping each name to the text/attribute value that was read
+                (a list of values if the query has multiple = True). Missing elements
+                yield None (or an empty list).
+        '''
+        script_args = [{
+            'name': name,
+            'by': element_query.attribute_type_enum.value,
+            'value': element_query.attribute_value,
+            'attribute': element_query.target_attribute,
+            'multiple': element_query.multiple,
+            'child_levels': element_query.child_levels
+        } for (name, element_query) in element_queries.items()]
+        if required_names is None:
+            required_names = list(element_queries.keys())
+
+        def is_found(value):
+            return bool(value) if isinstance(value, list) else value is not None
+
+        deadline = time.time() + timeout
+        results = self.browser.execute_script(_BULK_QUERY_SCRIPT, script_args)
+        while not all([is_found(results.get(name)) for name in required_names]) and time.time() < deadline:
+            time.sleep(_POLL_INTERVAL_SECONDS)
+            results = self.browser.execute_script(_BULK_QUERY_SCRIPT, script_args)
+        return results
+
+    def get_cookies(self):
+        '''
+            @return
+                A list of dictionaries with the cookies that are visible to the page
+                that is currently open.
+        '''
+        return self.browser.get_cookies()
+
+    def add_cookies(self, cookies):
+        '''
+            @description
+                Add the given cookies (as returned by get_cookies) to the browser.
+                Cookies can only be added for the domain of the page that is currently
+                open; cookies for other domains are skipped.
+
+            @return
+                The number of cookies that were added.
+        '''
+        num_added = 0
+        for cookie in cookies:
+            # Drop driver-specific keys that some webdrivers refuse to take back.
+            cookie = {key: value for (key, value) in cookie.items() if key in _COOKIE_KEYS}
+            if 'expiry' in cookie:
+                cookie['expiry'] = int(cookie['expiry'])
+            try:
+                self.browser.add_cookie(cookie)
+                num_added += 1
+            except Exception:
+                pass
+        return num_added
+
+    def delete_cookies(self):
+        '''
+            @description
+                Delete the cookies that are visible to the page that is currently open.
+        '''
+        self.browser.delete_all_cookies()
+
+    def _read_resource_stats(self):
+        if not self.browser or not self.resource_filter:
+            return None
+        return webdrivermanager.get_resource_stats(self.browser, self.browser_type)
+
+    def get_resource_stats(self):
+        '''
+            @return
+                Dictionary with the number of requests that this browser's resource
+                filter has blocked, the estimated number of bytes that this has saved,
+                and the number of bytes loaded (see
+                browsertypes.WebDriver.get_resource_stats); or None if there is no
+                filter, or if the webdriver does not keep count.
+        '''
+        current_stats = self._read_resource_stats()
+        if current_stats is None:
+            return self.resource_stats_carried
+        return _combine_resource_stats(_combine_resource_stats(current_stats, self.resource_stats_baseline, -1), \
+            self.resource_stats_carried)
+
+    def get_user_agent(self):
+        '''
+            @return
+                The user-agent string that the browser currently sends.
+        '''
+        return self.browser.execute_script('return navigator.userAgent;')
+
     def get_current_url(self):
         '''
             @return 
@@ -356,6 +745,46 @@ class Browser:
         '''
         time.sleep(num_seconds)
 
+    def set_mobile(self, mobile):
+        '''
+            @description
+                Switch this browser between a desktop and a mobile user-agent, while
+                keeping the current session (cookies, profile) signed in.
+                If the underlying driver cannot change its user-agent in place, then
+                it is replaced with a new driver, and the current page's cookies
+                are carried over to it.
+
+            @param mobile
+                (Required) If true, emulate a mobile browser from now on; otherwise,
+                operate like a desktop browser.
+        '''
+        if mobile == self.mobile:
+            return
+        if mobile and not self.desktop_user_agent:
+            self.desktop_user_agent = self.get_user_agent()
+
+        user_agent = webdrivermanager.get_mobile_user_agent(self.browser_type) if mobile \
+            else self.desktop_user_agent
+        if not user_agent or \
+                not webdrivermanager.set_user_agent(self.browser, self.browser_type, user_agent):
+            self._replace_driver(mobile)
+        self.mobile = mobile
+
+    def _replace_driver(self, mobile):
+        current_url = self.browser.current_url
+        cookies = self.browser.get_cookies()
+        self.resource_stats_carried = self.get_resource_stats()
+        self._quit_driver()
+
+        self.browser = webdrivermanager.get_selenium_webdriver(self.browser_type, mobile, self.resource_filter)
+        if self.command_counter:
+            self.command_counter.attach(self.browser)
+        self.resource_stats_baseline = self._read_resource_stats()
+        # Cookies can only be set for the domain of the page that is currently open.
+        self.browser.get(current_url)
+        self.add_cookies(cookies)
+        self.browser.get(current_url)
+
     def switch_into_iframe(self, attribute_type_enum, attribute_value):
         '''
             @param attribute_type_enum, attribute_value
@@ -380,11 +809,69 @@ class Browser:
         '''
         self.browser.switch_to.default_content()
 
+    def _get_driver_process(self):
+        '''
+            @return
+                The subprocess.Popen object of the webdriver's process (e.g., phantomjs
+                or chromedriver), or None if the webdriver does not expose one.
+        '''
+        service = getattr(self.browser, 'service', None)
+        return getattr(service, 'process', None)
+
+    def is_driver_alive(self):
+        '''
+            @return
+                False if the webdriver's process has exited, True otherwise (including
+                when there is no process to check).
+        '''
+        process = self._get_driver_process()
+        return process is None or process.poll() is None
+
+    def kill_driver(self):
+        '''
+            @description
+                Kill the webdriver's process and every process that it has started
+                (e.g., the browser that chromedriver drives), without going through
+                the webdriver (which may be hung); every pending and future command
+                then fails fast. Safe to call from another thread.
+        '''
+        process = self._get_driver_process()
+        if not process or process.poll() is not None:
+            return
+        try:
+            driver_process = psutil.Process(process.pid)
+            # Children first, so that none of them can outlive the driver as an orphan.
+            processes = driver_process.children(recursive = True) + [driver_process]
+        except psutil.Error:
+            processes = []
+        for target_process in processes:
+            try:
+                target_process.kill()
+            except psutil.Error:
+                pass
+
     def close(self):
         '''
             @description
                 Close this browser window.
         '''
         if self.browser:
-            self.browser.quit()
-        self.browser = None
\ No newline at end of file
+            # A pooled driver whose user-agent has been switched in place is not
+            # handed back, since the next account expects the pool's user-agent.
+            if self.driver_pool and self.mobile == self.driver_pool.mobile:
+                self.driver_pool.release(self.browser)
+            else:
+                self._quit_driver()
+        self.browser = None
+
+    def _quit_driver(self):
+        if self.driver_pool:
+            self.driver_pool.discard(self.browser)
+            # Any replacement driver is not owned by the pool.
+            self.driver_pool = None
+        else:
+            try:
+                self.browser.quit()
+            except Exception:
+                # The driver has died already.
+                pass
\ No newline at end of file
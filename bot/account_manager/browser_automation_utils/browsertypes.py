@@ -6,6 +6,8 @@ from selenium import webdriver
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from selenium.webdriver.chrome.options import Options
 
+import resourceblocking
+
 # Currently, the supported browsers are Google Chrome, Firefox,
 # Internet Explorer, and PhantomJS (headless).
 # Please ensure that the former 3 are installed on your system
@@ -24,9 +26,15 @@ _MOBILE_BROWSER_USER_AGENT = 'Mozilla/5.0 (Linux; U; Android 4.0.3; ko-kr; ' + \
 _MOBILE_BROWSER_USER_AGENT2 = 'Mozilla/5.0(iPad; U; CPU iPhone OS 3_2 like Mac OS X; en-us) ' + \
     'AppleWebKit/531.21.10 (KHTML, like Gecko) Version/4.0.4 Mobile/7B314 Safari/531.21.10'
 
+# Origins whose web storage can hold (a part of) an account's session
+_SESSION_ORIGINS = ['https://www.bing.com', 'https://login.live.com', 'https://login.microsoftonline.com', \
+    'https://account.microsoft.com', 'https://rewards.microsoft.com', 'https://rewards.bing.com']
+
+_CLEAR_WEB_STORAGE_SCRIPT = 'try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}'
+
 # WebDriver Abstract Class
 class WebDriver:
-    def __init__(self, exec_path, mobile=False):
+    def __init__(self, exec_path, mobile=False, resource_filter=None):
         '''
             @param exec_path
                 (Required) The path to the target webdriver executable
@@ -35,19 +43,68 @@ class WebDriver:
             @param mobile
                 (Optional; False by default) Specifies whether or not
                 this webdriver should spoof a mobile user-agent string.
+
+            @param resource_filter
+                (Optional; None by default) resourceblocking.ResourceFilter with
+                the resources that this webdriver should not download.
         '''
         self.exec_path = exec_path
         self.mobile = mobile
+        self.resource_filter = resource_filter
 
     def get_driver(self):
         pass
 
+    @staticmethod
+    def get_mobile_user_agent():
+        return _MOBILE_BROWSER_USER_AGENT
+
+    @staticmethod
+    def set_user_agent(driver, user_agent):
+        '''
+            @description
+                Change the user-agent string of an already-running driver, so that
+                the same session (cookies, profile) can be used to impersonate
+                another device class.
+
+            @return
+                True if the user-agent was changed in place, False if this type
+                of driver does not support doing so.
+        '''
+        return False
+
+    @staticmethod
+    def clear_browsing_data(driver):
+        '''
+            @description
+                Delete the cookies of every domain (not only those of the current
+                document, as delete_all_cookies does), and whatever else keeps a
+                signed-in session alive, so that the driver can be handed to
+                another account.
+
+            @return
+                True if the browsing data was cleared, False if this type of
+                driver does not support doing so (the caller then needs a new driver).
+        '''
+        return False
+
+    @staticmethod
+    def get_resource_stats(driver):
+        '''
+            @return
+                Dictionary with the number of requests that the driver's resource
+                filter has blocked so far ("num_blocked", and "num_blocked_by_type"),
+                the estimated number of bytes that this has saved, and the number of
+                bytes loaded; or None if this type of driver does not keep count.
+        '''
+        return None
+
 # Prerequisite: Firefox must be installed on your system.
 class FirefoxDriver(WebDriver):
-    def __init__(self, exec_path, mobile=False):
+    def __init__(self, exec_path, mobile=False, resource_filter=None):
         # Selenium offers built-in support for the Firefox driver,
         # so no exec_path is necessary.
-        super().__init__(None, mobile)
+        super().__init__(None, mobile, resource_filter)
 
     def get_driver(self):
         '''
@@ -59,12 +116,15 @@ class FirefoxDriver(WebDriver):
         profile.set_preference('browser.privatebrowsing.autostart', True)
         if self.mobile:
             profile.set_preference('general.useragent.override', _MOBILE_BROWSER_USER_AGENT)
+        if self.resource_filter:
+            for (name, value) in self.resource_filter.get_firefox_prefs().items():
+                profile.set_preference(name, value)
         return webdriver.Firefox(profile)
 
 # Prerequisite: Google Chrome must be installed on your system.
 class ChromeDriver(WebDriver):
-    def __init__(self, exec_path, mobile=False):
-        super().__init__(exec_path, mobile)
+    def __init__(self, exec_path, mobile=False, resource_filter=None):
+        super().__init__(exec_path, mobile, resource_filter)
 
     def get_driver(self):
         executable_path = self.exec_path
@@ -72,19 +132,93 @@ class ChromeDriver(WebDriver):
         opts.add_argument('--incognito')
         if self.mobile:
             opts.add_argument('user-agent=' + _MOBILE_BROWSER_USER_AGENT)
-        return webdriver.Chrome(self.exec_path, chrome_options = opts)
+        capabilities = dict(DesiredCapabilities.CHROME)
+        if self.resource_filter:
+            # The Network events in the performance log feed get_resource_stats.
+            capabilities['goog:loggingPrefs'] = {'performance': 'ALL'}
+            opts.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+        driver = webdriver.Chrome(self.exec_path, chrome_options = opts, desired_capabilities = capabilities)
+        if self.resource_filter:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.resource_filter.get_chrome_blocked_urls()})
+            driver._resource_stats = resourceblocking.ChromeResourceStats(self.resource_filter)
+        return driver
+
+    @staticmethod
+    def set_user_agent(driver, user_agent):
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {'userAgent': user_agent})
+        return True
+
+    @staticmethod
+    def clear_browsing_data(driver):
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origin in _SESSION_ORIGINS:
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        return True
+
+    @staticmethod
+    def get_resource_stats(driver):
+        # Reading the performance log drains it, so the counts are kept on the driver.
+        resource_stats = getattr(driver, '_resource_stats', None)
+        return resource_stats.add_log_entries(driver.get_log('performance')) if resource_stats else None
 
 # Headless
+_EXECUTE_PHANTOM_SCRIPT = 'executePhantomScript'
+
 class PhantomJSDriver(WebDriver):
-    def __init__(self, exec_path, mobile=False):
-        super().__init__(exec_path, mobile)
+    def __init__(self, exec_path, mobile=False, resource_filter=None):
+        super().__init__(exec_path, mobile, resource_filter)
 
     def get_driver(self):
         capabilities = dict(DesiredCapabilities.PHANTOMJS)
         if self.mobile:
             capabilities['phantomjs.page.settings.userAgent'] = _MOBILE_BROWSER_USER_AGENT2
-        return webdriver.PhantomJS(self.exec_path, service_log_path = os.devnull, \
+        # Images are blocked by the filter script rather than by the loadImages setting,
+        # which would keep them from ever reaching (and being counted by) the script.
+        driver = webdriver.PhantomJS(self.exec_path, service_log_path = os.devnull, \
             desired_capabilities = capabilities)
+        if self.resource_filter:
+            PhantomJSDriver.execute_phantom_script(driver, resourceblocking.PHANTOMJS_FILTER_SCRIPT, \
+                self.resource_filter.get_phantomjs_filter())
+        return driver
+
+    @staticmethod
+    def get_mobile_user_agent():
+        return _MOBILE_BROWSER_USER_AGENT2
+
+    @staticmethod
+    def execute_phantom_script(driver, script, *args):
+        '''
+            @description
+                Run the given script within PhantomJS itself (as opposed to within
+                the page under automation); "this" refers to the PhantomJS page object.
+        '''
+        driver.command_executor._commands[_EXECUTE_PHANTOM_SCRIPT] = \
+            ('POST', '/session/$sessionId/phantom/execute')
+        return driver.execute(_EXECUTE_PHANTOM_SCRIPT, {'script': script, 'args': list(args)})
+
+    @staticmethod
+    def set_user_agent(driver, user_agent):
+        PhantomJSDriver.execute_phantom_script(driver, 'this.settings.userAgent = arguments[0];', \
+            user_agent)
+        return True
+
+    @staticmethod
+    def clear_browsing_data(driver):
+        # Web storage can only be reached from a document of its own origin; robots.txt
+        # is the cheapest such document to load.
+        for origin in _SESSION_ORIGINS:
+            driver.get(origin + '/robots.txt')
+            driver.execute_script(_CLEAR_WEB_STORAGE_SCRIPT)
+        # PhantomJS keeps a single cookie jar for every page and domain; cleared last,
+        # since the visits above may have set cookies of their own.
+        PhantomJSDriver.execute_phantom_script(driver, 'phantom.clearCookies();')
+        return True
+
+    @staticmethod
+    def get_resource_stats(driver):
+        response = PhantomJSDriver.execute_phantom_script(driver, resourceblocking.PHANTOMJS_STATS_SCRIPT)
+        return response.get('value') if response else None
 
 # Other constants - used for webdriver configuration
 SELENIUM_WEBDRIVER = 'webdriver'
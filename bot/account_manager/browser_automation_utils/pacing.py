@@ -0,0 +1,52 @@
+import enum
+import random
+import time
+
+class PacingAction(enum.Enum):
+    PageLoad = 'page_load'
+    Field = 'field'
+    Click = 'click'
+
+class Pacing:
+    '''
+        Policy that decides how long a Browser pauses after an action, in addition
+        to waiting for the page to be ready. Readiness waits exist for speed and
+        correctness; pacing delays only exist to make the automation look human.
+
+        This base policy never pauses.
+    '''
+    def get_delay(self, action):
+        '''
+            @param action
+                (Required) PacingAction that was just performed.
+
+            @return
+                Number of seconds to pause for after the given action.
+        '''
+        return 0
+
+    def pause(self, action):
+        delay = self.get_delay(action)
+        if delay > 0:
+            time.sleep(delay)
+
+class HumanPacing(Pacing):
+    def __init__(self, min_seconds = 0.5, max_seconds = 2, actions = None):
+        '''
+            @param min_seconds, max_seconds
+                (Optional) Bounds of the random delay after each paced action.
+
+            @param actions
+                (Optional) Collection of PacingActions to pause after; by default,
+                pause after every action.
+        '''
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        # Compare enum values: driver.py imports this module as part of the bot package,
+        # while Browser passes PacingActions from it as a top-level module.
+        self.actions = set([action.value for action in (actions if actions else PacingAction)])
+
+    def get_delay(self, action):
+        if action.value not in self.actions:
+            return 0
+        return random.uniform(self.min_seconds, self.max_seconds)
@@ -0,0 +1,226 @@
+import json
+
+# Resource types that a ResourceFilter can block, with the URL extensions that give
+# them away (used where the browser does not tell us the type of a request), and the
+# typical size of one such resource, which is used to estimate the bytes saved by
+# not downloading it.
+RESOURCE_TYPES = {
+    'image': {
+        'extensions': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp'],
+        'typical_size': 12 * 1024
+    },
+    'font': {
+        'extensions': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+        'typical_size': 24 * 1024
+    },
+    'media': {
+        'extensions': ['mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a'],
+        'typical_size': 256 * 1024
+    },
+    'stylesheet': {
+        'extensions': ['css'],
+        'typical_size': 16 * 1024
+    }
+}
+
+# Typical size of a third-party script or beacon (ads, analytics, etc.)
+_TYPICAL_THIRD_PARTY_SIZE = 20 * 1024
+
+DEFAULT_BLOCKED_TYPES = ['image', 'font', 'media']
+
+# Ad, analytics and tracking hosts that Bing's pages pull in; the elements that the
+# bots read and click never depend on them.
+DEFAULT_BLOCKED_HOSTS = ['doubleclick.net', 'googlesyndication.com', 'google-analytics.com', \
+    'googletagmanager.com', 'bat.bing.com', 'c.bing.com', 'c.msn.com', 'clarity.ms', \
+    'scorecardresearch.com', 'adnxs.com', 'facebook.net']
+
+# Scripts, frames and forms of the sign-in flow and of the dashboard
+DEFAULT_ALLOWED_HOSTS = ['login.live.com', 'login.microsoftonline.com', 'account.microsoft.com', \
+    'rewards.microsoft.com', 'rewards.bing.com']
+
+# Run within PhantomJS (see PhantomJSDriver.execute_phantom_script); "this" is the page.
+# The filter script aborts every blocked request, and keeps count of what it blocked and
+# of the bytes that it let through in this.resourceBlockingStats; the stats script reads
+# those counts.
+PHANTOMJS_FILTER_SCRIPT = '''
+    var page = this;
+    var filter = arguments[0];
+    var stats = {num_blocked: 0, estimated_bytes_saved: 0, bytes_loaded: 0, num_blocked_by_type: {}};
+    page.resourceBlockingStats = stats;
+
+    function getHost(url) {
+        var match = /^[a-z]+:\\/\\/([^\\/:?#]+)/i.exec(url);
+        return match ? match[1].toLowerCase() : '';
+    }
+    function matchesHost(host, hosts) {
+        for (var i = 0; i < hosts.length; i++) {
+            if (host === hosts[i] || host.slice(-(hosts[i].length + 1)) === '.' + hosts[i]) {
+                return true;
+            }
+        }
+        return false;
+    }
+    function getBlockedType(url) {
+        var host = getHost(url);
+        if (!host || matchesHost(host, filter.allowed_hosts)) {
+            return null;
+        }
+        if (matchesHost(host, filter.blocked_hosts)) {
+            return 'third_party';
+        }
+        var extension = /\\.([a-z0-9]+)$/i.exec(url.split(/[?#]/)[0]);
+        return extension ? (filter.extension_types[extension[1].toLowerCase()] || null) : null;
+    }
+
+    page.onResourceRequested = function(requestData, networkRequest) {
+        var blockedType = getBlockedType(requestData.url);
+        if (blockedType) {
+            networkRequest.abort();
+            stats.num_blocked += 1;
+            stats.estimated_bytes_saved += filter.typical_sizes[blockedType];
+            stats.num_blocked_by_type[blockedType] = (stats.num_blocked_by_type[blockedType] || 0) + 1;
+        }
+    };
+    page.onResourceReceived = function(response) {
+        if (response.stage !== 'end') {
+            return;
+        }
+        var size = response.bodySize || 0;
+        (response.headers || []).forEach(function(header) {
+            if (header.name.toLowerCase() === 'content-length') {
+                size = parseInt(header.value, 10) || size;
+            }
+        });
+        stats.bytes_loaded += size;
+    };
+'''
+
+PHANTOMJS_STATS_SCRIPT = 'return this.resourceBlockingStats || null;'
+
+class ResourceFilter:
+    def __init__(self, blocked_types = None, blocked_hosts = None, allowed_hosts = None):
+        '''
+            @description
+                Which resources the browsers should not download at all: every
+                resource of the blocked types (images, fonts, etc.), and everything
+                from the blocked (e.g., ad and analytics) hosts. Nothing from an
+                allowed host is blocked. The bots only read and click a handful of
+                elements, none of which needs these resources.
+                How much of this each driver can enforce varies (see browsertypes.py):
+                PhantomJS applies the whole filter to every request, and Chrome blocks
+                the hosts' and the blocked types' URLs (both count what they block);
+                Firefox is only configured with preferences for the blocked types.
+
+            @param blocked_types
+                (Optional) List of keys of RESOURCE_TYPES; by default, DEFAULT_BLOCKED_TYPES.
+
+            @param blocked_hosts, allowed_hosts
+                (Optional) Lists of host names; a host name also covers its subdomains.
+                By default, DEFAULT_BLOCKED_HOSTS and DEFAULT_ALLOWED_HOSTS.
+        '''
+        self.blocked_types = list(blocked_types) if blocked_types is not None else list(DEFAULT_BLOCKED_TYPES)
+        self.blocked_hosts = list(blocked_hosts) if blocked_hosts is not None else list(DEFAULT_BLOCKED_HOSTS)
+        self.allowed_hosts = list(allowed_hosts) if allowed_hosts is not None else list(DEFAULT_ALLOWED_HOSTS)
+        for resource_type in self.blocked_types:
+            if resource_type not in RESOURCE_TYPES:
+                raise ValueError('Unknown resource type: ' + resource_type)
+
+    def get_typical_sizes(self):
+        '''
+            @return
+                Dictionary mapping each blocked type (and "third_party", for the blocked
+                hosts) to the typical size of one such resource.
+        '''
+        typical_sizes = {'third_party': _TYPICAL_THIRD_PARTY_SIZE}
+        for resource_type in self.blocked_types:
+            typical_sizes[resource_type] = RESOURCE_TYPES[resource_type]['typical_size']
+        return typical_sizes
+
+    def get_phantomjs_filter(self):
+        '''
+            @return
+                The argument of PHANTOMJS_FILTER_SCRIPT.
+        '''
+        extension_types = {}
+        for resource_type in self.blocked_types:
+            for extension in RESOURCE_TYPES[resource_type]['extensions']:
+                extension_types[extension] = resource_type
+        return {
+            'extension_types': extension_types,
+            'typical_sizes': self.get_typical_sizes(),
+            'blocked_hosts': [host.lower() for host in self.blocked_hosts],
+            'allowed_hosts': [host.lower() for host in self.allowed_hosts]
+        }
+
+    def get_chrome_blocked_urls(self):
+        '''
+            @return
+                URL patterns (with "*" wildcards) for Chrome's Network.setBlockedURLs;
+                the blocked hosts, and the extensions of the blocked types, with or
+                without a query string. These patterns cannot make exceptions for the
+                allowed hosts.
+        '''
+        urls = ['*://*.' + host + '/*' for host in self.blocked_hosts] + \
+            ['*://' + host + '/*' for host in self.blocked_hosts]
+        for resource_type in self.blocked_types:
+            for extension in RESOURCE_TYPES[resource_type]['extensions']:
+                urls.extend(['*.' + extension, '*.' + extension + '?*'])
+        return urls
+
+    def get_firefox_prefs(self):
+        '''
+            @return
+                Firefox preferences that block the blocked types (as far as Firefox
+                has settings for them).
+        '''
+        prefs = {}
+        if 'image' in self.blocked_types:
+            prefs['permissions.default.image'] = 2
+        if 'font' in self.blocked_types:
+            prefs['gfx.downloadable_fonts.enabled'] = False
+            prefs['browser.display.use_document_fonts'] = 0
+        if 'media' in self.blocked_types:
+            prefs['media.autoplay.default'] = 5
+            prefs['media.preload.default'] = 0
+        if 'stylesheet' in self.blocked_types:
+            prefs['permissions.default.stylesheet'] = 2
+        return prefs
+
+# Chrome's resource types (Network.ResourceType) that correspond to RESOURCE_TYPES
+_CHROME_RESOURCE_TYPES = {'Image': 'image', 'Font': 'font', 'Media': 'media', 'Stylesheet': 'stylesheet'}
+
+class ChromeResourceStats:
+    def __init__(self, resource_filter):
+        '''
+            @description
+                Resource blocking counters of a Chrome driver, in the same format as
+                PHANTOMJS_FILTER_SCRIPT's, kept up to date from the Network events of
+                the driver's performance log (see add_log_entries).
+        '''
+        self.typical_sizes = resource_filter.get_typical_sizes()
+        self.stats = {'num_blocked': 0, 'estimated_bytes_saved': 0, 'bytes_loaded': 0, 'num_blocked_by_type': {}}
+
+    def add_log_entries(self, log_entries):
+        '''
+            @param log_entries
+                (Required) Entries of the driver's performance log (as returned by
+                get_log('performance')) that have not been added yet.
+
+            @return
+                A copy of the updated counters.
+        '''
+        for entry in log_entries:
+            message = json.loads(entry['message'])['message']
+            params = message.get('params', {})
+            if message.get('method') == 'Network.loadingFinished':
+                self.stats['bytes_loaded'] += int(params.get('encodedDataLength', 0))
+            # Requests that match a Network.setBlockedURLs pattern fail with "inspector".
+            elif message.get('method') == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+                blocked_type = _CHROME_RESOURCE_TYPES.get(params.get('type'), 'third_party')
+                if blocked_type not in self.typical_sizes:
+                    blocked_type = 'third_party'
+                self.stats['num_blocked'] += 1
+                self.stats['estimated_bytes_saved'] += self.typical_sizes[blocked_type]
+                self.stats['num_blocked_by_type'][blocked_type] = \
+                    self.stats['num_blocked_by_type'].get(blocked_type, 0) + 1
+        return dict(self.stats, num_blocked_by_type = dict(self.stats['num_blocked_by_type']))
@@ -0,0 +1,149 @@
+import contextlib
+import enum
+import random
+import threading
+import time
+
+from selenium.common import exceptions as selenium_exceptions
+
+class FailureType(enum.Enum):
+    # Slow page, network hiccup, etc.; likely to go away on its own.
+    Transient = 'transient'
+    # The page loaded, but without the element that we were looking for.
+    ElementMissing = 'element_missing'
+    # Bing rejected the account's credentials; retrying cannot help.
+    Auth = 'auth'
+    # The webdriver (or the browser behind it) is gone; only a new one can help.
+    DriverDead = 'driver_dead'
+
+class AuthenticationError(Exception):
+    '''
+        Raised when Bing rejects an account's credentials.
+    '''
+    pass
+
+_ELEMENT_MISSING_EXCEPTIONS = (selenium_exceptions.NoSuchElementException, \
+    selenium_exceptions.StaleElementReferenceException, selenium_exceptions.ElementNotInteractableException)
+
+# Fragments of the messages that the webdriver client raises once the driver process
+# (or its browser) has died; the exception types vary between drivers and versions.
+_DRIVER_DEAD_MESSAGES = ['no such session', 'invalid session id', 'session deleted', 'not reachable', \
+    'browser has closed', 'disconnected', 'connection refused', \
+    'failed to establish a new connection', 'max retries exceeded', 'remote end closed connection']
+
+def classify_failure(exception):
+    '''
+        @return
+            The FailureType of the given exception.
+    '''
+    if isinstance(exception, AuthenticationError):
+        return FailureType.Auth
+    if isinstance(exception, (ConnectionError, selenium_exceptions.InvalidSessionIdException)):
+        return FailureType.DriverDead
+    message = str(exception).lower()
+    if any([fragment in message for fragment in _DRIVER_DEAD_MESSAGES]):
+        return FailureType.DriverDead
+    if isinstance(exception, _ELEMENT_MISSING_EXCEPTIONS):
+        return FailureType.ElementMissing
+    return FailureType.Transient
+
+def is_driver_dead(exception):
+    return classify_failure(exception) is FailureType.DriverDead
+
+class Deadline:
+    def __init__(self, seconds):
+        '''
+            @param seconds
+                (Required) Number of seconds from now until the deadline.
+        '''
+        self.expires_at = time.time() + seconds
+
+    def remaining(self):
+        return max(0, self.expires_at - time.time())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+# Deadline of the phase that is running on the current thread (see phase_deadline)
+_phase_state = threading.local()
+
+@contextlib.contextmanager
+def phase_deadline(seconds):
+    '''
+        @description
+            Context manager that gives the code within it (on the current thread) a
+            budget of the given number of seconds: RetryPolicy.attempts stops retrying
+            once the budget has run out. Does nothing if seconds is None.
+    '''
+    if seconds is None:
+        yield
+        return
+    previous_deadline = getattr(_phase_state, 'deadline', None)
+    _phase_state.deadline = Deadline(seconds)
+    try:
+        yield
+    finally:
+        _phase_state.deadline = previous_deadline
+
+def get_phase_deadline():
+    '''
+        @return
+            The Deadline of the phase that is running on the current thread, or None.
+    '''
+    return getattr(_phase_state, 'deadline', None)
+
+def is_phase_deadline_expired():
+    deadline = get_phase_deadline()
+    return deadline is not None and deadline.expired()
+
+class RetryPolicy:
+    def __init__(self, max_attempts = 3, base_delay = 0.5, max_delay = 8):
+        '''
+            @description
+                How often, and how far apart, to attempt an operation that may fail.
+                The delay before the n-th retry is drawn at random from the upper half
+                of min(max_delay, base_delay * 2^n) seconds, so that bots that fail
+                together do not all retry at the same moment.
+
+            @param max_attempts
+                (Optional) Maximum number of attempts, including the first one.
+
+            @param base_delay, max_delay
+                (Optional) Number of seconds to wait before the first retry, and
+                ceiling of the exponentially growing wait.
+        '''
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, num_retries):
+        '''
+            @param num_retries
+                Number of retries performed so far.
+
+            @return
+                Number of seconds to wait before the next retry.
+        '''
+        delay = min(self.max_delay, self.base_delay * (2 ** num_retries))
+        return random.uniform(delay / 2, delay)
+
+    def attempts(self, max_attempts = None, deadline = None):
+        '''
+            @description
+                Generator over the attempt numbers (0, 1, ...) of an operation, that
+                waits before every attempt but the first; the caller breaks out of the
+                loop once an attempt succeeds. No further attempt is made once the
+                deadline (by default, that of the current phase) cannot afford the wait.
+
+            @param max_attempts
+                (Optional) Overrides the policy's max_attempts.
+        '''
+        max_attempts = self.max_attempts if max_attempts is None else max_attempts
+        deadline = deadline if deadline else get_phase_deadline()
+        for attempt in range(0, max_attempts):
+            if attempt > 0:
+                delay = self.get_delay(attempt - 1)
+                if deadline and deadline.remaining() < delay:
+                    return
+                time.sleep(delay)
+            yield attempt
@@ -1,4 +1,6 @@
 import os
+import time
+from threading import Lock
 
 import browsertypes
 
@@ -19,7 +21,7 @@ def _make_path_absolute(path):
         return path
     return os.path.join(_ABS_PATH_TO_THIS_DIR, path)
 
-def get_selenium_webdriver(browser_type, mobile = False):
+def get_selenium_webdriver(browser_type, mobile = False, resource_filter = None):
     '''
         @param browser_type
             Specifies the type of the target browser (e.g., Chrome, Firefox, etc.).
@@ -29,6 +31,10 @@ def get_selenium_webdriver(browser_type, mobile = False):
             with no extra config.
             But, if mobile = True, then the webdriver will be configured to spoof
             a mobile browser's user-agent.
+
+        @param resource_filter
+            (Optional) resourceblocking.ResourceFilter with the resources that the
+            webdriver should not download; by default, it downloads everything.
         
         @return
             - The Selenium webdriver object for the target browser type
@@ -45,10 +51,209 @@ def get_selenium_webdriver(browser_type, mobile = False):
     # If the specified browser type is Firefox, then the executable path is not required
     # since Selenium offers in-built support for the Firefox webdriver.
     if browser_type.value == browsertypes.BrowserType.Firefox.value:
-        return driver_config[browsertypes.SELENIUM_WEBDRIVER]("", mobile).get_driver()
+        return driver_config[browsertypes.SELENIUM_WEBDRIVER]("", mobile, resource_filter).get_driver()
 
     # For all other browser types, get the path to the webdriver executable that can run
     # on the current platform, and create a Selenium webdriver object that uses this path.
     # If there is no path for the current platform, then return None.
     executable_path = _make_path_absolute(driver_config.get(browsertypes.CURRENT_PLATFORM, None))
-    return driver_config[browsertypes.SELENIUM_WEBDRIVER](executable_path, mobile).get_driver() if executable_path else None
+    return driver_config[browsertypes.SELENIUM_WEBDRIVER](executable_path, mobile, resource_filter).get_driver() \
+        if executable_path else None
+
+def _get_webdriver_class(browser_type):
+    driver_config = browsertypes.WEBDRIVER_CONFIG.get(browser_type.value, None)
+    return driver_config[browsertypes.SELENIUM_WEBDRIVER] if driver_config else None
+
+def get_mobile_user_agent(browser_type):
+    '''
+        @return
+            The user-agent string that webdrivers of the given browser type use
+            to spoof a mobile browser.
+    '''
+    return _get_webdriver_class(browser_type).get_mobile_user_agent()
+
+def set_user_agent(driver, browser_type, user_agent):
+    '''
+        @param driver
+            A running Selenium webdriver object of the given browser type.
+
+        @param user_agent
+            The user-agent string that the driver should send from now on.
+
+        @return
+            True if the driver's user-agent was changed in place, False if the
+            browser type does not support it (the caller then needs a new driver).
+    '''
+    return _get_webdriver_class(browser_type).set_user_agent(driver, user_agent)
+
+def clear_browsing_data(driver, browser_type):
+    '''
+        @return
+            True if the cookies (of every domain) and the web storage of the given
+            driver have been cleared, False if the browser type does not support it
+            (see browsertypes.WebDriver.clear_browsing_data).
+    '''
+    return _get_webdriver_class(browser_type).clear_browsing_data(driver)
+
+def get_resource_stats(driver, browser_type):
+    '''
+        @return
+            The resource blocking counters of the given driver (see
+            browsertypes.WebDriver.get_resource_stats), or None.
+    '''
+    try:
+        return _get_webdriver_class(browser_type).get_resource_stats(driver)
+    except Exception:
+        return None
+
+class WebDriverPool:
+    def __init__(self, browser_type, mobile = False, size = 0, max_uses = 10, resource_filter = None):
+        '''
+            @description
+                Pool of warm Selenium webdrivers of a single type, so that bots do
+                not have to pay the driver startup cost for every account.
+
+            @param browser_type
+                (Required) browsertypes.BrowserType of the pooled webdrivers.
+
+            @param mobile
+                (Optional) If true, the pooled webdrivers spoof a mobile user-agent.
+
+            @param size
+                (Optional) Number of webdrivers to spawn up front.
+
+            @param max_uses
+                (Optional) Number of times a webdriver can be handed out before it is
+                quit and replaced with a new one.
+
+            @param resource_filter
+                (Optional) resourceblocking.ResourceFilter that the pooled webdrivers
+                are spawned with.
+        '''
+        self.browser_type = browser_type
+        self.mobile = mobile
+        self.resource_filter = resource_filter
+        self.max_uses = max_uses
+
+        # Guards idle_drivers, num_uses and the counters below.
+        self.lock = Lock()
+        self.idle_drivers = []
+        self.num_uses = {}
+
+        # Counters
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_spawned = 0
+        self.num_recycled = 0
+        self.total_spawn_seconds = 0.0
+
+        for i in range(0, size):
+            driver = self._spawn()
+            if driver:
+                self.idle_drivers.append(driver)
+
+    def _spawn(self):
+        start_time = time.time()
+        driver = get_selenium_webdriver(self.browser_type, self.mobile, self.resource_filter)
+        spawn_seconds = time.time() - start_time
+        with self.lock:
+            self.num_spawned += 1
+            self.total_spawn_seconds += spawn_seconds
+            if driver:
+                self.num_uses[id(driver)] = 0
+        return driver
+
+    def _reset(self, driver):
+        '''
+            @description
+                Wipe the given webdriver's cookies, for every domain, and the web storage
+                of the current page and of the origins that can hold a session (see
+                browsertypes._SESSION_ORIGINS), so that the next account does not inherit
+                this account's session. This doubles as a health check of the webdriver.
+
+            @return
+                True if the webdriver is healthy and has been reset, False otherwise
+                (including if this type of webdriver cannot be fully reset).
+        '''
+        try:
+            driver.execute_script('try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}')
+            if not clear_browsing_data(driver, self.browser_type):
+                return False
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        '''
+            @return
+                An idle webdriver from the pool if there is one, or a newly spawned
+                webdriver otherwise (None if the webdriver cannot be constructed).
+        '''
+        with self.lock:
+            driver = self.idle_drivers.pop() if self.idle_drivers else None
+            if driver:
+                self.num_hits += 1
+            else:
+                self.num_misses += 1
+        return driver if driver else self._spawn()
+
+    def release(self, driver):
+        '''
+            @description
+                Hand the given webdriver back to the pool. It is quit instead if it
+                has reached max_uses or fails its health check.
+        '''
+        with self.lock:
+            num_uses = self.num_uses.get(id(driver), 0) + 1
+            self.num_uses[id(driver)] = num_uses
+        if num_uses >= self.max_uses or not self._reset(driver):
+            self.discard(driver)
+            return
+        with self.lock:
+            self.idle_drivers.append(driver)
+
+    def discard(self, driver):
+        '''
+            @description
+                Quit the given webdriver instead of handing it back to the pool
+                (e.g., because its configuration has been changed).
+        '''
+        with self.lock:
+            self.num_recycled += 1
+        self._quit(driver)
+
+    def _quit(self, driver):
+        with self.lock:
+            self.num_uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        '''
+            @description
+                Quit every idle webdriver in the pool.
+        '''
+        with self.lock:
+            idle_drivers = self.idle_drivers
+            self.idle_drivers = []
+        for driver in idle_drivers:
+            self._quit(driver)
+
+    def get_stats(self):
+        '''
+            @return
+                A dictionary with the pool's hit/miss, spawn and recycle counters,
+                along with the average webdriver spawn latency (in seconds).
+        '''
+        with self.lock:
+            return {
+                'hits': self.num_hits,
+                'misses': self.num_misses,
+                'spawned': self.num_spawned,
+                'recycled': self.num_recycled,
+                'average_spawn_seconds': self.total_spawn_seconds / self.num_spawned \
+                    if self.num_spawned else 0.0
+            }
@@ -1,8 +1,377 @@
 import json
+import os
+import tempfile
+import threading
 
-from models import AccountCredentialsCollection
+from models import AccountCredentials, AccountCredentialsCollection, AccountCredentialsSource
 from simplesecurity import Password
 
+'''
+    JSON-lines credentials file format:
+    - Credentials file: one {"email": ..., "password": ..., "salt": ...} object per line.
+      Saving credentials appends a line; when an email address appears on more than
+      one line, the last line wins.
+    - Index file (credentials file name + ".index"): one {"email": ..., "offset": ...}
+      object per line, giving the byte offset of each account's latest line in the
+      credentials file, and after every batch of those, a {"size": ..., "mtime": ...}
+      checkpoint of the credentials file as of then. It is only an accelerator: it is
+      caught up with the credentials file whenever the file has been appended to, and
+      rebuilt from it whenever the file has been changed in any other way.
+'''
+_INDEX_FILE_EXTENSION = '.index'
+
+def _to_account_credentials(record):
+    return AccountCredentials(record['email'], Password(record['password'], record['salt']))
+
+def _iter_records(file_ptr, offset = 0):
+    '''
+        @description
+        Generator over the (byte offset, record) tuples of the credentials lines that
+        start at or after the given offset of the given binary file; lines that cannot
+        be parsed (e.g., a line cut short by a crash) are skipped.
+    '''
+    file_ptr.seek(offset)
+    for line in file_ptr:
+        try:
+            record = json.loads(line.decode('utf-8'))
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and 'email' in record:
+            yield (offset, record)
+        offset += len(line)
+
+def _read_record(file_ptr, offset):
+    '''
+        @return
+        The credentials record on the line that starts at the given offset of the
+        given binary file, or None if there is no such line.
+    '''
+    for (record_offset, record) in _iter_records(file_ptr, offset):
+        return record if record_offset == offset else None
+    return None
+
+def _replace_file(filename, data):
+    '''
+        @description
+        Replace the contents of the given file with the given bytes atomically: they
+        are written to a file of their own in the same directory first, so that
+        readers (and other processes doing the same) never see a partial file.
+    '''
+    (tmp_fd, tmp_filename) = tempfile.mkstemp(prefix = os.path.basename(filename) + '.', suffix = '.tmp', \
+        dir = os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(tmp_fd, 'wb') as tmp_file_ptr:
+            tmp_file_ptr.write(data)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+def _is_legacy_format(filename):
+    with open(filename, 'r') as json_file_ptr:
+        for line in json_file_ptr:
+            if line.strip():
+                return line.strip().startswith('[')
+    return False
+
+def _parse_legacy_records(contents):
+    '''
+        @return
+        The list of credentials records in the given contents of a JSON-array
+        credentials file. Older versions appended one array per save, right after
+        the previous one, so every array in the file is read.
+    '''
+    decoder = json.JSONDecoder()
+    records = []
+    position = 0
+    while True:
+        while position < len(contents) and contents[position].isspace():
+            position += 1
+        if position >= len(contents):
+            return records
+        (array, position) = decoder.raw_decode(contents, position)
+        records.extend(array)
+
+def migrate_credentials(filename):
+    '''
+        @description
+        Convert the given credentials file from the JSON-array format (written by older
+        versions) to the JSON-lines format, in place; does nothing if the file is
+        already in the JSON-lines format.
+
+        @return
+        True if the file has been converted, False otherwise.
+    '''
+    if not os.path.exists(filename) or not _is_legacy_format(filename):
+        return False
+    with open(filename, 'r') as json_file_ptr:
+        contents = json_file_ptr.read()
+    if not contents.lstrip().startswith('['):
+        # Another process has just migrated the file.
+        return False
+    lines = [json.dumps(record, sort_keys = True) + '\n' for record in _parse_legacy_records(contents)]
+    _replace_file(filename, ''.join(lines).encode('utf-8'))
+    try:
+        os.remove(filename + _INDEX_FILE_EXTENSION)
+    except FileNotFoundError:
+        pass
+    return True
+
+class JsonCredentialStore:
+    def __init__(self, filename, use_index = True):
+        '''
+            @description
+            JSON-lines credentials file, with an optional email -> offset index file
+            alongside it. Saving credentials appends to the end of both files, without
+            reading or rewriting what is already there; with the index, a single
+            account can be looked up without reading the whole file.
+            A file in the older JSON-array format is migrated first.
+            Both the migration and rewrites of the index replace the file atomically,
+            so that processes that open the same store at the same time do not trip
+            over each other.
+
+            @param filename
+            Name of the credentials file; it is created by the first append if it
+            does not exist yet.
+
+            @param use_index
+            (Optional) If False, the index file is neither read nor written.
+        '''
+        self.filename = filename
+        self.index_filename = filename + _INDEX_FILE_EXTENSION if use_index else None
+        # Guards both files, and the in-memory copy of the index.
+        self.lock = threading.RLock()
+        # Email -> offset; loaded from the index file the first time that it is needed
+        self.offsets = None
+
+        migrate_credentials(filename)
+
+    def _read_index_file(self):
+        '''
+            @return
+            (email -> offset dictionary, checkpoint) read from the index file; the
+            checkpoint is the [size, mtime] of the credentials file as of the last
+            time that the index was written (None if the index file predates them).
+        '''
+        offsets = {}
+        checkpoint = None
+        if not os.path.exists(self.index_filename):
+            return (offsets, checkpoint)
+        with open(self.index_filename, 'r') as index_file_ptr:
+            for line in index_file_ptr:
+                try:
+                    entry = json.loads(line)
+                    if 'email' in entry:
+                        offsets[entry['email']] = entry['offset']
+                    else:
+                        checkpoint = [entry['size'], entry['mtime']]
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return (offsets, checkpoint)
+
+    def _is_index_current(self, json_file_ptr, offsets, checkpoint):
+        '''
+            @return
+            True if the given index entries still point at the right lines of the
+            credentials file (that may have been appended to since), False if the
+            file has been edited, replaced or truncated behind the index's back.
+        '''
+        file_stat = os.fstat(json_file_ptr.fileno())
+        if checkpoint == [file_stat.st_size, file_stat.st_mtime_ns]:
+            return True
+        if checkpoint and file_stat.st_size <= checkpoint[0]:
+            # The file has changed, but has not grown; i.e., it has been rewritten.
+            return False
+        # Appends leave every line where it was; anything else would almost certainly
+        # move the last indexed line.
+        (email, offset) = max(offsets.items(), key = lambda entry: entry[1])
+        if offset >= file_stat.st_size:
+            return False
+        record = _read_record(json_file_ptr, offset)
+        return record is not None and record['email'] == email
+
+    def _write_index(self, entries, rewrite = False):
+        '''
+            @description
+            Append the given {email, offset} entries to the index file (or replace its
+            contents with them, if rewrite is true), followed by a checkpoint of the
+            credentials file's current size and modification time.
+        '''
+        file_stat = os.stat(self.filename)
+        lines = [json.dumps(entry, sort_keys = True) + '\n' for entry in entries]
+        lines.append(json.dumps({'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns}, sort_keys = True) + '\n')
+        if rewrite:
+            _replace_file(self.index_filename, ''.join(lines).encode('utf-8'))
+            return
+        # A single write, so that lines appended by other processes are not interleaved with these.
+        with open(self.index_filename, 'a') as index_file_ptr:
+            index_file_ptr.write(''.join(lines))
+
+    def _load_index(self, rebuild = False):
+        '''
+            @description
+            Load the index, catching it up with the lines appended to the credentials
+            file since it was last written; the index is rebuilt from scratch if the
+            credentials file has been changed in any other way (or if rebuild is true).
+
+            @return
+            The email -> offset dictionary.
+        '''
+        if self.offsets is not None and not rebuild:
+            return self.offsets
+        if not os.path.exists(self.filename):
+            # Nothing has been saved yet; the index is (re)written by the first append.
+            self.offsets = {}
+            return self.offsets
+        (offsets, checkpoint) = ({}, None) if rebuild else self._read_index_file()
+
+        with open(self.filename, 'rb') as json_file_ptr:
+            if offsets and not self._is_index_current(json_file_ptr, offsets, checkpoint):
+                (offsets, checkpoint) = ({}, None)
+            # Index every line after the last indexed one.
+            catch_up_offset = 0
+            if offsets:
+                json_file_ptr.seek(max(offsets.values()))
+                json_file_ptr.readline()
+                catch_up_offset = json_file_ptr.tell()
+            new_entries = []
+            for (offset, record) in _iter_records(json_file_ptr, catch_up_offset):
+                offsets[record['email']] = offset
+                new_entries.append({'email': record['email'], 'offset': offset})
+            file_stat = os.fstat(json_file_ptr.fileno())
+
+        if new_entries or checkpoint != [file_stat.st_size, file_stat.st_mtime_ns]:
+            self._write_index(new_entries, rewrite = catch_up_offset == 0)
+        self.offsets = offsets
+        return offsets
+
+    def append(self, credentials):
+        '''
+            @description
+            Append the given credentials to the file (and index); credentials for an
+            email address that is already stored supersede the stored ones.
+
+            @param credentials
+            AccountCredentialsSource (e.g., AccountCredentialsCollection), or any
+            iterable of AccountCredentials.
+
+            @return
+            The number of credentials saved.
+        '''
+        with self.lock:
+            offsets = self._load_index() if self.index_filename else None
+            new_entries = []
+            with open(self.filename, 'ab') as json_file_ptr:
+                offset = json_file_ptr.tell()
+                if offset > 0:
+                    # Do not glue the first new line onto a line cut short by a crash.
+                    with open(self.filename, 'rb') as check_file_ptr:
+                        check_file_ptr.seek(offset - 1)
+                        if check_file_ptr.read(1) != b'\n':
+                            json_file_ptr.write(b'\n')
+                            offset += 1
+                for creds in credentials:
+                    line = (json.dumps(creds.to_std_structure(), sort_keys = True) + '\n').encode('utf-8')
+                    json_file_ptr.write(line)
+                    new_entries.append({'email': creds.email, 'offset': offset})
+                    offset += len(line)
+
+            if self.index_filename:
+                # Without any other entry, the index may still be that of a deleted file.
+                self._write_index(new_entries, rewrite = not offsets)
+                for entry in new_entries:
+                    offsets[entry['email']] = entry['offset']
+            return len(new_entries)
+
+    def get(self, email):
+        '''
+            @return
+            The AccountCredentials of the given email address, or None if it is not stored.
+        '''
+        with self.lock:
+            if not self.index_filename:
+                latest_credentials = None
+                for creds in self._iter_all_lines():
+                    if creds.email == email:
+                        latest_credentials = creds
+                return latest_credentials
+
+            record = self._read_indexed_record(self._load_index(), email)
+            if record is None or record['email'] != email:
+                # The credentials file has been edited behind the index's back.
+                record = self._read_indexed_record(self._load_index(rebuild = True), email)
+            return _to_account_credentials(record) if record else None
+
+    def _read_indexed_record(self, offsets, email):
+        offset = offsets.get(email)
+        if offset is None:
+            return None
+        with open(self.filename, 'rb') as json_file_ptr:
+            return _read_record(json_file_ptr, offset)
+
+    def _iter_all_lines(self):
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'rb') as json_file_ptr:
+            for (offset, record) in _iter_records(json_file_ptr):
+                yield _to_account_credentials(record)
+
+    def iter_credentials(self):
+        '''
+            @description
+            Generator over every stored AccountCredentials, in file order, reading one
+            line at a time. With the index, superseded lines are skipped; without it,
+            every line is returned.
+        '''
+        if not self.index_filename:
+            for creds in self._iter_all_lines():
+                yield creds
+            return
+        with self.lock:
+            offsets = dict(self._load_index())
+        if not offsets:
+            return
+        with open(self.filename, 'rb') as json_file_ptr:
+            for (offset, record) in _iter_records(json_file_ptr):
+                if offsets.get(record['email']) == offset:
+                    yield _to_account_credentials(record)
+
+    def count(self):
+        with self.lock:
+            if self.index_filename:
+                return len(self._load_index())
+        return sum(1 for creds in self._iter_all_lines())
+
+    def get_all(self):
+        '''
+            @return
+            AccountCredentialsCollection object with every stored credentials.
+        '''
+        credentials = list(self.iter_credentials())
+        return AccountCredentialsCollection([creds.email for creds in credentials], \
+            [creds.password for creds in credentials])
+
+    def get_source(self):
+        return JsonCredentialStoreSource(self)
+
+class JsonCredentialStoreSource(AccountCredentialsSource):
+    def __init__(self, store):
+        '''
+            @description
+            Lazy AccountCredentialsSource over a JsonCredentialStore; every iteration
+            streams the file anew. The number of accounts is counted once, when the
+            source is created (from the index, if there is one).
+        '''
+        self.store = store
+        self.num_credentials = store.count()
+
+    def __iter__(self):
+        return self.store.iter_credentials()
+
+    def size(self):
+        return self.num_credentials
+
 def process_credentials(filename):
     '''
         @description
@@ -14,11 +383,15 @@ def process_credentials(filename):
         @return
         An AccountCredentialsCollection object with the credentials in the given JSON file.
     '''
-    with open(filename, 'r') as json_file_ptr:
-        json_credentials = json.load(json_file_ptr)
-        email_list = [json_obj['email'] for json_obj in json_credentials]
-        password_list = [Password(json_obj['password'], json_obj['salt']) for json_obj in json_credentials]
-        return AccountCredentialsCollection(email_list, password_list)
+    return JsonCredentialStore(filename).get_all()
+
+def stream_credentials(filename):
+    '''
+        @return
+        AccountCredentialsSource that reads the credentials from the given JSON file as
+        they are needed, instead of loading them all into memory.
+    '''
+    return JsonCredentialStore(filename).get_source()
 
 def save_credentials(filename, email_addresses, passwords, delimiter = ','):
     '''
@@ -37,10 +410,13 @@ def save_credentials(filename, email_addresses, passwords, delimiter = ','):
 
         @param delimiter
         The separator between email addresses and passwords (e.g., a comma).
+
+        @return
+        AccountCredentialsCollection with the provided credentials info, which has also been
+        appended to the specified JSON file.
     '''
     email_address_list = [addr.strip() for addr in email_addresses.split(delimiter)]
     password_list = [Password(p.strip()) for p in passwords.split(delimiter)]
     creds_collection = AccountCredentialsCollection(email_address_list, password_list)
-    with open(filename, 'a') as json_file_ptr:
-    	json.dump(creds_collection.to_std_structure(), json_file_ptr, sort_keys = True, indent = 4, separators = (',', ':'))
-    return process_credentials(filename)
\ No newline at end of file
+    JsonCredentialStore(filename).append(creds_collection)
+    return creds_collection
\ No newline at end of file
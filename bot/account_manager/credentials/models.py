@@ -16,7 +16,28 @@ class AccountCredentials:
     def to_std_structure(self):
         return {'email': self.email, 'salt': self.password.salt, 'password': self.password.password}
 
-class AccountCredentialsCollection:
+class AccountCredentialsSource:
+    '''
+        Sequence of AccountCredentials that can be iterated over (more than once) without
+        holding every account in memory; e.g., a cursor over a credentials database.
+    '''
+    def __iter__(self):
+        raise NotImplementedError()
+
+    def size(self):
+        '''
+            @return
+            The number of accounts, without iterating over them.
+        '''
+        raise NotImplementedError()
+
+    def __len__(self):
+        return self.size()
+
+    def to_std_structure(self):
+        return [obj.to_std_structure() for obj in self]
+
+class AccountCredentialsCollection(AccountCredentialsSource):
     def __init__(self, email_list, password_list):
         '''
             @param email_list
@@ -29,8 +50,8 @@ class AccountCredentialsCollection:
         num_creds = len(email_list)
         self.credentials_collection = [AccountCredentials(email_list[i], password_list[i]) for i in range(0, num_creds)]
 
-    def to_std_structure(self):
-        return [obj.to_std_structure() for obj in self.credentials_collection]
+    def __iter__(self):
+        return iter(self.credentials_collection)
 
     def size(self):
-        return len(self.to_std_structure())
\ No newline at end of file
+        return len(self.credentials_collection)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from simplesecurity import decrypt_bytes, encrypt_bytes, generate_key
+
+_KEY_FILENAME = '.key'
+_SESSION_FILE_EXTENSION = '.session'
+
+class SessionStore:
+    def __init__(self, directory):
+        '''
+            @description
+            Persists the authenticated cookies of Bing Rewards accounts across runs,
+            so that the next run can restore a session instead of going through the
+            login form. Each account's cookies are stored encrypted, in a file of
+            their own, keyed by the account's email address.
+
+            @param directory
+            Directory in which the sessions are stored; it is created if it does
+            not exist yet, along with the secret key that the sessions are encrypted
+            with.
+        '''
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.key = self._load_key()
+
+    def _write_temp_file(self, data, mode):
+        '''
+            @return
+            The name of a new file in the store's directory (that only the current user
+            may read) with the given contents; for the caller to move into place.
+        '''
+        (fd, tmp_path) = tempfile.mkstemp(suffix = '.tmp', dir = self.directory)
+        with os.fdopen(fd, mode) as tmp_file_ptr:
+            tmp_file_ptr.write(data)
+        return tmp_path
+
+    def _load_key(self):
+        key_path = os.path.join(self.directory, _KEY_FILENAME)
+        if not os.path.exists(key_path):
+            # The key is written in full before it is linked into place, so that
+            # processes that start at the same time never read a partial key; if
+            # another process has linked its key first, that one is used.
+            tmp_key_path = self._write_temp_file(generate_key(), 'wb')
+            try:
+                os.link(tmp_key_path, key_path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp_key_path)
+        with open(key_path, 'rb') as key_file_ptr:
+            return key_file_ptr.read()
+
+    def _get_session_path(self, email):
+        # Hash the email address, so that file names do not reveal it.
+        digest = hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + _SESSION_FILE_EXTENSION)
+
+    def _get_account_key(self, email):
+        return hashlib.sha256(self.key + email.strip().lower().encode('utf-8')).digest()
+
+    def save(self, email, cookies):
+        '''
+            @param email
+            Email address of the Bing Rewards account.
+
+            @param cookies
+            List of cookie dictionaries (see Browser.get_cookies).
+        '''
+        token = encrypt_bytes(self._get_account_key(email), json.dumps(cookies).encode('utf-8'))
+        # A temporary file of its own, since the desktop and mobile bots of an
+        # account may save its session at the same time.
+        tmp_session_path = self._write_temp_file(token, 'w')
+        try:
+            os.replace(tmp_session_path, self._get_session_path(email))
+        except OSError:
+            os.remove(tmp_session_path)
+            raise
+
+    def load(self, email):
+        '''
+            @return
+            The list of cookie dictionaries saved for the given account, or None if
+            there is no (readable) saved session for it.
+        '''
+        session_path = self._get_session_path(email)
+        if not os.path.exists(session_path):
+            return None
+        with open(session_path, 'r') as session_file_ptr:
+            plaintext = decrypt_bytes(self._get_account_key(email), session_file_ptr.read())
+        return json.loads(plaintext.decode('utf-8')) if plaintext else None
+
+    def delete(self, email):
+        session_path = self._get_session_path(email)
+        if os.path.exists(session_path):
+            os.remove(session_path)
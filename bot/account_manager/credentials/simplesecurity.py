@@ -1,7 +1,10 @@
 import base64
+import binascii
+import os
 import random
 
-from randomwordgenerator import backup
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 class Password:
     def __init__(self, password, salt = None):
@@ -37,9 +40,8 @@ class Password:
             @param unencrypted_password
             Unencrypted new password value.
         '''
-        num_words = random.randint(2, 10)
-        word_len_bounds = (12, 20)
-        self.salt = ''.join(backup.get_n_random_words(num_words, word_len_bounds))
+        num_salt_bytes = random.randint(12, 32)
+        self.salt = binascii.hexlify(os.urandom(num_salt_bytes)).decode('utf-8')
         password_and_salt_bytes = (unencrypted_password + self.salt).encode('utf-8')
         self._password = base64.b64encode(password_and_salt_bytes).decode('utf-8')
 
@@ -50,4 +52,49 @@ class Password:
             In other words, the original (decrypted) password.
         '''
         password_and_salt = base64.b64decode(self._password.encode('utf-8')).decode('utf-8')
-        return password_and_salt[:password_and_salt.rfind(self.salt)]
\ No newline at end of file
+        return password_and_salt[:password_and_salt.rfind(self.salt)]
+
+'''
+    Authenticated Encryption Utilities
+    A token is base64(nonce + ciphertext), where the ciphertext is the plaintext
+    encrypted with AES-256-GCM (and ends with its authentication tag).
+'''
+_NONCE_SIZE = 12
+
+def encrypt_bytes(key, plaintext):
+    '''
+        @param key
+        Secret key (bytes), e.g., from generate_key.
+
+        @param plaintext
+        Bytes to encrypt.
+
+        @return
+        A base64 string with the encrypted and authenticated plaintext.
+    '''
+    nonce = os.urandom(_NONCE_SIZE)
+    return base64.b64encode(nonce + AESGCM(key).encrypt(nonce, plaintext, None)).decode('utf-8')
+
+def decrypt_bytes(key, token):
+    '''
+        @param key
+        Secret key (bytes) that the token was encrypted with.
+
+        @param token
+        A string returned by encrypt_bytes.
+
+        @return
+        The original plaintext bytes, or None if the token has been tampered with
+        or was encrypted with another key (or by an older version).
+    '''
+    try:
+        data = base64.b64decode(token.encode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+    try:
+        return AESGCM(key).decrypt(data[:_NONCE_SIZE], data[_NONCE_SIZE:], None)
+    except (InvalidTag, ValueError):
+        return None
+
+def generate_key():
+    return AESGCM.generate_key(bit_length = 256)
\ No newline at end of file
@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String
+import threading
 
-from models import AccountCredentialsCollection
+from sqlalchemy import create_engine, event, func, select, text, MetaData, Table, Column, Integer, String
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import QueuePool
+
+from models import AccountCredentials, AccountCredentialsCollection, AccountCredentialsSource
 from simplesecurity import Password
 
 '''
@@ -12,65 +16,206 @@ _credentials_table = Table('credentials', MetaData(), \
     Column('password', String), \
     Column('salt', String))
 
-# Database Management Decorator
-def _manage_database_connection(function):
-    '''
-        @param function
-        Function being wrapped by this decorator.
+_DEFAULT_BATCH_SIZE = 1000
+
+# Version of the schema, kept in the database's user_version pragma (see _migrate);
+# 1: each email address is stored at most once (unique index on email).
+_SCHEMA_VERSION = 1
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
     '''
-    def func_wrapper(db, *args, **kwargs):
-        '''
-            @param db
-            Initially the name of the database file that we will opening
-            a connection to and modifying.
-            Will be changed to the database connection within this decorator.
-        '''
-        # Open database connection to the specified database file.
-        db_engine = create_engine('sqlite:///' + db)
-        _credentials_table.create(db_engine, checkfirst = True)
-        db_conn = db_engine.connect()
-        
-        # db is initially the database file name.
-        # Replace it now with the database connection.
-        db = db_conn
-
-        # Execute the function.
-        function_output = function(db, *args, **kwargs)
-
-        # Close connection now that we're        
-        db_conn.close()
-
-        return function_output
-    return func_wrapper
-
-# Credentials Table Utility Functions
-@_manage_database_connection
-def _save_credentials(db, credentials_collection):
+        @description
+        Put every new SQLite connection in WAL mode, so that readers (e.g., the GUI)
+        are not blocked by a writer, and only sync to disk at WAL checkpoints.
     '''
-        @param db
-        User specifies the database file name.
-        The decorator, _manage_database_connection, will open a connection to the
-        specified database file and replace this value with the connection instead.
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
 
-        @param credentials_collection
-        AccountCredentialsCollection object
+def _migrate(db_conn, filename):
     '''
-    db.execute(_credentials_table.insert(), credentials_collection.to_std_structure())
-
-@_manage_database_connection
-def _get_all_credentials(db):
+        @description
+        Bring the given database up to _SCHEMA_VERSION, once; databases that are
+        already up to date are left alone.
     '''
-        @param db
-        User specifies the database file name.
-        The decorator, _manage_database_connection, will open a connection to the
-        specified database file and replace this value with the connection instead.
+    if db_conn.execute(text('PRAGMA user_version')).scalar() >= _SCHEMA_VERSION:
+        return
+    # Databases written before the unique index existed may hold duplicates; keep
+    # the most recently saved credentials of each email address.
+    num_duplicates = db_conn.execute(text('SELECT COUNT(*) - COUNT(DISTINCT email) FROM credentials')).scalar()
+    if num_duplicates:
+        print('Removing ' + str(num_duplicates) + ' superseded duplicate credentials from ' + filename)
+        db_conn.execute(text('DELETE FROM credentials WHERE credentials_id NOT IN ' + \
+            '(SELECT MAX(credentials_id) FROM credentials GROUP BY email)'))
+    db_conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_credentials_email ON credentials (email)'))
+    db_conn.execute(text('PRAGMA user_version = ' + str(_SCHEMA_VERSION)))
+
+def _to_account_credentials(row):
+    return AccountCredentials(row.email, Password(row.password, row.salt))
+
+class CredentialStore:
+    def __init__(self, filename, pool_size = 5):
+        '''
+            @description
+            Credentials table of a SQLite database file, with a single engine (and
+            connection pool) for the lifetime of the object; so, unlike opening the
+            file for every operation, the schema is only checked once.
+            Each email address is stored at most once (there is a unique index on it);
+            saving credentials for an email address that is already stored updates them.
+            Databases written by older versions are migrated the first time that they
+            are opened (see _migrate).
+
+            @param filename
+            Name of the database file; it is created if it does not exist yet.
+
+            @param pool_size
+            (Optional) Number of connections to keep open.
+        '''
+        self.filename = filename
+        self.engine = create_engine('sqlite:///' + filename, poolclass = QueuePool, pool_size = pool_size, \
+            connect_args = {'check_same_thread': False})
+        event.listen(self.engine, 'connect', _configure_sqlite_connection)
+        with self.engine.begin() as db_conn:
+            _credentials_table.create(db_conn, checkfirst = True)
+            _migrate(db_conn, filename)
+
+    def upsert(self, credentials, batch_size = _DEFAULT_BATCH_SIZE):
+        '''
+            @description
+            Insert the given credentials, or update the password of those whose email
+            address is already stored; in batches of batch_size rows per statement,
+            all within a single transaction.
+
+            @param credentials
+            AccountCredentialsSource (e.g., AccountCredentialsCollection), or any
+            iterable of AccountCredentials.
+
+            @return
+            The number of credentials saved.
+        '''
+        statement = sqlite_insert(_credentials_table)
+        statement = statement.on_conflict_do_update(index_elements = ['email'], \
+            set_ = {'password': statement.excluded.password, 'salt': statement.excluded.salt})
+
+        num_saved = 0
+        batch = []
+        with self.engine.begin() as db_conn:
+            for creds in credentials:
+                batch.append(creds.to_std_structure())
+                if len(batch) >= batch_size:
+                    db_conn.execute(statement, batch)
+                    num_saved += len(batch)
+                    batch = []
+            if batch:
+                db_conn.execute(statement, batch)
+                num_saved += len(batch)
+        return num_saved
+
+    def count(self):
+        with self.engine.connect() as db_conn:
+            return db_conn.execute(select(func.count()).select_from(_credentials_table)).scalar()
+
+    def get(self, email):
+        '''
+            @return
+            The AccountCredentials of the given email address, or None if it is not stored.
+        '''
+        with self.engine.connect() as db_conn:
+            row = db_conn.execute(_credentials_table.select().where(_credentials_table.c.email == email)).first()
+        return _to_account_credentials(row) if row else None
+
+    def get_page(self, page_index, page_size = _DEFAULT_BATCH_SIZE):
+        '''
+            @return
+            A list with the AccountCredentials of the given page (0-based) of
+            page_size credentials, in the order in which they were first saved.
+        '''
+        query = _credentials_table.select().order_by(_credentials_table.c.credentials_id) \
+            .limit(page_size).offset(page_index * page_size)
+        with self.engine.connect() as db_conn:
+            return [_to_account_credentials(row) for row in db_conn.execute(query)]
 
+    def iter_credentials(self, batch_size = _DEFAULT_BATCH_SIZE):
+        '''
+            @description
+            Generator over every stored AccountCredentials, in the order in which they
+            were first saved. Rows are read batch_size at a time, each batch starting
+            after the last id of the previous one, so that memory use does not grow
+            with the size of the store, and no batch re-scans the rows before it.
+        '''
+        last_credentials_id = 0
+        while True:
+            query = _credentials_table.select() \
+                .where(_credentials_table.c.credentials_id > last_credentials_id) \
+                .order_by(_credentials_table.c.credentials_id).limit(batch_size)
+            with self.engine.connect() as db_conn:
+                rows = db_conn.execute(query).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _to_account_credentials(row)
+            last_credentials_id = rows[-1].credentials_id
+
+    def get_all(self):
+        '''
+            @return
+            AccountCredentialsCollection object with every stored credentials.
+        '''
+        email_address_list = []
+        password_list = []
+        for creds in self.iter_credentials():
+            email_address_list.append(creds.email)
+            password_list.append(creds.password)
+        return AccountCredentialsCollection(email_address_list, password_list)
+
+    def get_source(self):
+        '''
+            @return
+            A CredentialStoreSource over this store, which streams the credentials
+            instead of loading them all up front.
+        '''
+        return CredentialStoreSource(self)
+
+    def delete(self, email):
+        with self.engine.begin() as db_conn:
+            db_conn.execute(_credentials_table.delete().where(_credentials_table.c.email == email))
+
+    def close(self):
+        self.engine.dispose()
+
+class CredentialStoreSource(AccountCredentialsSource):
+    def __init__(self, store, batch_size = _DEFAULT_BATCH_SIZE):
+        '''
+            @description
+            Lazy AccountCredentialsSource over a CredentialStore; every iteration is a
+            new stream over the store (see CredentialStore.iter_credentials).
+            The number of accounts is counted once, when the source is created.
+        '''
+        self.store = store
+        self.batch_size = batch_size
+        self.num_credentials = store.count()
+
+    def __iter__(self):
+        return self.store.iter_credentials(self.batch_size)
+
+    def size(self):
+        return self.num_credentials
+
+# One store per database file, shared by every caller within the process.
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_credential_store(filename):
+    '''
         @return
-        A list of dictionaries, where each dict contains the info from a row in
-        _credentials_table.
+        The CredentialStore of the given database file; it is only opened the first
+        time that it is requested.
     '''
-    return [{'email': creds.email, 'password': creds.password, 'salt': creds.salt} \
-        for creds in db.execute(_credentials_table.select())]
+    with _stores_lock:
+        if filename not in _stores:
+            _stores[filename] = CredentialStore(filename)
+        return _stores[filename]
 
 '''
     Publically Exposed Credentials Management Functions
@@ -85,10 +230,18 @@ def process_credentials(filename):
         AccountCredentialsCollection object with the credentials info in the
         given database file.
     '''
-    all_creds = _get_all_credentials(filename)
-    email_address_list = [c['email'] for c in all_creds]
-    password_list = [Password(c['password'], c['salt']) for c in all_creds]
-    return AccountCredentialsCollection(email_address_list, password_list)
+    return get_credential_store(filename).get_all()
+
+def stream_credentials(filename):
+    '''
+        @param filename
+        Name of the database file with the credentials info.
+
+        @return
+        AccountCredentialsSource that reads the credentials from the given database
+        file as they are needed, instead of loading them all into memory.
+    '''
+    return get_credential_store(filename).get_source()
 
 def save_credentials(filename, email_addresses, passwords, delimiter = ','):
     '''
@@ -112,5 +265,5 @@ def save_credentials(filename, email_addresses, passwords, delimiter = ','):
     # Salt and encrypt provided passwords.
     password_list = [Password(p.strip()) for p in passwords.split(delimiter)]
     creds_collection = AccountCredentialsCollection(email_address_list, password_list)
-    _save_credentials(filename, creds_collection)
+    get_credential_store(filename).upsert(creds_collection)
     return creds_collection
\ No newline at end of file
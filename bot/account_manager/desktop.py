@@ -1,13 +1,17 @@
 import enum
+from urllib.parse import urljoin
 
-from browser_automation_utils.browser import AttributeType
+from browser_automation_utils.browser import AttributeType, ElementQuery
 from base import *
 from decorators import *
+from htmlstats import HtmlDocument
 
 # Constants
 DAILY_CURRENT_PC_OFFER_POINTS_XPATH = '//*[@id="credits"]/div[2]/span[1]/span'
 DAILY_CURRENT_PC_POINTS_XPATH = '//div[@id="credits"]/div[2]/span[2]/span'
 SPECIAL_OFFERS_PC_PARENT_XPATH = '//*[@id="dashboard_wrapper"]/div[1]/div[1]/ul'
+TOTAL_PC_POINTS_XPATH = '//*[@id="id_rc"]'
+STATS_IFRAME_XPATH = '//*[@id="bepfm"]'
 
 class DesktopAccountManager(AbstractAccountManager):
     def _load_login_form(self):
@@ -21,50 +25,69 @@ class DesktopAccountManager(AbstractAccountManager):
         self.browser.click(AttributeType.Id, 'id_s')
         self.browser.click(AttributeType.ClassName, 'id_link_text')
 
-    @convert_result_to_uint
     @open_stats_iframe
-    def _get_daily_statistics(self, target_xpath):
+    def _scrape_daily_statistics(self):
         '''
             @description
-                Navigate to the Bing Rewards dashboard, open the points flyout,
-                and get the specified daily statistic.
-
-            @param target_xpath
-                XPath of the target daily stat element
+                Open the points flyout, and read both daily statistics from it.
 
             @return
-                A 2-element list, where the first element is the current get_value
-                of the daily stat, and the second is the max possible value for that 
-                stat. If we are unable to read either value, then return [-1,-1].
+                A ([current, maximum] device points, [current, maximum] offer points)
+                tuple; unreadable values are -1.
+        '''
+        daily_statistics = self.browser.query({
+            'device': ElementQuery(AttributeType.XPath, DAILY_CURRENT_PC_POINTS_XPATH),
+            'offer': ElementQuery(AttributeType.XPath, DAILY_CURRENT_PC_OFFER_POINTS_XPATH)
+        })
+        return (parse_point_ratio(daily_statistics['device']), parse_point_ratio(daily_statistics['offer']))
+
+    def _scrape_stats(self):
+        # The total is displayed on the flyout's button, so read it before opening the flyout.
+        total = self.browser.query({'total': ElementQuery(AttributeType.Id, 'id_rc')})['total']
+        total_points = parse_points(total, 0)
+        (daily_device_points, daily_offer_points) = self._scrape_daily_statistics()
+        return {
+            'total_points': total_points,
+            'daily_device_points': daily_device_points,
+            'daily_offer_points': daily_offer_points
+        }
+
+    def _fetch_stats(self):
         '''
-        output = [-1, -1]
-        daily_points = self.browser.get_value(AttributeType.XPath, target_xpath)
-        if daily_points:
-            output = daily_points.split('/')
-        return output
+            The total is on every Bing page, and the daily statistics are in the
+            flyout page that the "bepfm" iframe loads, so fetch both pages directly.
+        '''
+        page = self.http_client.get_page(BING_URL)
+        if not page:
+            return None
+        document = HtmlDocument(page)
+        flyout_url = document.get_attribute(STATS_IFRAME_XPATH, 'src')
+        flyout_page = self.http_client.get_page(urljoin(BING_URL + '/', flyout_url)) if flyout_url else None
+        if not flyout_page:
+            return None
+        flyout_document = HtmlDocument(flyout_page)
+        stats = {
+            'total_points': parse_points(document.get_text(TOTAL_PC_POINTS_XPATH), 0),
+            'daily_device_points': parse_point_ratio(flyout_document.get_text(DAILY_CURRENT_PC_POINTS_XPATH)),
+            'daily_offer_points': parse_point_ratio(flyout_document.get_text(DAILY_CURRENT_PC_OFFER_POINTS_XPATH))
+        }
+        return stats if -1 not in stats['daily_device_points'] else None
 
     def get_device_class(self):
         return 'PC'
 
     @go_to_and_return_from(DASHBOARD_URL)
     def get_special_offer_links(self):
-        return self.browser.get_child_attributes(AttributeType.XPath, \
-            SPECIAL_OFFERS_PC_PARENT_XPATH, 'href', 2)
-
-    @convert_result_to_uint
-    def get_total_num_points(self):
-        return self.browser.get_value(AttributeType.Id, 'id_rc')
-
-    def get_daily_device_points(self):
-        return self._get_daily_statistics(DAILY_CURRENT_PC_POINTS_XPATH)
-
-    def get_daily_offer_points(self):
-        return self._get_daily_statistics(DAILY_CURRENT_PC_OFFER_POINTS_XPATH)
+        links = self.browser.query({
+            'links': ElementQuery(AttributeType.XPath, SPECIAL_OFFERS_PC_PARENT_XPATH, 'href', True, 2)
+        })['links']
+        return [link for link in links if link]
 
     def sign_out(self):
+        # Clicking the user name opens a menu; click() then waits for the
+        # sign-out link in it to become clickable.
         self.browser.click(AttributeType.Id, 'id_n')
-        self.browser.sleep(5)
-        self.browser.click(AttributeType.XPath, '//*[@id="b_idProviders"]/li/a/span[2]')
-        self.browser.sleep(5)
+        self.browser.click(AttributeType.XPath, '//*[@id="b_idProviders"]/li/a/span[2]', \
+            wait_for_navigation = True)
         return self.browser.get_value(AttributeType.Id, 'id_n') and \
             self.browser.get_value(AttributeType.Id, 'id_n').strip() != ''
\ No newline at end of file
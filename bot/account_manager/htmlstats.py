@@ -0,0 +1,127 @@
+import re
+from html.parser import HTMLParser
+
+'''
+    Minimal HTML document model for reading the points counters out of fetched
+    pages, without a browser. Elements are located with the same XPaths that the
+    account managers hand to Selenium, restricted to the subset that they use:
+    an id-anchored element followed by child steps, e.g.,
+    //*[@id="credits"]/div[2]/span[1]/span
+'''
+_VOID_TAGS = set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', \
+    'source', 'track', 'wbr'])
+_RAW_TEXT_TAGS = set(['script', 'style'])
+_XPATH_ANCHOR_REGEX = re.compile(r'^//(\*|\w+)\[@id="([^"]+)"\]')
+_XPATH_STEP_REGEX = re.compile(r'/(\*|\w+)(?:\[(\d+)\])?')
+
+class _HtmlElement:
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        # Child elements and text strings, in document order
+        self.children = []
+
+    def get_child_elements(self, tag):
+        return [child for child in self.children \
+            if isinstance(child, _HtmlElement) and (tag == '*' or child.tag == tag)]
+
+    def get_text(self):
+        chunks = []
+        for child in self.children:
+            chunks.append(child.get_text() if isinstance(child, _HtmlElement) else child)
+        return ''.join(chunks)
+
+class _HtmlTreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs = True)
+        self.root = _HtmlElement('#document', {})
+        self.stack = [self.root]
+        self.ids = {}
+
+    def handle_starttag(self, tag, attrs):
+        element = _HtmlElement(tag, dict(attrs))
+        self.stack[-1].children.append(element)
+        # Keep the first element per id, like document.getElementById.
+        if element.attrs.get('id') and element.attrs['id'] not in self.ids:
+            self.ids[element.attrs['id']] = element
+        if tag not in _VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed elements: close everything up to the matching start tag,
+        # and ignore end tags that do not match any open element.
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self.stack[-1].tag not in _RAW_TEXT_TAGS:
+            self.stack[-1].children.append(data)
+
+class HtmlDocument:
+    def __init__(self, html):
+        '''
+            @param html
+            (Required) Markup of the page, as a string.
+        '''
+        builder = _HtmlTreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.ids = builder.ids
+
+    def select(self, xpath):
+        '''
+            @param xpath
+            An XPath of the form //tag[@id="..."]/tag[n]/..., where tag may be "*" and
+            the [n] (1-based) indices are optional.
+
+            @return
+            The first element that matches the given XPath, or None.
+        '''
+        anchor_match = _XPATH_ANCHOR_REGEX.match(xpath)
+        if not anchor_match:
+            raise ValueError('Unsupported XPath: ' + xpath)
+        (tag, element_id) = anchor_match.groups()
+        anchor = self.ids.get(element_id)
+        if not anchor or (tag != '*' and anchor.tag != tag):
+            return None
+
+        elements = [anchor]
+        position = anchor_match.end()
+        while position < len(xpath):
+            step_match = _XPATH_STEP_REGEX.match(xpath, position)
+            if not step_match:
+                raise ValueError('Unsupported XPath: ' + xpath)
+            (tag, index) = step_match.groups()
+            next_elements = []
+            for element in elements:
+                children = element.get_child_elements(tag)
+                if index is None:
+                    next_elements.extend(children)
+                elif int(index) <= len(children):
+                    next_elements.append(children[int(index) - 1])
+            elements = next_elements
+            position = step_match.end()
+        return elements[0] if elements else None
+
+    def get_text(self, xpath):
+        '''
+            @return
+            The stripped text content of the element at the given XPath, or None.
+        '''
+        element = self.select(xpath)
+        return element.get_text().strip() if element else None
+
+    def get_attribute(self, xpath, attribute):
+        '''
+            @return
+            The value of the given attribute of the element at the given XPath, or None.
+        '''
+        element = self.select(xpath)
+        return element.attrs.get(attribute) if element else None
\ No newline at end of file
@@ -1,13 +1,15 @@
-from browser_automation_utils.browser import AttributeType
+from browser_automation_utils.browser import AttributeType, ElementQuery
 from base import *
 from decorators import *
+from htmlstats import HtmlDocument
 
 # Constants
-_MOBILE_SPECIAL_OFFERS_URL = 'https://www.bing.com/rewards/dashboard?showOffers=1'
+_MOBILE_SPECIAL_OFFERS_URL = DASHBOARD_URL + '?showOffers=1'
 DAILY_CURRENT_MOBILE_OFFER_POINTS_XPATH = '//*[@id="credit-progress"]/div[3]/span[1]'
 DAILY_MAX_MOBILE_OFFER_POINTS_XPATH = '//*[@id="credit-progress"]/div[3]/span[2]'
 DAILY_CURRENT_MOBILE_POINTS_XPATH = '//*[@id="credit-progress"]/div[5]/span[1]'
 DAILY_MAX_MOBILE_POINTS_XPATH = '//*[@id="credit-progress"]/div[5]/span[2]'
+TOTAL_MOBILE_POINTS_XPATH = '//*[@id="status-bar"]/span'
 SPECIAL_OFFERS_PARENT_XPATH = '//*[@id="activities"]/div[2]/div[1]'
 
 class MobileAccountManager(AbstractAccountManager):
@@ -16,25 +18,41 @@ class MobileAccountManager(AbstractAccountManager):
 
     @go_to_and_return_from(_MOBILE_SPECIAL_OFFERS_URL)
     def get_special_offer_links(self):
-        return self.browser.get_child_attributes(AttributeType.XPath, SPECIAL_OFFERS_PARENT_XPATH, 'href')[:-3]
+        links = self.browser.query({
+            'links': ElementQuery(AttributeType.XPath, SPECIAL_OFFERS_PARENT_XPATH, 'href', True, 1)
+        })['links']
+        return [link for link in links if link][:-3]
 
-    @convert_result_to_uint
     @go_to_and_return_from(DASHBOARD_URL)
-    def get_total_num_points(self):
-        return self.browser.get_value(AttributeType.XPath, '//*[@id="status-bar"]/span')
-    
-    @convert_result_to_uint
-    @go_to_and_return_from(DASHBOARD_URL)
-    def get_daily_device_points(self):
-        current_mobile_points = self.browser.get_value(AttributeType.XPath, DAILY_CURRENT_MOBILE_POINTS_XPATH)
-        maximum_mobile_points = self.browser.get_value(AttributeType.XPath, DAILY_MAX_MOBILE_POINTS_XPATH).strip('/')
-        return [current_mobile_points if current_mobile_points else -1, \
-            maximum_mobile_points if maximum_mobile_points else -1]
+    def _scrape_stats(self):
+        '''
+            All of the counters are on the dashboard, so read them within a single visit.
+        '''
+        counters = self.browser.query({
+            'total': ElementQuery(AttributeType.XPath, TOTAL_MOBILE_POINTS_XPATH),
+            'current_device': ElementQuery(AttributeType.XPath, DAILY_CURRENT_MOBILE_POINTS_XPATH),
+            'maximum_device': ElementQuery(AttributeType.XPath, DAILY_MAX_MOBILE_POINTS_XPATH),
+            'current_offer': ElementQuery(AttributeType.XPath, DAILY_CURRENT_MOBILE_OFFER_POINTS_XPATH),
+            'maximum_offer': ElementQuery(AttributeType.XPath, DAILY_MAX_MOBILE_OFFER_POINTS_XPATH)
+        })
+        return {
+            'total_points': parse_points(counters['total'], 0),
+            'daily_device_points': [parse_points(counters['current_device']), \
+                parse_points(counters['maximum_device'])],
+            'daily_offer_points': [parse_points(counters['current_offer']), \
+                parse_points(counters['maximum_offer'])]
+        }
 
-    @convert_result_to_uint
-    @go_to_and_return_from(DASHBOARD_URL)
-    def get_daily_offer_points(self):
-        current_offer_points = self.browser.get_value(AttributeType.XPath, DAILY_CURRENT_MOBILE_OFFER_POINTS_XPATH)
-        maximum_offer_points = self.browser.get_value(AttributeType.XPath, DAILY_MAX_MOBILE_OFFER_POINTS_XPATH).strip('/')
-        return [current_offer_points if current_offer_points else -1, \
-            maximum_offer_points if maximum_offer_points else -1]
\ No newline at end of file
+    def _fetch_stats(self):
+        page = self.http_client.get_page(DASHBOARD_URL)
+        if not page:
+            return None
+        document = HtmlDocument(page)
+        stats = {
+            'total_points': parse_points(document.get_text(TOTAL_MOBILE_POINTS_XPATH), 0),
+            'daily_device_points': [parse_points(document.get_text(DAILY_CURRENT_MOBILE_POINTS_XPATH)), \
+                parse_points(document.get_text(DAILY_MAX_MOBILE_POINTS_XPATH))],
+            'daily_offer_points': [parse_points(document.get_text(DAILY_CURRENT_MOBILE_OFFER_POINTS_XPATH)), \
+                parse_points(document.get_text(DAILY_MAX_MOBILE_OFFER_POINTS_XPATH))]
+        }
+        return stats if -1 not in stats['daily_device_points'] else None
\ No newline at end of file
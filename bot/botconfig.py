@@ -1,7 +1,10 @@
 from account_manager.browser_automation_utils.browsertypes import BrowserType
 
 class BotConfig:
-    def __init__(self, browser_type, num_searches, sleep_time_between_searches = 5):
+    def __init__(self, browser_type, num_searches, sleep_time_between_searches = 5, driver_pool = None, \
+            pacing = None, query_corpus = None, session_store = None, profiler = None, \
+            command_counter = None, http_search = False, http_stats = False, max_concurrent_offers = 4, \
+            journal = None, rate_limiter = None, phase_budget = None, resource_filter = None):
         '''
             @param browser_type
             (Required, browser_automation_utils.browsertypes.BrowserType)
@@ -15,15 +18,158 @@ class BotConfig:
             (Optional, Default Value = 5, int)
             Number of seconds of delay between Bing searches.
             Tricks Bing servers into thinking that human is performing searches, so
-            that we can accumulate points.
+            that we can accumulate points. Not used if there is a rate_limiter.
+
+            @param driver_pool
+            (Optional, Default Value = None, webdrivermanager.WebDriverPool)
+            Pool of warm webdrivers that the bots take their browsers from; by default,
+            every bot spawns (and quits) a webdriver of its own.
+
+            @param pacing
+            (Optional, Default Value = None, pacing.Pacing)
+            Human-like delays after page loads, clicks and typed fields. These come on
+            top of the browser's readiness waits; by default, there are none.
+
+            @param query_corpus
+            (Optional, Default Value = None, querycorpus.QueryCorpus)
+            Precomputed search terms to draw queries from; by default, random words
+            are generated with randomwordgenerator before every batch of searches.
+
+            @param session_store
+            (Optional, Default Value = None, sessionstore.SessionStore)
+            Store of the accounts' authenticated cookies. If specified, the bots restore
+            an account's saved session instead of signing in (when it is still valid),
+            and save the session instead of signing out at the end.
+
+            @param profiler
+            (Optional, Default Value = None, profiling.Profiler)
+            Records the duration of every phase, search and stats scrape of the bots.
+
+            @param command_counter
+            (Optional, Default Value = None, profiling.WebDriverCommandCounter)
+            Counts every command that the bots' browsers send to their webdrivers.
+
+            @param http_search
+            (Optional, Default Value = False, bool)
+            If True, the bots send their searches as plain HTTP requests, with the
+            cookies and user-agent of their signed-in browsers (see httpsearch.py);
+            the browsers are then only used to sign in and to read points.
+
+            @param http_stats
+            (Optional, Default Value = False, bool)
+            If True, the bots read their points by fetching and parsing the dashboard
+            pages over HTTP, with the cookies and user-agent of their signed-in browsers;
+            the browsers are only used to read points if that fails.
+
+            @param max_concurrent_offers
+            (Optional, Default Value = 4, int)
+            Maximum number of special offer links that a bot visits at the same time,
+            in browser tabs (or as HTTP requests, alongside http_stats).
+
+            @param journal
+            (Optional, Default Value = None, journal.RunJournal)
+            Records every phase that the bots complete; the bots skip the phases that
+            it already records as completed (see RunJournal's resume parameter).
+
+            @param rate_limiter
+            (Optional, Default Value = None, ratelimit.RateLimiter)
+            Caps the rate of the searches of every bot that shares it, overall and per
+            account; if specified, the bots wait for it before every search instead of
+            sleeping for sleep_time_between_searches after every search.
+
+            @param phase_budget
+            (Optional, Default Value = None, float)
+            Number of seconds that a single phase of a bot (sign in, searches, etc.)
+            may spend on retries; once it has run out, the phase stops retrying
+            (see retrypolicy.phase_deadline). None means no budget.
+
+            @param resource_filter
+            (Optional, Default Value = None, resourceblocking.ResourceFilter)
+            Resources (images, fonts, ads, etc.) that the bots' browsers should not
+            download; a driver_pool's webdrivers use the pool's filter instead.
         '''
         self.browser_type = browser_type
         self.num_searches = num_searches
         self.sleep_time_between_searches = sleep_time_between_searches
+        self.driver_pool = driver_pool
+        self.pacing = pacing
+        self.query_corpus = query_corpus
+        self.session_store = session_store
+        self.profiler = profiler
+        self.command_counter = command_counter
+        self.http_search = http_search
+        self.http_stats = http_stats
+        self.max_concurrent_offers = max_concurrent_offers
+        self.journal = journal
+        self.rate_limiter = rate_limiter
+        self.phase_budget = phase_budget
+        self.resource_filter = resource_filter
 
 class PhantomJSBotConfig(BotConfig):
     '''
         Extension of BotConfig that uses headless/PhantomJS Selenium driver.
     '''
-    def __init__(self, num_searches, sleep_time_between_searches = 5):
-        super().__init__(BrowserType.PhantomJS, num_searches, sleep_time_between_searches)
\ No newline at end of file
+    def __init__(self, num_searches, sleep_time_between_searches = 5, driver_pool = None, pacing = None, \
+            query_corpus = None, session_store = None, profiler = None, command_counter = None, \
+            http_search = False, http_stats = False, max_concurrent_offers = 4, journal = None, \
+            rate_limiter = None, phase_budget = None, resource_filter = None):
+        super().__init__(BrowserType.PhantomJS, num_searches, sleep_time_between_searches, driver_pool, \
+            pacing, query_corpus, session_store, profiler, command_counter, http_search, http_stats, \
+            max_concurrent_offers, journal, rate_limiter, phase_budget, resource_filter)
+
+class ManagerConfig:
+    def __init__(self, max_workers = None, max_desktop_workers = None, max_mobile_workers = None, \
+            shared_session = False, async_engine = False, phase_timeout = None, watchdog_timeout = None, \
+            max_requeues = 1):
+        '''
+            @param max_workers
+            (Optional, Default Value = None, int)
+            Maximum number of bots that may run at the same time, across all
+            device classes. Bots beyond this limit are queued and handed to the
+            next worker that frees up. None means that every bot runs on its own thread.
+
+            @param max_desktop_workers
+            (Optional, Default Value = None, int)
+            Maximum number of desktop bots that may run at the same time.
+            None means that only max_workers applies.
+
+            @param max_mobile_workers
+            (Optional, Default Value = None, int)
+            Maximum number of mobile bots that may run at the same time.
+            None means that only max_workers applies.
+
+            @param shared_session
+            (Optional, Default Value = False, bool)
+            If True, an account that has both a desktop and a mobile pass is handled by
+            one bot, which signs in once and reuses the same browser session for both
+            passes (switching the user-agent in between).
+
+            @param async_engine
+            (Optional, Default Value = False, bool)
+            If True, the bots are run as coroutines on an asyncio event loop, and their
+            blocking WebDriver calls are offloaded to a pool of max_workers threads.
+
+            @param phase_timeout
+            (Optional, Default Value = None, float)
+            Only used with async_engine; number of seconds after which a single phase
+            of a bot (sign in, searches, etc.) is abandoned.
+
+            @param watchdog_timeout
+            (Optional, Default Value = None, float)
+            Number of seconds after which a bot that has shown no sign of progress is
+            considered stuck, and its driver is killed (see watchdog.py); a bot whose
+            driver process exits is killed as well. None means no watchdog.
+
+            @param max_requeues
+            (Optional, Default Value = 1, int)
+            Number of times that an account whose bot has failed (e.g., because its
+            driver was killed or timed out) is queued again, on a new bot.
+        '''
+        self.max_workers = max_workers
+        self.max_desktop_workers = max_desktop_workers
+        self.max_mobile_workers = max_mobile_workers
+        self.shared_session = shared_session
+        self.async_engine = async_engine
+        self.phase_timeout = phase_timeout
+        self.watchdog_timeout = watchdog_timeout
+        self.max_requeues = max_requeues
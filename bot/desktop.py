@@ -1,11 +1,31 @@
+import time
 from threading import Thread, Lock
 
+from account_manager.base import BING_URL
 from account_manager.browser_automation_utils.browser import AttributeType, Browser
 from account_manager.desktop import DesktopAccountManager
-from randomwordgenerator import randomwordgenerator
+from httpsearch import HttpSearchClient
+from profiling import Profiler
+import progress
+from querycorpus import QuerySampler
+from retrypolicy import AuthenticationError, RetryPolicy, is_driver_dead, is_phase_deadline_expired, phase_deadline
+from searchcontroller import SearchController
+
+# Phases that only set up the browser session for the phases that follow them; they are
+# re-run on resume whenever any other phase of the bot is still pending.
+SETUP_PHASES = ['initialize', 'sign_in', 'switch_to_mobile', 'switch_to_desktop']
+
+# Number of times a phase is restarted (on a new driver) after its driver has died
+_MAX_DRIVER_RESTARTS = 1
+
+# Backoff between re-reads of the points, and between passes over the special offers
+_RETRY_POLICY = RetryPolicy(base_delay = 0.5, max_delay = 4)
 
 # Threads - 1:1 relationship between threads/bots and Bing-Rewards-Accounts
 class DesktopBingRewardsBot(Thread):
+    # Used by the scheduler to apply per-device-class concurrency limits.
+    device_class = 'PC'
+
     def __init__(self, bot_config, account_credentials):
         '''
             @param bot_config
@@ -23,14 +43,55 @@ class DesktopBingRewardsBot(Thread):
         self._done = False
 
         # Save parameters.
+        self.bot_config = bot_config
         self.browser_type = bot_config.browser_type
         self.num_searches = bot_config.num_searches
         self.sleep_time_between_searches = bot_config.sleep_time_between_searches
+        self.driver_pool = bot_config.driver_pool
+        self.pacing = bot_config.pacing
+        self.session_store = bot_config.session_store
+        self.profiler = bot_config.profiler if bot_config.profiler else Profiler()
+        self.command_counter = bot_config.command_counter
+        self.journal = bot_config.journal
+        if self.journal:
+            # Keeps the account's completed phases around until this bot has finished.
+            self.journal.add_bot(account_credentials.email, self.device_class)
+        self.phase_budget = bot_config.phase_budget
+        self.resource_filter = bot_config.resource_filter
+        self.rate_limiter = bot_config.rate_limiter
+        if self.rate_limiter:
+            # Keeps the account's bucket alive until this bot has finished (see finish).
+            self.rate_limiter.add_account(account_credentials.email)
+        self.http_search = bot_config.http_search
+        self.http_stats = bot_config.http_stats
+        self.max_concurrent_offers = bot_config.max_concurrent_offers
+        # Per-account sampler, so that an account does not repeat recent queries.
+        self.query_sampler = QuerySampler(bot_config.query_corpus) if bot_config.query_corpus else None
         self.account_credentials = account_credentials
 
         # Vars to be defined later
         self.browser = None
         self.account_manager = None
+        # HttpSearchClient that sends the searches and/or fetches the points, if
+        # http_search and/or http_stats are set
+        self.http_client = None
+
+        # Point reports (see AbstractAccountManager.get_report) gathered by this bot
+        self.reports = []
+        # SearchController of the latest call to perform_random_searches
+        self.search_controller = None
+        # Functions to call with (bot, progress event kind, phase name) as the bot
+        # makes progress; see add_progress_callback.
+        self.progress_callbacks = []
+
+        # Number of earlier bots that have failed on this account (see copy_for_retry)
+        self.attempt = 0
+        # True once a phase has failed (other than by Bing rejecting the credentials)
+        self.failed = False
+        # True once a watchdog has killed this bot's driver (see kill)
+        self.killed = False
+        # Time of the latest sign of life of this bot (see heartbeat)
+        self.last_heartbeat = time.time()
 
     @property
     def done(self):
@@ -48,8 +109,10 @@ class DesktopBingRewardsBot(Thread):
             Open a new browser window, and pass the reference to a new Bing Rewards
             account manager.
         '''
-        self.browser = Browser(self.browser_type)
-        self.account_manager = DesktopAccountManager(self.browser, self.account_credentials)
+        self.browser = Browser(self.browser_type, driver_pool = self.driver_pool, pacing = self.pacing, \
+            command_counter = self.command_counter, resource_filter = self.resource_filter)
+        self.account_manager = DesktopAccountManager(self.browser, self.account_credentials, self.profiler, \
+            self.max_concurrent_offers)
 
     def release(self):
         '''
@@ -58,17 +121,53 @@ class DesktopBingRewardsBot(Thread):
         '''
         if self.browser:
             self.browser.close()
+        if self.http_client:
+            self.http_client.close()
 
-    def _execute_random_searches(self):
+    def _execute_random_searches(self, num_searches):
         # Normal Case: Generate "num_searches" random words, and perform
-        # a Bing search using each term. Wait N seconds between searches,
-        # so that Bing can't detect their automated nature.
-        random_queries = randomwordgenerator.generate_random_words(self.num_searches)
+        # a Bing search using each term. Wait N seconds between searches (or
+        # as long as the rate limiter requires), so that Bing can't detect their
+        # automated nature.
+        if self.query_sampler:
+            random_queries = self.query_sampler.sample_n(num_searches)
+        else:
+            # Without a precomputed corpus, fall back to generating words on the fly.
+            from randomwordgenerator import randomwordgenerator
+            random_queries = randomwordgenerator.generate_random_words(num_searches)
         for query in random_queries:
-            self.browser.type_and_submit(AttributeType.Name, 'q', query, \
-                clear_after_submit = True)
-            self.browser.sleep(self.sleep_time_between_searches)
+            self.heartbeat()
+            if self.rate_limiter:
+                # Waiting for our turn is not being stuck, however long it takes.
+                self.rate_limiter.acquire(self.account_credentials.email, on_wait = self.heartbeat)
+                self.heartbeat()
+            with self.profiler.span('search', email = self.account_credentials.email, \
+                    device_class = self.device_class):
+                if self.http_search:
+                    self.http_client.search(query)
+                else:
+                    self.browser.type_and_submit(AttributeType.Name, 'q', query, \
+                        clear_after_submit = True)
+            if self.rate_limiter:
+                # Only the HTTP client gets to see whether Bing is throttling us.
+                self.rate_limiter.record_response(self.http_search and self.http_client.last_status_code == 429)
+            else:
+                self.browser.sleep(self.sleep_time_between_searches)
     
+    def _sync_http_client(self):
+        '''
+            @description
+                Seed the HTTP client with the browser's current session; called on every
+                pass, since the session's cookies and user-agent may have changed.
+        '''
+        if not self.http_search and not self.http_stats:
+            return
+        if not self.http_client:
+            self.http_client = HttpSearchClient()
+        self.http_client.sync_from_browser(self.browser)
+        if self.http_stats:
+            self.account_manager.http_client = self.http_client
+
     def _get_point_stats(self):
         '''
             @return
@@ -95,7 +194,11 @@ class DesktopBingRewardsBot(Thread):
         current = -1
         maximum = -1
 
-        for i in range(0, num_retries):
+        for i in _RETRY_POLICY.attempts(num_retries):
+            self.heartbeat()
+            # The first attempt may use the cached stats snapshot; retries force a re-read.
+            if i > 0:
+                self.account_manager.invalidate_stats()
             device_point_stats = self._get_point_stats()
             # If we read both stats successfully, return dictionary immediately.
             if device_point_stats['read_both']:
@@ -124,8 +227,11 @@ class DesktopBingRewardsBot(Thread):
     def perform_random_searches(self):
         '''
             @description
-                Perform the specified number of Bing searches, if we can still
-                accumulate points for the day.
+                Perform Bing searches until we can no longer accumulate points for
+                the day. Searches are performed in batches that are sized (by a
+                SearchController) to the remaining number of points, based on how
+                many points each search has earned so far; so, we stop as soon as
+                the daily maximum is reached instead of overshooting it.
                 In the worst-case, if we can't load any stats for the given account,
                 then we will still perform the specified number of searches. But, in
                 such a case, we can't guarantee the accumulation of the appropriate 
@@ -133,18 +239,29 @@ class DesktopBingRewardsBot(Thread):
         '''
         MAX_RETRIES = 5
 
-        stats = self._try_get_point_stats(MAX_RETRIES)
-
         # Open Bing home page.
-        self.browser.open('http://www.bing.com')
+        self.browser.open(BING_URL)
+        self._sync_http_client()
 
-        # Perform the specified number of random searches until either the
-        # current number of accumulated points exceeds the maximum possible
-        # points for today, OR we've hit the retry ceiling.
+        stats = self._try_get_point_stats(MAX_RETRIES)
+
+        # Perform batches of random searches until either the current number
+        # of accumulated points reaches the maximum possible points for today,
+        # OR we've hit the retry ceiling, OR searches have stopped earning points,
+        # OR the phase's budget has run out.
+        self.search_controller = SearchController(self.num_searches)
         num_retries = 0
-        while stats['current'] < stats['maximum'] and num_retries < MAX_RETRIES:
-            self._execute_random_searches()
+        while not self.search_controller.is_done(stats) and num_retries < MAX_RETRIES and \
+                not self.search_controller.is_stalled() and not is_phase_deadline_expired():
+            num_searches = self.search_controller.get_batch_size(stats)
+            self._execute_random_searches(num_searches)
+            if self.http_search and not self.http_stats:
+                # The browser has not navigated since the searches, so its points are stale.
+                self.browser.open(BING_URL)
+            self.account_manager.invalidate_stats()
+            previous_stats = stats
             stats = self._try_get_point_stats(MAX_RETRIES)
+            self.search_controller.record(num_searches, previous_stats['current'], stats['current'])
             if stats['unable_to_read_current']:
                 num_retries = num_retries + 1
 
@@ -153,20 +270,212 @@ class DesktopBingRewardsBot(Thread):
     def view_special_offers(self):
         offer_points = self.account_manager.get_daily_offer_points()
         (current, maximum) = (offer_points[0], offer_points[1])
-        (current_num_retries, max_num_retries) = (0, 3)
-        while current < maximum and current_num_retries < max_num_retries:
+        if current >= maximum:
+            return
+        for attempt in _RETRY_POLICY.attempts(3):
+            self.heartbeat()
             self.account_manager.accumulate_special_offer_points()
-            current_num_retries = current_num_retries + 1
+            # accumulate_special_offer_points skips the links that it has already visited,
+            # and invalidates the stats, so this is a fresh read.
+            (current, maximum) = self.account_manager.get_daily_offer_points()
+            if current >= maximum:
+                return
+
+    def sign_in(self):
+        '''
+            @description
+                Restore the account's saved session if there is a session store and the
+                saved session is still signed in; otherwise, go through the login form.
+                Raises an AuthenticationError if Bing rejects the credentials, since
+                nothing that follows can earn points for the account.
+        '''
+        if self.session_store:
+            cookies = self.session_store.load(self.account_credentials.email)
+            if cookies and self.account_manager.restore_session(cookies):
+                return True
+        if not self.account_manager.sign_in():
+            raise AuthenticationError('Unable to sign in to ' + self.account_credentials.email)
+        return True
+
+    def report(self):
+        report = self.account_manager.get_report()
+        if self.search_controller:
+            report['num_searches'] = self.search_controller.num_searches_performed
+            report['num_searches_avoided'] = self.search_controller.get_num_searches_avoided()
+        resource_stats = self.browser.get_resource_stats()
+        if resource_stats:
+            report['resource_stats'] = resource_stats
+        self.reports.append(report)
+        print(self.account_manager.format_report(report))
+
+    def sign_out(self):
+        '''
+            @description
+                If there is a session store, save the account's session to it instead of
+                signing out (which would invalidate the saved cookies).
+        '''
+        if self.session_store:
+            self.session_store.save(self.account_credentials.email, self.browser.get_cookies())
+            return True
+        return self.account_manager.sign_out()
+
+    def get_phases(self):
+        '''
+            @return
+                The steps of this bot's pipeline, in order of execution, as a list of
+                (phase name, function) tuples. The browser is released separately,
+                once the pipeline is over (see release).
+        '''
+        return [
+            ('initialize', self.initialize),
+            ('sign_in', self.sign_in),
+            ('searches', self.perform_random_searches),
+            ('offers', self.view_special_offers),
+            ('report', self.report),
+            ('sign_out', self.sign_out)
+        ]
+
+    def get_pending_phases(self):
+        '''
+            @return
+                The phases (see get_phases) that still have to run. Without a journal,
+                that is every phase. With one, the phases that the journal records as
+                completed are skipped (and the reports that they produced are restored);
+                the setup phases only run if some other phase is still pending.
+        '''
+        phases = self.get_phases()
+        if not self.journal:
+            return phases
+        completed_phases = self.journal.get_completed_phases(self.account_credentials.email, \
+            self.device_class)
+        for (phase_name, phase) in phases:
+            if phase_name in completed_phases:
+                self.reports.extend(completed_phases[phase_name])
+        pending_phases = [(phase_name, phase) for (phase_name, phase) in phases \
+            if phase_name in SETUP_PHASES or phase_name not in completed_phases]
+        if all([phase_name in SETUP_PHASES for (phase_name, phase) in pending_phases]):
+            return []
+        return pending_phases
+
+    def add_progress_callback(self, callback):
+        '''
+            @param callback
+                Function to call with (this bot, event kind, phase name) whenever a phase
+                starts, finishes or fails, and once the bot has finished (with a None
+                phase name); see the event kinds in progress.py. Called on the thread
+                that runs the bot.
+        '''
+        self.progress_callbacks.append(callback)
+
+    def heartbeat(self):
+        '''
+            @description
+                Signal that this bot is making progress; a watchdog kills bots that
+                have not done so for a while.
+        '''
+        self.last_heartbeat = time.time()
+
+    def kill(self, reason):
+        '''
+            @description
+                Give up on this bot: kill its driver process, so that the WebDriver call
+                that it may be blocked on fails right away, and make sure that its
+                current phase fails instead of restarting on a new driver.
+                Called from a watchdog's thread.
+        '''
+        self.killed = True
+        print('Killing the driver of ' + self.account_credentials.email + ' (' + reason + ')')
+        browser = self.browser
+        if browser:
+            browser.kill_driver()
+
+    def copy_for_retry(self):
+        '''
+            @return
+                A new bot (with a browser of its own, once initialized) for the same
+                account and configuration as this one, to retry the account with.
+        '''
+        bot = type(self)(self.bot_config, self.account_credentials)
+        bot.attempt = self.attempt + 1
+        return bot
+
+    def _publish_progress(self, kind, phase_name = None):
+        self.heartbeat()
+        for callback in self.progress_callbacks:
+            callback(self, kind, phase_name)
+
+    def run_phase(self, phase_name, phase):
+        '''
+            @description
+                Run the given phase (see get_phases), record it as a timing span, and,
+                once it has completed, in the journal.
+        '''
+        num_reports = len(self.reports)
+        self._publish_progress(progress.PHASE_STARTED, phase_name)
+        try:
+            num_restarts = 0
+            while True:
+                try:
+                    with self.profiler.span(phase_name, email = self.account_credentials.email, \
+                            device_class = self.device_class), phase_deadline(self.phase_budget):
+                        result = phase()
+                    break
+                except Exception as e:
+                    # Retrying on a dead driver only burns through timeouts; start over
+                    # on a new one right away instead.
+                    if not is_driver_dead(e) or self.killed or num_restarts >= _MAX_DRIVER_RESTARTS:
+                        raise
+                    num_restarts += 1
+                    print('Driver died during ' + phase_name + ' for ' + self.account_credentials.email + \
+                        '; restarting it')
+                    self._restart_browser(phase_name)
+        except BaseException as e:
+            if not isinstance(e, AuthenticationError):
+                self.failed = True
+            self._publish_progress(progress.PHASE_FAILED, phase_name)
+            raise
+        self._publish_progress(progress.PHASE_FINISHED, phase_name)
+        if self.journal and phase_name not in SETUP_PHASES:
+            stats = self.account_manager.get_cached_stats() if self.account_manager else None
+            self.journal.record_phase(self.account_credentials.email, self.device_class, phase_name, \
+                stats, self.reports[num_reports:])
+        return result
+
+    def _restart_browser(self, phase_name):
+        '''
+            @description
+                Replace the browser with a new one, and bring it back to where the given
+                phase expects it to be, by re-running the setup phases before that phase.
+        '''
+        self.release()
+        (self.browser, self.http_client) = (None, None)
+        for (setup_phase_name, setup_phase) in self.get_phases():
+            if setup_phase_name == phase_name:
+                return
+            if setup_phase_name in SETUP_PHASES:
+                setup_phase()
+
+    def finish(self):
+        '''
+            @description
+                Release the browser, and mark this bot as done.
+        '''
+        self.release()
+        # We're done, so update "done" status variable.
+        self.done = True
+        self._publish_progress(progress.BOT_FINISHED)
+        # Only now, since a bot that retries the account is created (and registered)
+        # by the BOT_FINISHED callbacks.
+        if self.rate_limiter:
+            self.rate_limiter.remove_account(self.account_credentials.email)
+        if self.journal:
+            self.journal.remove_bot(self.account_credentials.email, self.device_class)
 
     def run(self):
         try:
-            self.initialize()
-            self.account_manager.sign_in()
-            self.perform_random_searches()
-            self.view_special_offers()
-            print(self.account_manager)
-            self.account_manager.sign_out()
+            for (phase_name, phase) in self.get_pending_phases():
+                self.run_phase(phase_name, phase)
+        except AuthenticationError as e:
+            print(str(e))
         finally:
-            self.release()
-            # We're done, so update "done" status variable.
-            self.done = True
\ No newline at end of file
+            self.finish()
\ No newline at end of file
@@ -0,0 +1,264 @@
+import asyncio
+import collections
+import functools
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from retrypolicy import AuthenticationError
+
+# Number of seconds that a phase whose driver has been killed is given to unwind.
+_KILL_GRACE_SECONDS = 5
+
+class AsyncBotEngine:
+    def __init__(self, bots, max_workers, max_workers_per_device_class = None, phase_timeout = None):
+        '''
+            @description
+            Run a set of Bing Rewards bots as coroutines on an asyncio event loop.
+            Each bot's pipeline (see DesktopBingRewardsBot.get_phases) is awaited one
+            phase at a time, while the blocking WebDriver calls within each phase run
+            on a bounded thread pool. Bots are pulled from the given iterable only as
+            workers free up, so large account lists can be queued cheaply.
+
+            @param bots
+            (Required) Iterable of DesktopBingRewardsBot/MobileBingRewardsBot objects.
+            The bots are never started as threads of their own.
+
+            @param max_workers
+            (Required, int) Maximum number of bots that may run at the same time;
+            also the size of the thread pool for blocking WebDriver calls.
+
+            @param max_workers_per_device_class
+            (Optional) Dictionary mapping a bot's device_class (e.g., 'PC', 'Mobile')
+            to the maximum number of bots of that class that may run at the same time.
+
+            @param phase_timeout
+            (Optional, float) Number of seconds after which a single phase of a bot
+            is abandoned; the bot's driver process is then killed (so that the thread
+            running the phase unblocks), its browser is released and the bot is marked done.
+        '''
+        self.bots = iter(bots)
+        # Bots to run before any new bot is pulled from self.bots (see requeue); may be
+        # appended to from any thread.
+        self.requeued = collections.deque()
+        self.max_workers = max_workers
+        self.max_workers_per_device_class = max_workers_per_device_class or {}
+        self.phase_timeout = phase_timeout
+
+        # Bots that have been pulled from self.bots while their device class was
+        # saturated (see _next_bot); only touched on the event loop's thread.
+        self.deferred = collections.deque()
+        self.exhausted = False
+        self.num_active = collections.Counter()
+
+        # Vars to be defined once the event loop is running
+        self.loop = None
+        self.executor = None
+        # Releases browsers (see run_bot); kept apart from self.executor, all of whose
+        # threads may be stuck in phases at the time.
+        self.cleanup_executor = None
+        self.main_task = None
+        # Set whenever a device class frees up or a bot is requeued (see _next_bot).
+        self.queue_changed = None
+        self.completion_events = {}
+
+        self.thread = None
+        self.on_complete_callbacks = []
+        self.on_bot_finished_callbacks = []
+
+    def _get_completion_event(self, bot):
+        if bot not in self.completion_events:
+            self.completion_events[bot] = asyncio.Event()
+        return self.completion_events[bot]
+
+    def _has_capacity(self, device_class):
+        limit = self.max_workers_per_device_class.get(device_class, None)
+        return limit is None or self.num_active[device_class] < limit
+
+    async def _abandon_phase(self, bot, phase_future, reason):
+        '''
+            @description
+            Kill the given bot's driver process from the event loop's thread (the
+            executor's thread is stuck in the phase), and give the phase a moment to
+            fail on the dead driver, so that its thread goes back to the pool.
+        '''
+        bot.kill(reason)
+        await asyncio.wait([phase_future], timeout = _KILL_GRACE_SECONDS)
+
+    async def run_bot(self, bot):
+        '''
+            @description
+            Coroutine that runs the given bot's pipeline to completion, failure or
+            timeout, and then releases its browser.
+        '''
+        try:
+            for (phase_name, phase) in bot.get_pending_phases():
+                phase_future = self.loop.run_in_executor(self.executor, \
+                    functools.partial(bot.run_phase, phase_name, phase))
+                try:
+                    # Shielded, so that the phase's future outlives a timeout, and can be
+                    # waited on while the phase unwinds.
+                    await asyncio.wait_for(asyncio.shield(phase_future), self.phase_timeout)
+                except asyncio.TimeoutError:
+                    print('Timed out during ' + phase_name + ' for ' + bot.account_credentials.email)
+                    bot.failed = True
+                    await self._abandon_phase(bot, phase_future, phase_name + ' timed out')
+                    return
+                except asyncio.CancelledError:
+                    await self._abandon_phase(bot, phase_future, 'cancelled')
+                    raise
+        except asyncio.CancelledError:
+            raise
+        except AuthenticationError as e:
+            print(str(e))
+        except Exception:
+            # A single broken account must not take the engine down with it.
+            traceback.print_exc()
+        finally:
+            await self.loop.run_in_executor(self.cleanup_executor, bot.finish)
+            for callback in self.on_bot_finished_callbacks:
+                callback(bot)
+            # Only bots that are being waited for have an event; drop it, so that
+            # finished bots are not kept alive by the engine.
+            completion_event = self.completion_events.pop(bot, None)
+            if completion_event:
+                completion_event.set()
+
+    async def wait_for_bot(self, bot):
+        '''
+            @description
+            Coroutine that completes once the given bot has finished running.
+        '''
+        if not bot.done:
+            await self._get_completion_event(bot).wait()
+
+    async def _next_bot(self):
+        '''
+            @description
+            Coroutine that waits until there is a pending bot whose device class has
+            spare capacity, and removes it from the queue. As in BotScheduler, bots
+            whose class is saturated are skipped over (up to max_workers of them), so
+            that a tight limit on one class does not leave workers idle while bots of
+            the other class are waiting.
+
+            @return
+            The next bot to run, or None if there are no more pending bots.
+        '''
+        while True:
+            while self.requeued:
+                self.deferred.append(self.requeued.popleft())
+            for i, bot in enumerate(self.deferred):
+                if self._has_capacity(bot.device_class):
+                    del self.deferred[i]
+                    self.num_active[bot.device_class] += 1
+                    return bot
+            if not self.exhausted and len(self.deferred) < self.max_workers:
+                bot = next(self.bots, None)
+                if bot is None:
+                    self.exhausted = True
+                else:
+                    self.deferred.append(bot)
+                continue
+            if self.exhausted and not self.deferred:
+                return None
+            # No await since the checks above, so no wakeup can have been missed.
+            self.queue_changed.clear()
+            await self.queue_changed.wait()
+
+    async def _work(self):
+        bot = await self._next_bot()
+        while bot:
+            try:
+                await self.run_bot(bot)
+            finally:
+                self.num_active[bot.device_class] -= 1
+                self.queue_changed.set()
+            bot = await self._next_bot()
+        # Wake up workers that are waiting on a saturated device class, so they can
+        # notice that the queue has drained.
+        self.queue_changed.set()
+
+    async def run_async(self):
+        '''
+            @description
+            Coroutine that runs every bot; cancelling it cancels every bot that is
+            still running.
+        '''
+        self.loop = asyncio.get_event_loop()
+        self.queue_changed = asyncio.Event()
+        self.executor = ThreadPoolExecutor(self.max_workers)
+        self.cleanup_executor = ThreadPoolExecutor(self.max_workers)
+        workers = [asyncio.ensure_future(self._work()) for i in range(0, self.max_workers)]
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions = True)
+            raise
+        finally:
+            self.executor.shutdown(wait = False)
+            self.cleanup_executor.shutdown(wait = False)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.main_task = self.loop.create_task(self.run_async())
+        try:
+            self.loop.run_until_complete(self.main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+            for callback in self.on_complete_callbacks:
+                callback()
+
+    def requeue(self, bot):
+        '''
+            @description
+            Queue the given bot to run next; thread-safe. Must be called before the
+            bot that it replaces has finished running (e.g., from one of the bot's
+            progress callbacks), so that a worker is still around to pick it up.
+        '''
+        self.requeued.append(bot)
+        if self.loop and self.queue_changed:
+            self.loop.call_soon_threadsafe(self.queue_changed.set)
+
+    def add_on_complete_callback(self, callback):
+        '''
+            @param callback
+            Function (no arguments) to call once every bot has finished running.
+        '''
+        self.on_complete_callbacks.append(callback)
+
+    def add_on_bot_finished_callback(self, callback):
+        '''
+            @param callback
+            Function to call with each bot once it has finished running; called on
+            the event loop's thread.
+        '''
+        self.on_bot_finished_callbacks.append(callback)
+
+    def start(self):
+        '''
+            @description
+            Run the event loop on a background thread; returns immediately.
+        '''
+        self.thread = Thread(target = self._run)
+        self.thread.start()
+
+    def cancel(self):
+        '''
+            @description
+            Cancel every bot that is still running or queued; thread-safe.
+        '''
+        if self.loop and self.main_task:
+            self.loop.call_soon_threadsafe(self.main_task.cancel)
+
+    def join(self):
+        '''
+            @description
+            Block until the event loop has finished running every bot.
+        '''
+        if self.thread:
+            self.thread.join()
@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from account_manager.base import BING_URL
+
+_SEARCH_PATH = '/search'
+_TIMEOUT_SECONDS = 10
+
+class HttpSearchClient:
+    def __init__(self, base_url = BING_URL, pool_size = 4, timeout = _TIMEOUT_SECONDS):
+        '''
+            @description
+            Performs Bing searches as plain HTTP GET requests, over a keep-alive
+            requests.Session, instead of typing them into a browser and rendering
+            the results page. The session has to be seeded with the cookies and
+            user-agent of a signed-in Browser first (see sync_from_browser), so that
+            Bing credits the searches to the right account and device class.
+
+            @param base_url
+            (Optional) Root of the Bing URLs (see account_manager.base.BING_URL).
+
+            @param pool_size
+            (Optional) Number of connections to keep open to the Bing host.
+
+            @param timeout
+            (Optional) Number of seconds after which a search request is abandoned.
+        '''
+        self.base_url = base_url
+        self.timeout = timeout
+        # HTTP status code of the latest search (None if it got no response)
+        self.last_status_code = None
+        self.session = self._new_session(pool_size)
+
+    @staticmethod
+    def _new_session(pool_size, seed_session = None):
+        '''
+            @return
+            A new requests.Session that keeps pool_size connections open to the Bing
+            host, with the headers and cookies of seed_session, if specified.
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if seed_session:
+            session.headers.update(seed_session.headers)
+            session.cookies.update(seed_session.cookies)
+        return session
+
+    def sync_from_browser(self, browser):
+        '''
+            @description
+            Copy the cookies and user-agent of the given Browser into this client's
+            session; the browser should have a Bing page open, since only the cookies
+            of the current page's domain are visible.
+        '''
+        self.session.headers['User-Agent'] = browser.get_user_agent()
+        self.session.cookies.clear()
+        for cookie in browser.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], \
+                domain = cookie.get('domain', ''), path = cookie.get('path', '/'))
+
+    def search(self, query):
+        '''
+            @description
+            Send the given query the way Bing's search box does.
+
+            @return
+            True if Bing answered the search successfully, False otherwise.
+        '''
+        self.last_status_code = None
+        try:
+            response = self.session.get(self.base_url + _SEARCH_PATH, params = {'q': query, 'form': 'QBLH'}, \
+                headers = {'Referer': self.base_url + '/'}, timeout = self.timeout)
+        except requests.RequestException:
+            return False
+        self.last_status_code = response.status_code
+        return response.ok
+
+    def get_page(self, url, session = None):
+        '''
+            @param session
+            (Optional) requests.Session to fetch the page with, instead of this
+            client's session.
+
+            @return
+            The markup of the page at the given url, as the signed-in session sees it,
+            or None if it could not be fetched.
+        '''
+        try:
+            response = (session if session else self.session).get(url, timeout = self.timeout)
+        except requests.RequestException:
+            return None
+        return response.text if response.ok else None
+
+    def get_pages(self, urls, max_concurrent = 4):
+        '''
+            @description
+            Fetch the given urls concurrently, at most max_concurrent at a time. Since
+            a requests.Session is not thread-safe, every fetching thread has a copy of
+            this client's session of its own; the cookies that the pages set are
+            merged back into this client's session afterwards.
+
+            @return
+            The list of urls that were fetched successfully.
+        '''
+        if not urls:
+            return []
+        (thread_state, thread_sessions) = (threading.local(), [])
+        def get_page_in_thread(url):
+            if not hasattr(thread_state, 'session'):
+                thread_state.session = self._new_session(1, self.session)
+                thread_sessions.append(thread_state.session)
+            return self.get_page(url, thread_state.session)
+        with ThreadPoolExecutor(max_workers = max_concurrent) as executor:
+            pages = list(executor.map(get_page_in_thread, urls))
+        for session in thread_sessions:
+            self.session.cookies.update(session.cookies)
+            session.close()
+        return [url for (url, page) in zip(urls, pages) if page is not None]
+
+    def close(self):
+        self.session.close()
\ No newline at end of file
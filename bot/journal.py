@@ -0,0 +1,122 @@
+import collections
+import json
+import os
+import threading
+import time
+
+class RunJournal:
+    def __init__(self, filename, resume = False):
+        '''
+            @description
+            Append-only log of the phases (see DesktopBingRewardsBot.get_phases) that
+            each bot has completed, as JSON lines, one object per completed phase:
+            {"email": ..., "device_class": ..., "phase": ..., "time": ..., "stats": ...,
+            "reports": [...]}
+            "stats" is the account's last known point counters (if any had been read),
+            and "reports" holds the point reports that the phase produced (if any).
+            Every line is flushed as soon as it is written, so a run that crashes can
+            be resumed from the last completed phase of every account.
+
+            @param filename
+            Name of the journal file.
+
+            Only what resuming needs is kept in memory: the names of the completed
+            phases of every account, and their reports. An account's share is
+            dropped once the last of its bots has finished (see add_bot).
+
+            @param resume
+            (Optional) If True, the phases already recorded in the file are loaded,
+            so that they can be skipped; otherwise, the file is started over.
+        '''
+        self.filename = filename
+        self.lock = threading.Lock()
+        # (email, device class) -> {phase name: list of the phase's reports}
+        self.completed_phases = collections.defaultdict(dict)
+        # (email, device class) -> number of bots of the account that have not finished yet
+        self.num_account_bots = collections.Counter()
+        if resume and os.path.exists(filename):
+            self._load()
+        self.file_ptr = open(filename, 'a' if resume else 'w')
+        if resume and self.file_ptr.tell() > 0:
+            # Do not glue the first new line onto a line cut short by the crash.
+            with open(filename, 'rb') as check_file_ptr:
+                check_file_ptr.seek(-1, os.SEEK_END)
+                if check_file_ptr.read(1) != b'\n':
+                    self.file_ptr.write('\n')
+                    self.file_ptr.flush()
+
+    def _load(self):
+        with open(self.filename, 'r') as journal_file_ptr:
+            for line in journal_file_ptr:
+                try:
+                    entry = json.loads(line)
+                    key = (entry['email'], entry['device_class'])
+                    phase = entry['phase']
+                except (ValueError, TypeError, KeyError):
+                    # Cut short by a crash (see __init__), or not a journal entry at all.
+                    continue
+                self.completed_phases[key][phase] = entry.get('reports', [])
+
+    def record_phase(self, email, device_class, phase, stats = None, reports = None):
+        '''
+            @description
+            Record that the given phase of the given account's bot has completed.
+
+            @param stats
+            (Optional) The account's last known point counters (see
+            AbstractAccountManager.get_stats).
+
+            @param reports
+            (Optional) List of the point reports that the phase produced.
+        '''
+        entry = {'email': email, 'device_class': device_class, 'phase': phase, 'time': time.time()}
+        if stats:
+            entry['stats'] = stats
+        if reports:
+            entry['reports'] = reports
+        line = json.dumps(entry, sort_keys = True) + '\n'
+        with self.lock:
+            self.completed_phases[(email, device_class)][phase] = reports if reports else []
+            # One write per line, so that processes sharing the journal do not
+            # interleave their lines.
+            self.file_ptr.write(line)
+            self.file_ptr.flush()
+
+    def get_completed_phases(self, email, device_class):
+        '''
+            @return
+            A dictionary mapping the name of every completed phase of the given
+            account's bot to the list of point reports that it produced.
+        '''
+        with self.lock:
+            return dict(self.completed_phases.get((email, device_class), {}))
+
+    def add_bot(self, email, device_class):
+        '''
+            @description
+            Register a bot of the given account; every bot that uses the journal must
+            be registered, and call remove_bot once it has finished.
+        '''
+        with self.lock:
+            self.num_account_bots[(email, device_class)] += 1
+
+    def remove_bot(self, email, device_class):
+        '''
+            @description
+            Unregister a bot of the given account (see add_bot), and forget the
+            account's completed phases once none of its bots is left; a bot that
+            retries the account is registered before the bot that it replaces has
+            finished, so it still gets to skip the phases completed so far.
+        '''
+        key = (email, device_class)
+        with self.lock:
+            self.num_account_bots[key] -= 1
+            if self.num_account_bots[key] <= 0:
+                del self.num_account_bots[key]
+                self.completed_phases.pop(key, None)
+
+    def close(self):
+        with self.lock:
+            if self.file_ptr:
+                self.file_ptr.close()
+            self.file_ptr = None
\ No newline at end of file
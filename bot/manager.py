@@ -1,49 +1,238 @@
+from itertools import zip_longest
+from threading import Lock
+
+from botconfig import ManagerConfig
 from desktop import DesktopBingRewardsBot
+from engine import AsyncBotEngine
 from mobile import MobileBingRewardsBot
+from progress import ProgressEvent, ProgressPublisher, PHASE_STARTED, BOT_FINISHED, BOT_REQUEUED, RUN_FINISHED
+from scheduler import BotScheduler
+from shared import SharedSessionBingRewardsBot
+from watchdog import Watchdog
 
 # Thread Pools
 class BingRewardsBotManager:
-    def __init__(self, desktop_bot_config, desktop_accounts, mobile_bot_config, mobile_accounts):
+    def __init__(self, desktop_bot_config, desktop_accounts, mobile_bot_config, mobile_accounts, \
+            manager_config = None):
         '''
             @description
-            Constructor that creates a set of desktop and mobile Bing Rewards 
+            Constructor that sets up a set of desktop and mobile Bing Rewards
             bots with the specified configurations and for the given accounts.
+            When the bots are run on a bounded pool of workers, they are only created
+            (and their accounts only read) as workers free up, and they are dropped
+            once they finish; so, memory use grows with the number of workers rather
+            than with the number of accounts.
 
             @param desktop_bot_config
             (Required) BotConfig instance for desktop
 
             @param desktop_accounts
-            (Required) AccountCredentialsCollection for desktop
-            
+            (Required) AccountCredentialsSource (e.g., AccountCredentialsCollection) for desktop
+
             @param mobile_bot_config
             (Required) BotConfig instance for mobile
 
             @param mobile_accounts
-            (Required) AccountCredentialsCollection for mobile
+            (Required) AccountCredentialsSource (e.g., AccountCredentialsCollection) for mobile
+
+            @param manager_config
+            (Optional) ManagerConfig instance; controls whether the bots are run on a
+            bounded pool of workers instead of one thread per bot, whether an
+            account's desktop and mobile passes share one browser session, and how
+            stuck or failed bots are dealt with.
+        '''
+        manager_config = manager_config if manager_config else ManagerConfig()
+        if manager_config.shared_session:
+            # Only the email addresses are held in memory, not the accounts or bots.
+            shared_emails = set([account.email for account in mobile_accounts])
+            shared_emails.intersection_update([account.email for account in desktop_accounts])
+            self.num_bots = desktop_accounts.size() + mobile_accounts.size() - len(shared_emails)
+            bots = self._generate_shared_session_bots(desktop_bot_config, desktop_accounts, \
+                mobile_bot_config, mobile_accounts, shared_emails)
+        else:
+            self.num_bots = desktop_accounts.size() + mobile_accounts.size()
+            bots = self._generate_bots(desktop_bot_config, desktop_accounts, mobile_bot_config, \
+                mobile_accounts)
+        self.bots = self._subscribe_to_bots(bots)
+
+        # Bots that are running on threads of their own (when there is no scheduler)
+        self.bot_list = []
+        # Guards reports and num_finished_bots, which hold the results of the bots
+        # that have finished running (and may no longer be referenced).
+        self.lock = Lock()
+        self.reports = []
+        self.num_finished_bots = 0
+        self.progress = ProgressPublisher()
+
+        # A failed bot's account is retried on a new bot up to max_requeues times.
+        self.max_requeues = manager_config.max_requeues
+        self.watchdog = None
+        if manager_config.watchdog_timeout:
+            self.watchdog = Watchdog(manager_config.watchdog_timeout)
+
+        self.scheduler = None
+        if manager_config.max_workers or manager_config.async_engine:
+            max_workers = manager_config.max_workers if manager_config.max_workers else self.num_bots
+            max_workers = max(min(max_workers, self.num_bots), 1)
+            max_workers_per_device_class = {
+                DesktopBingRewardsBot.device_class: manager_config.max_desktop_workers,
+                MobileBingRewardsBot.device_class: manager_config.max_mobile_workers
+            }
+            if manager_config.async_engine:
+                self.scheduler = AsyncBotEngine(self.bots, max_workers, \
+                    max_workers_per_device_class, manager_config.phase_timeout)
+            else:
+                self.scheduler = BotScheduler(self.bots, max_workers, max_workers_per_device_class)
+
+    def _generate_bots(self, desktop_bot_config, desktop_accounts, mobile_bot_config, mobile_accounts):
+        '''
+            @description
+            Generator over one desktop bot per desktop account and one mobile bot per
+            mobile account; desktop and mobile bots are interleaved, so that a worker
+            pool with per-device-class limits always has a bot of either class at hand.
+        '''
+        for (desktop_account, mobile_account) in zip_longest(desktop_accounts, mobile_accounts):
+            if desktop_account:
+                yield DesktopBingRewardsBot(desktop_bot_config, desktop_account)
+            if mobile_account:
+                yield MobileBingRewardsBot(mobile_bot_config, mobile_account)
+
+    def _generate_shared_session_bots(self, desktop_bot_config, desktop_accounts, mobile_bot_config, \
+            mobile_accounts, shared_emails):
+        '''
+            @description
+            Generator over one SharedSessionBingRewardsBot per account whose email address
+            is in shared_emails (i.e., appears in both desktop_accounts and mobile_accounts),
+            plus a regular desktop or mobile bot for each account that only appears in
+            one of them.
+        '''
+        for account in desktop_accounts:
+            if account.email in shared_emails:
+                yield SharedSessionBingRewardsBot(desktop_bot_config, mobile_bot_config, account)
+            else:
+                yield DesktopBingRewardsBot(desktop_bot_config, account)
+        for account in mobile_accounts:
+            if account.email not in shared_emails:
+                yield MobileBingRewardsBot(mobile_bot_config, account)
+
+    def _subscribe_to_bots(self, bots):
+        for bot in bots:
+            bot.add_progress_callback(self._on_bot_progress)
+            yield bot
+
+    def _on_bot_progress(self, bot, kind, phase_name):
+        if self.watchdog and kind == PHASE_STARTED:
+            self.watchdog.watch(bot)
+        if kind == BOT_FINISHED:
+            if self.watchdog:
+                self.watchdog.unwatch(bot)
+            if bot.failed and bot.attempt < self.max_requeues:
+                # The account is not done yet, so the bot does not count as finished.
+                self._requeue(bot)
+                kind = BOT_REQUEUED
+        with self.lock:
+            if kind == BOT_FINISHED:
+                self.reports.extend(bot.reports)
+                self.num_finished_bots += 1
+            num_finished_bots = self.num_finished_bots
+        self.progress.publish(ProgressEvent(kind, bot.account_credentials.email, bot.device_class, \
+            phase_name, num_finished_bots, self.num_bots))
+        if kind == BOT_FINISHED and num_finished_bots == self.num_bots:
+            if self.watchdog:
+                self.watchdog.stop()
+            self.progress.publish(ProgressEvent(RUN_FINISHED, num_finished_bots = num_finished_bots, \
+                num_bots = self.num_bots))
+
+    def _requeue(self, bot):
+        '''
+            @description
+            Queue a new bot for the given failed bot's account; called on the failed
+            bot's thread, before it has finished running.
         '''
-        self.bot_list = [DesktopBingRewardsBot(desktop_bot_config, account) \
-            for account in desktop_accounts.credentials_collection]
-        self.bot_list.extend([MobileBingRewardsBot(mobile_bot_config, account) \
-            for account in mobile_accounts.credentials_collection])
+        retry_bot = bot.copy_for_retry()
+        print('Retrying ' + bot.account_credentials.email + ' (' + bot.device_class + ') on a new bot, ' + \
+            'attempt ' + str(retry_bot.attempt + 1) + '/' + str(self.max_requeues + 1))
+        retry_bot.add_progress_callback(self._on_bot_progress)
+        if self.scheduler:
+            self.scheduler.requeue(retry_bot)
+            return
+        with self.lock:
+            self.bot_list.append(retry_bot)
+        retry_bot.start()
+
+    def add_progress_callback(self, callback):
+        '''
+            @description
+            Subscribe to the progress of the run; subscribe before calling run(), so
+            that no event is missed.
+
+            @param callback
+            Function to call with a progress.ProgressEvent whenever a bot starts,
+            finishes or fails a phase, and whenever a bot finishes; once every bot
+            has finished, a RUN_FINISHED event follows. Called on the bots' threads.
+        '''
+        self.progress.subscribe(callback)
+
+    def get_progress_queue(self):
+        '''
+            @return
+            A queue.Queue that receives every progress.ProgressEvent from now on (see
+            add_progress_callback); consumers can block on it instead of polling.
+        '''
+        return self.progress.subscribe_queue()
 
     def run(self):
         '''
             @description
-            Run the desktop and/or mobile Bing Rewards bots in bot_list.
+            Run the desktop and/or mobile Bing Rewards bots.
         '''
-        for bot in self.bot_list:
+        if not self.num_bots:
+            self.progress.publish(ProgressEvent(RUN_FINISHED))
+        elif self.watchdog:
+            self.watchdog.start()
+        if self.scheduler:
+            self.scheduler.start()
+            return
+        self.bot_list = list(self.bots)
+        # Requeued bots are appended to bot_list (and started) as they come up.
+        for bot in list(self.bot_list):
             bot.start()
 
+    def wait(self):
+        '''
+            @description
+            Block until every bot has finished executing.
+        '''
+        if self.scheduler:
+            self.scheduler.join()
+            return
+        # Requeued bots are appended while we wait, before the bot that they replace
+        # has finished; so, they are joined as well.
+        for bot in self.bot_list:
+            bot.join()
+
+    def get_report(self):
+        '''
+            @return
+            A list with the point reports of every bot that has gotten far enough to
+            produce one (see AbstractAccountManager.get_report).
+        '''
+        with self.lock:
+            return list(self.reports)
+
     def count_finished_bots(self):
         '''
             @return
             The number of Bing Rewards bots that have finished executing.
         '''
-        return sum([bot.done for bot in self.bot_list])
+        with self.lock:
+            return self.num_finished_bots
 
     def get_percent_completed(self):
         '''
             @return
-            The percentage of bots in bot_list that have finished executing.
+            The percentage of bots that have finished executing.
         '''
-        return 100 * (self.count_finished_bots() / len(self.bot_list))
\ No newline at end of file
+        if not self.num_bots:
+            return 100
+        return 100 * (self.count_finished_bots() / self.num_bots)
\ No newline at end of file
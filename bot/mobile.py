@@ -3,6 +3,8 @@ from account_manager.mobile import MobileAccountManager
 from desktop import DesktopBingRewardsBot
 
 class MobileBingRewardsBot(DesktopBingRewardsBot):
+    device_class = 'Mobile'
+
     def __init__(self, bot_config, account_credentials):
         super().__init__(bot_config, account_credentials)
 
@@ -12,5 +14,7 @@ class MobileBingRewardsBot(DesktopBingRewardsBot):
             The only difference in this method-override is that we are using mobile,
             not desktop, resources. 
         '''
-        self.browser = Browser(self.browser_type, mobile = True)
-        self.account_manager = MobileAccountManager(self.browser, self.account_credentials)
\ No newline at end of file
+        self.browser = Browser(self.browser_type, mobile = True, driver_pool = self.driver_pool, \
+            pacing = self.pacing, command_counter = self.command_counter, resource_filter = self.resource_filter)
+        self.account_manager = MobileAccountManager(self.browser, self.account_credentials, self.profiler, \
+            self.max_concurrent_offers)
\ No newline at end of file
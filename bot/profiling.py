@@ -0,0 +1,146 @@
+import argparse
+import collections
+import contextlib
+import json
+import math
+import threading
+import time
+
+class Profiler:
+    def __init__(self, filename = None):
+        '''
+            @description
+            Records timing spans (driver start, sign in, each search, stats scrapes,
+            offers, sign out, etc.) as JSON lines, one object per span:
+            {"phase": ..., "start": ..., "duration": ..., "status": "ok"/"error", ...}
+
+            @param filename
+            (Optional) Name of the JSON-lines file to append spans to; if not
+            specified, spans are timed but not recorded anywhere.
+        '''
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.file_ptr = open(filename, 'a') if filename else None
+
+    def record(self, phase, start, duration, status = 'ok', **fields):
+        if not self.file_ptr:
+            return
+        span = {'phase': phase, 'start': start, 'duration': duration, 'status': status}
+        span.update(fields)
+        line = json.dumps(span, sort_keys = True)
+        with self.lock:
+            self.file_ptr.write(line + '\n')
+            self.file_ptr.flush()
+
+    @contextlib.contextmanager
+    def span(self, phase, **fields):
+        '''
+            @description
+            Context manager that times the enclosed block and records it as a span
+            of the given phase, along with the given extra fields (e.g., email).
+        '''
+        start = time.time()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self.record(phase, start, time.time() - start, status, **fields)
+
+    def close(self):
+        with self.lock:
+            if self.file_ptr:
+                self.file_ptr.close()
+            self.file_ptr = None
+
+class WebDriverCommandCounter:
+    def __init__(self):
+        '''
+            @description
+            Counts every command (HTTP round-trip) that Browser objects send to their
+            webdrivers, by command name; see Browser's command_counter parameter.
+        '''
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    def attach(self, driver):
+        '''
+            @description
+            Route the given Selenium webdriver's commands through this counter.
+            Every command that a webdriver issues goes through its execute method.
+        '''
+        if not driver or getattr(driver, '_command_counter', None) is self:
+            return
+        execute = driver.execute
+        def counting_execute(driver_command, params = None):
+            with self.lock:
+                self.counts[driver_command] += 1
+            return execute(driver_command, params)
+        driver.execute = counting_execute
+        driver._command_counter = self
+
+    def get_counts(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def get_total(self):
+        with self.lock:
+            return sum(self.counts.values())
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    rank = int(math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+def summarize(filename):
+    '''
+        @param filename
+        Name of a JSON-lines file written by a Profiler.
+
+        @return
+        A dictionary mapping each phase to its span count, total, p50 and p95
+        durations (in seconds), and number of errors.
+    '''
+    durations = collections.defaultdict(list)
+    errors = collections.Counter()
+    with open(filename, 'r') as spans_file_ptr:
+        for line in spans_file_ptr:
+            if not line.strip():
+                continue
+            span = json.loads(line)
+            durations[span['phase']].append(span['duration'])
+            if span['status'] != 'ok':
+                errors[span['phase']] += 1
+
+    summary = {}
+    for (phase, phase_durations) in durations.items():
+        phase_durations.sort()
+        summary[phase] = {
+            'count': len(phase_durations),
+            'total': sum(phase_durations),
+            'p50': _percentile(phase_durations, 50),
+            'p95': _percentile(phase_durations, 95),
+            'errors': errors[phase]
+        }
+    return summary
+
+def format_summary(summary):
+    '''
+        @return
+        The given summary (see summarize) as a table, slowest phases (by total) first.
+    '''
+    lines = ['%-20s %8s %10s %10s %10s %7s' % ('Phase', 'Count', 'Total (s)', 'p50 (s)', 'p95 (s)', 'Errors')]
+    for (phase, stats) in sorted(summary.items(), key = lambda item: -item[1]['total']):
+        lines.append('%-20s %8d %10.2f %10.3f %10.3f %7d' % (phase, stats['count'], stats['total'], \
+            stats['p50'], stats['p95'], stats['errors']))
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Summarize Bing Rewards Bot timing spans.')
+    parser.add_argument('filename', help = 'JSON-lines file written by driver.py --profile.')
+    print(format_summary(summarize(parser.parse_args().filename)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+
+# Kinds of progress events
+PHASE_STARTED = 'phase_started'
+PHASE_FINISHED = 'phase_finished'
+PHASE_FAILED = 'phase_failed'
+BOT_FINISHED = 'bot_finished'
+# A bot has failed, and its account has been queued again on a new bot.
+BOT_REQUEUED = 'bot_requeued'
+RUN_FINISHED = 'run_finished'
+
+class ProgressEvent:
+    def __init__(self, kind, email = None, device_class = None, phase = None, num_finished_bots = 0, \
+            num_bots = 0):
+        '''
+            @param kind
+            One of PHASE_STARTED, PHASE_FINISHED, PHASE_FAILED, BOT_FINISHED, BOT_REQUEUED
+            and RUN_FINISHED.
+
+            @param email, device_class
+            Account and device class of the bot that the event is about (None for
+            RUN_FINISHED).
+
+            @param phase
+            Name of the phase that the event is about (see DesktopBingRewardsBot.get_phases),
+            or None for BOT_FINISHED, BOT_REQUEUED and RUN_FINISHED.
+
+            @param num_finished_bots, num_bots
+            Number of bots that had finished running when the event was published,
+            out of the total number of bots in the run.
+        '''
+        self.kind = kind
+        self.email = email
+        self.device_class = device_class
+        self.phase = phase
+        self.num_finished_bots = num_finished_bots
+        self.num_bots = num_bots
+        self.time = time.time()
+
+    @property
+    def percent_completed(self):
+        if not self.num_bots:
+            return 100
+        return 100 * self.num_finished_bots / self.num_bots
+
+    def __str__(self):
+        if self.kind == RUN_FINISHED:
+            return 'Finished all ' + str(self.num_bots) + ' bots'
+        description = '[%3d%%] %s (%s)' % (self.percent_completed, self.email, self.device_class)
+        if self.kind == BOT_FINISHED:
+            return description + ' finished'
+        if self.kind == BOT_REQUEUED:
+            return description + ' requeued'
+        return description + ' ' + self.phase + ' ' + self.kind.split('_')[1]
+
+class ProgressPublisher:
+    def __init__(self):
+        '''
+            @description
+            Fans progress events out to subscribers, either as callbacks or as queues
+            that a consumer can block on (so that it uses no CPU between events).
+        '''
+        self.lock = threading.Lock()
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        '''
+            @param callback
+            Function to call with every ProgressEvent; called on the thread that
+            publishes the event (i.e., a bot's worker thread), so it should be quick.
+        '''
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def subscribe_queue(self):
+        '''
+            @return
+            A queue.Queue that receives every ProgressEvent published from now on.
+        '''
+        event_queue = queue.Queue()
+        self.subscribe(event_queue.put)
+        return event_queue
+
+    def publish(self, event):
+        with self.lock:
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            callback(event)
\ No newline at end of file
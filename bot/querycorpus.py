@@ -0,0 +1,196 @@
+import argparse
+import collections
+import mmap
+import os
+import random
+import struct
+import tempfile
+
+'''
+    Query corpus file format (all integers are little-endian, unsigned 32-bit):
+    - Header: magic (4 bytes), version, number of terms N
+    - Offsets: N + 1 offsets into the term blob; term i spans [offset i, offset i + 1)
+    - Term blob: UTF-8 encoded terms, back to back
+'''
+_MAGIC = b'BRQC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_OFFSET = struct.Struct('<I')
+
+DEFAULT_CORPUS_SIZE = 20000
+
+def build_corpus(filename, terms):
+    '''
+        @description
+        Write the given search terms to a corpus file, dropping blank terms and
+        (case-insensitive) duplicates. Raises ValueError (and writes nothing) if
+        there is not a single term left.
+
+        @param filename
+        Name of the corpus file to (over)write.
+
+        @param terms
+        Iterable of search term strings.
+
+        @return
+        The number of terms written.
+    '''
+    seen_terms = set()
+    encoded_terms = []
+    for term in terms:
+        term = term.strip()
+        if term and term.lower() not in seen_terms:
+            seen_terms.add(term.lower())
+            encoded_terms.append(term.encode('utf-8'))
+    if not encoded_terms:
+        raise ValueError('No search terms to build query corpus ' + filename + ' from.')
+
+    offsets = [0]
+    for encoded_term in encoded_terms:
+        offsets.append(offsets[-1] + len(encoded_term))
+
+    # Readers never see a half-written corpus, and processes that build the same
+    # corpus at the same time do not write to the same temporary file.
+    (tmp_fd, tmp_filename) = tempfile.mkstemp(prefix = os.path.basename(filename) + '.', suffix = '.tmp', \
+        dir = os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(tmp_fd, 'wb') as corpus_file_ptr:
+            corpus_file_ptr.write(_HEADER.pack(_MAGIC, _VERSION, len(encoded_terms)))
+            corpus_file_ptr.write(b''.join([_OFFSET.pack(offset) for offset in offsets]))
+            corpus_file_ptr.write(b''.join(encoded_terms))
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return len(encoded_terms)
+
+def generate_corpus_terms(size = DEFAULT_CORPUS_SIZE):
+    '''
+        @return
+        Up to the given number of random words from randomwordgenerator; only meant
+        to be used once, to build a corpus file.
+    '''
+    from randomwordgenerator import randomwordgenerator
+    return randomwordgenerator.generate_random_words(size)
+
+class QueryCorpus:
+    def __init__(self, filename):
+        '''
+            @description
+            Read-only, memory-mapped view of a corpus file (see build_corpus).
+            Terms are decoded on demand, so loading a corpus does not depend on its
+            size, and a corpus can be shared by every bot (and thread) in a process.
+            Raises ValueError if the file is not a corpus file, or has no terms.
+
+            @param filename
+            Name of the corpus file.
+        '''
+        with open(filename, 'rb') as corpus_file_ptr:
+            self.data = mmap.mmap(corpus_file_ptr.fileno(), 0, access = mmap.ACCESS_READ)
+        (magic, version, self.num_terms) = _HEADER.unpack_from(self.data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.data.close()
+            raise ValueError(filename + ' is not a query corpus file.')
+        if self.num_terms == 0:
+            self.data.close()
+            raise ValueError('Query corpus ' + filename + ' has no terms.')
+        self.offsets_start = _HEADER.size
+        self.terms_start = self.offsets_start + (self.num_terms + 1) * _OFFSET.size
+
+    def __len__(self):
+        return self.num_terms
+
+    def get_term(self, index):
+        '''
+            @return
+            The term at the given index (0 <= index < len(self)).
+        '''
+        (start, ) = _OFFSET.unpack_from(self.data, self.offsets_start + index * _OFFSET.size)
+        (end, ) = _OFFSET.unpack_from(self.data, self.offsets_start + (index + 1) * _OFFSET.size)
+        return self.data[self.terms_start + start:self.terms_start + end].decode('utf-8')
+
+    def close(self):
+        self.data.close()
+
+def load_corpus(filename, size = DEFAULT_CORPUS_SIZE):
+    '''
+        @description
+        Load the given corpus file; if it does not exist yet, build it first from
+        randomwordgenerator (a one-time cost).
+
+        @return
+        A QueryCorpus object.
+    '''
+    if not os.path.exists(filename):
+        build_corpus(filename, generate_corpus_terms(size))
+    return QueryCorpus(filename)
+
+class QuerySampler:
+    def __init__(self, corpus, window_size = 1000, words_per_query = (1, 2), rng = None):
+        '''
+            @description
+            Draws random search queries from a QueryCorpus for one account, without
+            reusing any term that has been used within the last window_size terms.
+
+            @param corpus
+            (Required) QueryCorpus to draw terms from.
+
+            @param window_size
+            (Optional) Number of most recently used terms that cannot be drawn again;
+            capped at half the corpus size, so that sampling stays fast.
+
+            @param words_per_query
+            (Optional) (Minimum, maximum) number of terms per query.
+
+            @param rng
+            (Optional) random.Random instance.
+        '''
+        self.corpus = corpus
+        self.window_size = min(window_size, len(corpus) // 2)
+        self.words_per_query = words_per_query
+        self.rng = rng if rng else random.Random()
+
+        self.recent_indices = collections.deque()
+        self.recent_index_set = set()
+
+    def _sample_index(self):
+        index = self.rng.randrange(len(self.corpus))
+        while index in self.recent_index_set:
+            index = self.rng.randrange(len(self.corpus))
+        self.recent_indices.append(index)
+        self.recent_index_set.add(index)
+        if len(self.recent_indices) > self.window_size:
+            self.recent_index_set.discard(self.recent_indices.popleft())
+        return index
+
+    def sample(self):
+        '''
+            @return
+            A new search query string.
+        '''
+        num_words = self.rng.randint(self.words_per_query[0], self.words_per_query[1])
+        return ' '.join([self.corpus.get_term(self._sample_index()) for i in range(0, num_words)])
+
+    def sample_n(self, n):
+        return [self.sample() for i in range(0, n)]
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Build a Bing Rewards Bot query corpus file.')
+    parser.add_argument('-o', '--output', required = True, help = 'Name of the corpus file to write.')
+    parser.add_argument('-i', '--input', required = False, \
+        help = 'Text file with one search term per line; if not specified, random words ' + \
+               'are generated with randomwordgenerator.')
+    parser.add_argument('-n', '--size', type = int, default = DEFAULT_CORPUS_SIZE, \
+        help = 'Number of random words to generate (only used without "-i").')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, 'r') as input_file_ptr:
+            num_terms = build_corpus(args.output, input_file_ptr)
+    else:
+        num_terms = build_corpus(args.output, generate_corpus_terms(args.size))
+    print('Wrote ' + str(num_terms) + ' terms to ' + args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+import collections
+import contextlib
+import json
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Longest single sleep of a waiting acquire (see TokenBucket.acquire)
+_MAX_WAIT_SLICE_SECONDS = 1
+
+# Slack for the rounding error of refilling in slices (0.1 * 10 < 1)
+_TOKEN_EPSILON = 1e-9
+
+class TokenBucket:
+    def __init__(self, rate, burst = None, min_rate = None):
+        '''
+            @description
+            Thread-safe token bucket: tokens are added at the given rate, up to burst
+            tokens, and every request takes one; a request that finds the bucket empty
+            waits exactly as long as it takes for the next token to come in.
+
+            @param rate
+            (Required, float) Number of tokens added per second, i.e., the sustained
+            number of requests per second.
+
+            @param burst
+            (Optional, float) Maximum number of tokens that the bucket holds, i.e., the
+            number of requests that may go out back-to-back after an idle period; by
+            default, 1 (no bursts).
+
+            @param min_rate
+            (Optional, float) Lowest rate that throttle() may slow the bucket down to;
+            by default, a tenth of the given rate.
+        '''
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate else rate / 10
+        self.burst = burst if burst else 1
+        self.lock = threading.Lock()
+
+        # State of the bucket; see _locked_state.
+        self.rate = rate
+        self.tokens = self.burst
+        self.updated = self._now()
+
+    def _now(self):
+        return time.monotonic()
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        '''
+            @description
+            Context manager that holds the bucket's state (rate, tokens, updated)
+            exclusively for the duration of the block.
+        '''
+        with self.lock:
+            yield
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        '''
+            @description
+            Take a token if there is one, without waiting.
+
+            @return
+            0 if a token has been taken; otherwise, the number of seconds until the
+            next token comes in.
+        '''
+        with self._locked_state():
+            now = self._now()
+            self._refill(now)
+            if self.tokens >= 1 - _TOKEN_EPSILON:
+                self.tokens = max(0, self.tokens - 1)
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, on_wait = None):
+        '''
+            @description
+            Take a token, waiting for one to come in if the bucket is empty.
+
+            @param on_wait
+            (Optional) Function (no arguments) to call at least once a second while
+            waiting; e.g., to tell a watchdog that the caller is not stuck.
+
+            @return
+            The number of seconds waited.
+        '''
+        total_wait_time = 0
+        while True:
+            wait_time = self.try_acquire()
+            if not wait_time:
+                return total_wait_time
+            wait_time = min(wait_time, _MAX_WAIT_SLICE_SECONDS)
+            time.sleep(wait_time)
+            total_wait_time += wait_time
+            if on_wait:
+                on_wait()
+
+    def throttle(self, factor = 0.5):
+        '''
+            @description
+            Cut the rate by the given factor (down to min_rate), and empty the bucket;
+            called when the server signals that it is throttling the requests.
+        '''
+        with self._locked_state():
+            self._refill(self._now())
+            self.rate = max(self.min_rate, self.rate * factor)
+            self.tokens = 0
+
+    def recover(self, step):
+        '''
+            @description
+            Raise the rate by the given number of tokens per second (up to the rate that
+            the bucket was created with); called after every request that went through.
+        '''
+        with self._locked_state():
+            if self.rate < self.max_rate:
+                self._refill(self._now())
+                self.rate = min(self.max_rate, self.rate + step)
+
+class FileTokenBucket(TokenBucket):
+    def __init__(self, filename, rate, burst = None, min_rate = None):
+        '''
+            @description
+            TokenBucket whose state lives in the given file, so that every process that
+            opens a FileTokenBucket on the same file shares a single bucket (e.g., the
+            shards launched by driver.py). Every access to the state takes an exclusive
+            lock on the file.
+
+            @param filename
+            Name of the state file; it is created if it does not exist yet, and its
+            state is reused (with the given rate settings) if it does.
+        '''
+        self.filename = filename
+        super().__init__(rate, burst, min_rate)
+        open(filename, 'a').close()
+
+    def _now(self):
+        # Processes do not share a monotonic clock.
+        return time.time()
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        with self.lock, open(self.filename, 'r+') as state_file_ptr:
+            _lock_file(state_file_ptr)
+            try:
+                try:
+                    state = json.loads(state_file_ptr.read())
+                    (self.rate, self.tokens, self.updated) = (state['rate'], state['tokens'], state['updated'])
+                    self.rate = max(self.min_rate, min(self.max_rate, self.rate))
+                except (ValueError, KeyError, TypeError):
+                    # New (or corrupt) file: start with a full bucket.
+                    (self.rate, self.tokens, self.updated) = (self.max_rate, self.burst, self._now())
+                yield
+                state_file_ptr.seek(0)
+                state_file_ptr.truncate()
+                state_file_ptr.write(json.dumps({'rate': self.rate, 'tokens': self.tokens, \
+                    'updated': self.updated}))
+                state_file_ptr.flush()
+            finally:
+                _unlock_file(state_file_ptr)
+
+def _lock_file(file_ptr):
+    if fcntl:
+        fcntl.flock(file_ptr.fileno(), fcntl.LOCK_EX)
+    else:
+        file_ptr.seek(0)
+        msvcrt.locking(file_ptr.fileno(), msvcrt.LK_LOCK, 1)
+        file_ptr.seek(0)
+
+def _unlock_file(file_ptr):
+    if fcntl:
+        fcntl.flock(file_ptr.fileno(), fcntl.LOCK_UN)
+    else:
+        file_ptr.seek(0)
+        msvcrt.locking(file_ptr.fileno(), msvcrt.LK_UNLCK, 1)
+
+class RateLimiter:
+    def __init__(self, global_rate = None, per_account_rate = None, burst = None, filename = None):
+        '''
+            @description
+            Caps the rate of the requests (searches) that every bot sends to Bing, both
+            overall and per account. Bots call acquire() before every request, which
+            waits only as long as the caps require, instead of sleeping for a fixed time.
+            When Bing throttles a request (see record_response), the overall rate is
+            halved, and it then climbs back up by a twentieth of global_rate with every
+            request that goes through; so, the bots settle just under the rate at
+            which Bing starts throttling them.
+
+            @param global_rate
+            (Optional, float) Maximum number of requests per second across all bots;
+            None means no overall cap.
+
+            @param per_account_rate
+            (Optional, float) Maximum number of requests per second of each account;
+            None means no per-account cap.
+
+            @param burst
+            (Optional, float) Number of requests that may go out back-to-back after an
+            idle period, overall; by default, 1.
+
+            @param filename
+            (Optional) If specified, the overall bucket lives in this file, and is
+            shared by every process that uses the same file (see FileTokenBucket).
+        '''
+        self.global_bucket = None
+        if global_rate and filename:
+            self.global_bucket = FileTokenBucket(filename, global_rate, burst)
+        elif global_rate:
+            self.global_bucket = TokenBucket(global_rate, burst)
+        self.recovery_step = global_rate / 20 if global_rate else 0
+        self.per_account_rate = per_account_rate
+
+        # Email -> TokenBucket; every account's bucket is created on its first request.
+        self.account_buckets = {}
+        # Email -> number of bots of the account that have not finished yet (see
+        # add_account); an account's bucket is only dropped once all of them have.
+        self.num_account_bots = collections.Counter()
+        self.lock = threading.Lock()
+
+    def _get_account_bucket(self, email):
+        with self.lock:
+            if email not in self.account_buckets:
+                self.account_buckets[email] = TokenBucket(self.per_account_rate)
+            return self.account_buckets[email]
+
+    def acquire(self, email, on_wait = None):
+        '''
+            @description
+            Wait until the given account may send its next request.
+
+            @param on_wait
+            (Optional) Function (no arguments) to call at least once a second while
+            waiting (see TokenBucket.acquire).
+
+            @return
+            The number of seconds waited.
+        '''
+        wait_time = 0
+        # Take the account's token first, so that an account that has to wait
+        # anyway does not hold up the overall bucket meanwhile.
+        if self.per_account_rate:
+            wait_time += self._get_account_bucket(email).acquire(on_wait)
+        if self.global_bucket:
+            wait_time += self.global_bucket.acquire(on_wait)
+        return wait_time
+
+    def record_response(self, throttled):
+        '''
+            @param throttled
+            True if Bing has answered the latest request with a throttling response
+            (HTTP 429), False otherwise.
+        '''
+        if not self.global_bucket:
+            return
+        if throttled:
+            self.global_bucket.throttle()
+        else:
+            self.global_bucket.recover(self.recovery_step)
+
+    def add_account(self, email):
+        '''
+            @description
+            Register a bot of the given account; every bot that calls acquire() must
+            be registered, and call remove_account once it has finished.
+        '''
+        with self.lock:
+            self.num_account_bots[email] += 1
+
+    def remove_account(self, email):
+        '''
+            @description
+            Unregister a bot of the given account (see add_account), and forget the
+            account's bucket once none of its bots is left, so that e.g. the mobile
+            bot of an account does not get a fresh bucket when its desktop bot finishes.
+        '''
+        with self.lock:
+            self.num_account_bots[email] -= 1
+            if self.num_account_bots[email] <= 0:
+                del self.num_account_bots[email]
+                self.account_buckets.pop(email, None)
@@ -0,0 +1,152 @@
+import collections
+import traceback
+from threading import Condition, Thread
+
+class BotScheduler:
+    def __init__(self, bots, max_workers, max_workers_per_device_class = None):
+        '''
+            @description
+            Run a set of Bing Rewards bots on a fixed number of worker threads,
+            instead of starting one thread per bot.
+
+            @param bots
+            (Required) Iterable of DesktopBingRewardsBot/MobileBingRewardsBot objects.
+            The bots are never started as threads of their own; a worker calls
+            their run() method directly. Bots are only pulled from the iterable as
+            workers free up, so it can be a generator that creates them lazily.
+
+            @param max_workers
+            (Required, int) Maximum number of bots that may run at the same time.
+
+            @param max_workers_per_device_class
+            (Optional) Dictionary mapping a bot's device_class (e.g., 'PC', 'Mobile')
+            to the maximum number of bots of that class that may run at the same time.
+            Device classes without an entry are only bounded by max_workers.
+        '''
+        self.bots = iter(bots)
+        self.max_workers = max_workers
+        self.max_workers_per_device_class = max_workers_per_device_class or {}
+
+        # Bots that have been pulled from self.bots while their device class was
+        # saturated; at most max_workers of them are held at any point in time,
+        # plus the bots that have been requeued (see requeue).
+        self.deferred = collections.deque()
+        self.exhausted = False
+
+        # Guards bots, deferred, exhausted, num_active and num_live_workers.
+        self.condition = Condition()
+        self.num_active = collections.Counter()
+        self.num_live_workers = 0
+
+        self.workers = []
+        self.on_complete_callbacks = []
+        self.on_bot_finished_callbacks = []
+
+    def _has_capacity(self, device_class):
+        limit = self.max_workers_per_device_class.get(device_class, None)
+        return limit is None or self.num_active[device_class] < limit
+
+    def _next_bot(self):
+        '''
+            @description
+            Block until there is a pending bot whose device class has spare capacity,
+            and remove it from the queue. Skipping over bots whose class is saturated
+            (up to max_workers of them) keeps every worker busy when one class has a
+            tighter limit than the other.
+
+            @return
+            The next bot to run, or None if there are no more pending bots.
+        '''
+        with self.condition:
+            while True:
+                for i, bot in enumerate(self.deferred):
+                    if self._has_capacity(bot.device_class):
+                        del self.deferred[i]
+                        self.num_active[bot.device_class] += 1
+                        return bot
+                if not self.exhausted and len(self.deferred) < self.max_workers:
+                    bot = next(self.bots, None)
+                    if bot is None:
+                        self.exhausted = True
+                    else:
+                        self.deferred.append(bot)
+                    continue
+                if self.exhausted and not self.deferred:
+                    return None
+                self.condition.wait()
+
+    def _finish_bot(self, bot):
+        with self.condition:
+            self.num_active[bot.device_class] -= 1
+            self.condition.notify_all()
+        for callback in self.on_bot_finished_callbacks:
+            callback(bot)
+
+    def _work(self):
+        bot = self._next_bot()
+        while bot:
+            try:
+                bot.run()
+            except Exception:
+                # A single broken account must not take the worker down with it.
+                traceback.print_exc()
+            finally:
+                self._finish_bot(bot)
+            bot = self._next_bot()
+
+        with self.condition:
+            self.num_live_workers -= 1
+            last_worker = self.num_live_workers == 0
+            # Wake up workers that are waiting on a saturated device class, so
+            # they can notice that the queue has drained.
+            self.condition.notify_all()
+        if last_worker:
+            for callback in self.on_complete_callbacks:
+                callback()
+
+    def requeue(self, bot):
+        '''
+            @description
+            Queue the given bot to run again. Must be called before the bot that it
+            replaces has finished running (e.g., from one of the bot's progress
+            callbacks), so that a worker is still around to pick it up.
+        '''
+        with self.condition:
+            self.deferred.append(bot)
+            self.condition.notify_all()
+
+    def add_on_complete_callback(self, callback):
+        '''
+            @param callback
+            Function (no arguments) to call once every bot has finished running.
+        '''
+        self.on_complete_callbacks.append(callback)
+
+    def add_on_bot_finished_callback(self, callback):
+        '''
+            @param callback
+            Function to call with each bot once it has finished running.
+        '''
+        self.on_bot_finished_callbacks.append(callback)
+
+    def start(self):
+        '''
+            @description
+            Start the worker threads; returns immediately.
+        '''
+        num_workers = self.max_workers
+        self.num_live_workers = num_workers
+        self.workers = [Thread(target = self._work) for i in range(0, num_workers)]
+        for worker in self.workers:
+            worker.start()
+        if num_workers == 0:
+            for callback in self.on_complete_callbacks:
+                callback()
+
+    def join(self):
+        '''
+            @description
+            Block until every worker thread has exited.
+        '''
+        for worker in self.workers:
+            worker.join()
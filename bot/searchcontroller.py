@@ -0,0 +1,89 @@
+import math
+
+class SearchController:
+    def __init__(self, max_batch_size, initial_points_per_search = 0.5, smoothing = 0.5, \
+            max_batches_without_progress = 3):
+        '''
+            @description
+            Decides how many searches a bot should perform next, based on how many
+            points it still has to accumulate today and on how many points each
+            search has been observed to earn so far.
+
+            @param max_batch_size
+            (Required, int) Maximum number of searches per batch (BotConfig.num_searches).
+
+            @param initial_points_per_search
+            (Optional, float) Points-per-search estimate to start out with; Bing has
+            historically credited 1 point per 2 searches.
+
+            @param smoothing
+            (Optional, float between 0 and 1) Weight of the latest observation when
+            updating the points-per-search estimate.
+
+            @param max_batches_without_progress
+            (Optional, int) Number of consecutive batches that earn no points after
+            which the controller gives up (see is_stalled).
+        '''
+        self.max_batch_size = max_batch_size
+        self.points_per_search = initial_points_per_search
+        self.smoothing = smoothing
+        self.max_batches_without_progress = max_batches_without_progress
+
+        self.num_searches_performed = 0
+        self.num_batches_without_progress = 0
+
+    def is_done(self, stats):
+        '''
+            @param stats
+            Point stats dictionary (see DesktopBingRewardsBot._try_get_point_stats).
+        '''
+        return stats['current'] >= stats['maximum']
+
+    def is_stalled(self):
+        return self.num_batches_without_progress >= self.max_batches_without_progress
+
+    def get_batch_size(self, stats):
+        '''
+            @return
+            The number of searches that should close the gap between the current and
+            maximum points, given the current points-per-search estimate; between 1
+            and max_batch_size.
+        '''
+        remaining_points = stats['maximum'] - stats['current']
+        batch_size = int(math.ceil(remaining_points / self.points_per_search))
+        return max(1, min(self.max_batch_size, batch_size))
+
+    def record(self, num_searches, points_before, points_after):
+        '''
+            @description
+            Update the points-per-search estimate with the outcome of a batch.
+
+            @param num_searches
+            Number of searches in the batch.
+
+            @param points_before, points_after
+            Current device points before and after the batch (-1 if unreadable).
+        '''
+        self.num_searches_performed += num_searches
+        if points_before < 0 or points_after < 0 or num_searches <= 0:
+            return
+
+        points_earned = points_after - points_before
+        if points_earned <= 0:
+            # Either the cap has been reached or Bing has not credited the searches
+            # yet; neither says anything about the rate, so keep the estimate.
+            self.num_batches_without_progress += 1
+            return
+        self.num_batches_without_progress = 0
+        observed_points_per_search = points_earned / num_searches
+        self.points_per_search = self.smoothing * observed_points_per_search + \
+            (1 - self.smoothing) * self.points_per_search
+
+    def get_num_searches_avoided(self):
+        '''
+            @return
+            How many fewer searches were performed than by the old loop, which ran
+            fixed blocks of max_batch_size (BotConfig.num_searches) searches until the cap.
+        '''
+        num_fixed_blocks = int(math.ceil(self.num_searches_performed / self.max_batch_size))
+        return num_fixed_blocks * self.max_batch_size - self.num_searches_performed
@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+from account_manager.credentials.models import AccountCredentialsSource
+
+def parse_shard(shard):
+    '''
+        @param shard
+        A string of the form "i/N", where 0 <= i < N (e.g., "0/4").
+
+        @return
+        A (shard index, number of shards) tuple of ints.
+    '''
+    (index, num_shards) = [int(token) for token in shard.split('/')]
+    if num_shards < 1 or not 0 <= index < num_shards:
+        raise ValueError('Invalid shard "' + shard + '"; expected "i/N" with 0 <= i < N.')
+    return (index, num_shards)
+
+def get_shard_index(email, num_shards):
+    '''
+        @return
+        The shard that the account with the given email address belongs to.
+        The assignment only depends on the email address, so every process and
+        every host computes the same partition for the same number of shards.
+    '''
+    digest = hashlib.md5(email.strip().lower().encode('utf-8')).hexdigest()
+    return int(digest, 16) % num_shards
+
+class ShardCredentialsSource(AccountCredentialsSource):
+    def __init__(self, credentials_source, index, num_shards):
+        '''
+            @description
+            Lazy view of the accounts of one shard of an AccountCredentialsSource.
+            The accounts of the shard are counted once, the first time that the size
+            is needed, since that takes a pass over the whole source.
+        '''
+        self.credentials_source = credentials_source
+        self.index = index
+        self.num_shards = num_shards
+        self.num_credentials = None
+
+    def __iter__(self):
+        for creds in self.credentials_source:
+            if get_shard_index(creds.email, self.num_shards) == self.index:
+                yield creds
+
+    def size(self):
+        if self.num_credentials is None:
+            self.num_credentials = sum(1 for creds in self)
+        return self.num_credentials
+
+def get_shard(credentials_source, index, num_shards):
+    '''
+        @param credentials_source
+        AccountCredentialsSource (e.g., AccountCredentialsCollection) with every account.
+
+        @return
+        An AccountCredentialsSource with only the accounts of the given shard.
+    '''
+    return ShardCredentialsSource(credentials_source, index, num_shards)
+
+def save_report(filename, report):
+    '''
+        @param report
+        List of per-account report dictionaries (see BingRewardsBotManager.get_report).
+    '''
+    with open(filename, 'w') as report_file_ptr:
+        json.dump(report, report_file_ptr, sort_keys = True, indent = 4, separators = (',', ':'))
+
+def merge_reports(filenames):
+    '''
+        @param filenames
+        Names of the JSON report files written by each shard.
+
+        @return
+        A single list with every shard's per-account reports, sorted by email
+        address and device class. Missing report files (e.g., from a shard that
+        crashed) are skipped.
+    '''
+    merged_report = []
+    for filename in filenames:
+        try:
+            with open(filename, 'r') as report_file_ptr:
+                merged_report.extend(json.load(report_file_ptr))
+        except (IOError, ValueError):
+            print('Unable to read shard report ' + filename)
+    return sorted(merged_report, key = lambda report: (report['email'], report['device_class']))
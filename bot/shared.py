@@ -0,0 +1,81 @@
+from account_manager.mobile import MobileAccountManager
+from desktop import DesktopBingRewardsBot
+
+class SharedSessionBingRewardsBot(DesktopBingRewardsBot):
+    # Runs both passes on one browser, so it only counts against the global
+    # worker limit, not against the desktop or mobile limits.
+    device_class = 'Shared'
+
+    def __init__(self, desktop_bot_config, mobile_bot_config, account_credentials):
+        '''
+            @description
+            Bot that accumulates both the desktop and the mobile points of an account
+            with a single browser session: it signs in once as a desktop browser,
+            performs the desktop pass, and then switches the browser's user-agent
+            over to a mobile one for the mobile pass.
+
+            @param desktop_bot_config, mobile_bot_config
+            (Required) BotConfig instances for the desktop and mobile passes;
+            the browser type of desktop_bot_config is used for the shared browser.
+
+            @param account_credentials
+            (Required, bingrewardsaccount.AccountCredentials)
+            Credentials for Bing Rewards account that this thread is
+            accumulating points for.
+        '''
+        super().__init__(desktop_bot_config, account_credentials)
+        self.desktop_bot_config = desktop_bot_config
+        self.mobile_bot_config = mobile_bot_config
+
+        # Vars to be defined later
+        self.desktop_account_manager = None
+        self.mobile_account_manager = None
+
+    def copy_for_retry(self):
+        bot = SharedSessionBingRewardsBot(self.desktop_bot_config, self.mobile_bot_config, \
+            self.account_credentials)
+        bot.attempt = self.attempt + 1
+        return bot
+
+    def initialize(self):
+        '''
+            @description
+            Open a new (desktop) browser window, and create both the desktop
+            and mobile account managers on top of it.
+        '''
+        super().initialize()
+        self.desktop_account_manager = self.account_manager
+        self.mobile_account_manager = MobileAccountManager(self.browser, self.account_credentials, \
+            self.profiler, self.max_concurrent_offers)
+
+    def _use_bot_config(self, bot_config):
+        self.num_searches = bot_config.num_searches
+        self.sleep_time_between_searches = bot_config.sleep_time_between_searches
+
+    def switch_to_mobile(self):
+        self.browser.set_mobile(True)
+        self.account_manager = self.mobile_account_manager
+        self._use_bot_config(self.mobile_bot_config)
+
+    def switch_to_desktop(self):
+        self.browser.set_mobile(False)
+        self.account_manager = self.desktop_account_manager
+        self._use_bot_config(self.desktop_bot_config)
+
+    def get_phases(self):
+        return [
+            ('initialize', self.initialize),
+            ('sign_in', self.sign_in),
+            # Desktop pass
+            ('desktop_searches', self.perform_random_searches),
+            ('desktop_offers', self.view_special_offers),
+            ('desktop_report', self.report),
+            # Mobile pass, on the same signed-in session
+            ('switch_to_mobile', self.switch_to_mobile),
+            ('mobile_searches', self.perform_random_searches),
+            ('mobile_offers', self.view_special_offers),
+            ('mobile_report', self.report),
+            # Only the desktop site has a sign-out flow.
+            ('switch_to_desktop', self.switch_to_desktop),
+            ('sign_out', self.sign_out)
+        ]
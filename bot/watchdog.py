@@ -0,0 +1,84 @@
+import threading
+import time
+
+class Watchdog:
+    def __init__(self, timeout, check_interval = None):
+        '''
+            @description
+            Supervises running bots from a thread of its own. A bot is considered stuck
+            if it has not sent a heartbeat (see DesktopBingRewardsBot.heartbeat) for
+            timeout seconds, or if its driver process has exited under it; either way,
+            the bot is killed (see DesktopBingRewardsBot.kill), which also kills its
+            driver process, so that the WebDriver call that it is blocked on fails
+            right away instead of hanging forever.
+
+            @param timeout
+            (Required, float) Number of seconds without a heartbeat after which a bot
+            is killed.
+
+            @param check_interval
+            (Optional, float) Number of seconds between checks; by default, a tenth of
+            the timeout (but at least 1 second).
+        '''
+        self.timeout = timeout
+        self.check_interval = check_interval if check_interval else max(1, timeout / 10)
+
+        # Guards bots
+        self.lock = threading.Lock()
+        self.bots = set()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watch(self, bot):
+        with self.lock:
+            self.bots.add(bot)
+
+    def unwatch(self, bot):
+        with self.lock:
+            self.bots.discard(bot)
+
+    def _get_failure(self, bot):
+        '''
+            @return
+            Why the given bot should be killed, or None if it is healthy.
+        '''
+        if time.time() - bot.last_heartbeat > self.timeout:
+            return 'no heartbeat for ' + str(self.timeout) + ' seconds'
+        if bot.browser and not bot.browser.is_driver_alive():
+            return 'driver process exited'
+        return None
+
+    def check(self):
+        '''
+            @description
+            Kill every watched bot that is stuck, and stop watching it.
+
+            @return
+            The number of bots killed.
+        '''
+        with self.lock:
+            bots = list(self.bots)
+        num_killed = 0
+        for bot in bots:
+            failure = self._get_failure(bot)
+            if failure:
+                self.unwatch(bot)
+                bot.kill(failure)
+                num_killed += 1
+        return num_killed
+
+    def _run(self):
+        while not self.stopped.wait(self.check_interval):
+            self.check()
+
+    def start(self):
+        '''
+            @description
+            Start checking the watched bots on a background thread; returns immediately.
+        '''
+        # A daemon thread, so that a caller that never stops the watchdog can still exit.
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
\ No newline at end of file
@@ -1,18 +1,158 @@
 import argparse
 import getpass
+import os
+import subprocess
+import sys
 
-from bot.botconfig import PhantomJSBotConfig
+from bot.botconfig import ManagerConfig, PhantomJSBotConfig
 from bot.manager import BingRewardsBotManager
+from bot.account_manager.browser_automation_utils.browsertypes import BrowserType
+from bot.account_manager.browser_automation_utils.pacing import HumanPacing
+from bot.account_manager.browser_automation_utils.webdrivermanager import WebDriverPool
 from bot.account_manager.credentials import sqliteprocessor
+from bot.account_manager.credentials.sessionstore import SessionStore
+from bot.account_manager.base import AbstractAccountManager
+from bot import sharding
+from bot.querycorpus import load_corpus
+from bot import profiling
+from bot.journal import RunJournal
+from bot.progress import BOT_FINISHED
+from bot.ratelimit import RateLimiter
+from bot.account_manager.browser_automation_utils.resourceblocking import ResourceFilter, \
+    DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_HOSTS, DEFAULT_ALLOWED_HOSTS
 
 def get_credentials(filename, email_addresses):
     if not email_addresses:
-        return sqliteprocessor.process_credentials(filename)
+        # Stream the accounts from the database, instead of loading them all up front.
+        return sqliteprocessor.stream_credentials(filename)
     email_address_list = email_addresses.split(',')
     password_list = [getpass.getpass('Password for ' + email + ': ') for email in email_address_list]
     passwords = ','.join(password_list)
     return sqliteprocessor.save_credentials(filename, email_addresses, passwords)
 
+def run_bots(args, creds):
+    '''
+        @description
+        Run a BingRewardsBotManager over the given credentials within this process,
+        and write its report to args.report (if specified).
+    '''
+    pacing = HumanPacing() if args.human_pacing else None
+    query_corpus = load_corpus(args.query_corpus) if args.query_corpus else None
+    session_store = SessionStore(args.session_dir) if args.session_dir else None
+    profiler = profiling.Profiler(args.profile) if args.profile else None
+    journal = RunJournal(args.journal, args.resume) if args.journal else None
+    command_counter = profiling.WebDriverCommandCounter() if args.count_commands else None
+    rate_limiter = None
+    if args.max_search_rate or args.max_account_search_rate:
+        rate_limiter = RateLimiter(args.max_search_rate, args.max_account_search_rate, \
+            filename = args.rate_limit_file)
+    resource_filter = None
+    if args.block_resources:
+        resource_filter = ResourceFilter( \
+            _split_list(args.block_types) if args.block_types else DEFAULT_BLOCKED_TYPES, \
+            DEFAULT_BLOCKED_HOSTS + _split_list(args.block_hosts), \
+            DEFAULT_ALLOWED_HOSTS + _split_list(args.allow_hosts))
+
+    manager_config = ManagerConfig(args.max_workers, args.max_desktop_workers, args.max_mobile_workers, \
+        args.shared_session, args.async_engine, args.phase_timeout, args.watchdog_timeout, args.max_requeues)
+
+    driver_pools = {'Desktop': None, 'Mobile': None}
+    if args.driver_pool_size:
+        driver_pools['Desktop'] = WebDriverPool(BrowserType.PhantomJS, False, args.driver_pool_size, \
+            resource_filter = resource_filter)
+        driver_pools['Mobile'] = WebDriverPool(BrowserType.PhantomJS, True, args.driver_pool_size, \
+            resource_filter = resource_filter)
+
+    # Perform searches.
+    mgr = BingRewardsBotManager( \
+        PhantomJSBotConfig(30, driver_pool = driver_pools['Desktop'], pacing = pacing, \
+            query_corpus = query_corpus, session_store = session_store, profiler = profiler, \
+            command_counter = command_counter, http_search = args.http_search, \
+            http_stats = args.http_stats, journal = journal, rate_limiter = rate_limiter, \
+            phase_budget = args.phase_budget, resource_filter = resource_filter), creds, \
+        PhantomJSBotConfig(20, driver_pool = driver_pools['Mobile'], pacing = pacing, \
+            query_corpus = query_corpus, session_store = session_store, profiler = profiler, \
+            command_counter = command_counter, http_search = args.http_search, \
+            http_stats = args.http_stats, journal = journal, rate_limiter = rate_limiter, \
+            phase_budget = args.phase_budget, resource_filter = resource_filter), creds, \
+        manager_config)
+    if args.progress:
+        mgr.add_progress_callback(lambda event: print(event) if event.kind == BOT_FINISHED else None)
+    mgr.run()
+    mgr.wait()
+
+    if args.driver_pool_size:
+        for device_class, pool in driver_pools.items():
+            print(device_class + ' webdriver pool: ' + str(pool.get_stats()))
+            pool.close()
+    if args.report:
+        sharding.save_report(args.report, mgr.get_report())
+    if journal:
+        journal.close()
+    if profiler:
+        profiler.close()
+        print(profiling.format_summary(profiling.summarize(args.profile)))
+    if command_counter:
+        print('WebDriver commands: ' + str(command_counter.get_total()) + ' ' + \
+            str(command_counter.get_counts()))
+
+def _split_list(value):
+    '''
+        @return
+        The items of the given comma-separated list (an empty list if there is none).
+    '''
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+def _strip_options(argv, options_with_values):
+    '''
+        @return
+        A copy of argv without the given options and their values, however they are
+        spelled: "-n 4", "-n4", "--processes=4", or an abbreviation such as "--proc 4".
+    '''
+    # Let argparse itself recognize every spelling of the options: a parser that
+    # knows only these options leaves everything else to parse_known_args' extras.
+    option_parser = argparse.ArgumentParser(add_help = False)
+    for option in options_with_values:
+        option_parser.add_argument(option)
+    return option_parser.parse_known_args(argv)[1]
+
+def launch_shards(args):
+    '''
+        @description
+        Run args.processes copies of this script, each over its own shard of the
+        accounts, and merge their reports into one.
+    '''
+    worker_argv = _strip_options(sys.argv[1:], \
+        ['-n', '--processes', '-e', '--email_addresses', '--shard', '--report', '--journal'])
+    if args.journal:
+        # Every shard appends to the same journal, so only start it over here.
+        if not args.resume:
+            open(args.journal, 'w').close()
+        worker_argv = [arg for arg in worker_argv if arg != '--resume'] + ['--journal', args.journal, '--resume']
+    if args.max_search_rate:
+        # The overall search rate is shared by every shard, through a single file.
+        rate_limit_file = args.rate_limit_file if args.rate_limit_file else args.filename + '.ratelimit'
+        open(rate_limit_file, 'w').close()
+        worker_argv = _strip_options(worker_argv, ['--rate_limit_file']) + ['--rate_limit_file', rate_limit_file]
+    if args.query_corpus:
+        # Build a missing corpus once, here, instead of in every shard at the same time.
+        load_corpus(args.query_corpus).close()
+    report_filenames = [args.filename + '.shard' + str(i) + '.json' for i in range(0, args.processes)]
+    workers = [subprocess.Popen([sys.executable, os.path.realpath(__file__)] + worker_argv + \
+        ['--shard', str(i) + '/' + str(args.processes), '--report', report_filenames[i]]) \
+        for i in range(0, args.processes)]
+    for worker in workers:
+        worker.wait()
+
+    report = sharding.merge_reports(report_filenames)
+    for filename in report_filenames:
+        if os.path.exists(filename):
+            os.remove(filename)
+    for account_report in report:
+        print(AbstractAccountManager.format_report(account_report))
+    if args.report:
+        sharding.save_report(args.report, report)
+
 def main():
     # Extract target Bing Rewards accounts' credentials from the specified JSON file.
     parser = argparse.ArgumentParser(description = 'Accumulate daily Bing Rewards desktop and mobile points.')
@@ -23,12 +163,108 @@ def main():
         help = 'Comma-separated Bing Rewards accounts\' email addresses;' + \
                 'will be added to credentials JSON file if it already exists' + \
                 'but will create and add to a new JSON file if it doesn\'t.')
+    parser.add_argument('-w', '--max_workers', type = int, required = False, \
+        help = 'Maximum number of bots that may run at the same time; if not ' + \
+               'specified, every bot runs on its own thread.')
+    parser.add_argument('--max_desktop_workers', type = int, required = False, \
+        help = 'Maximum number of desktop bots that may run at the same time ' + \
+               '(only used alongside "-w").')
+    parser.add_argument('--max_mobile_workers', type = int, required = False, \
+        help = 'Maximum number of mobile bots that may run at the same time ' + \
+               '(only used alongside "-w").')
+    parser.add_argument('-s', '--shared_session', action = 'store_true', \
+        help = 'Sign in once per account, and reuse the same browser session for ' + \
+               'its desktop and mobile searches.')
+    parser.add_argument('-p', '--driver_pool_size', type = int, required = False, \
+        help = 'Number of warm webdrivers to keep per device class; if not specified, ' + \
+               'every bot spawns a webdriver of its own.')
+    parser.add_argument('--human_pacing', action = 'store_true', \
+        help = 'Add random, human-like delays after page loads, clicks and typed fields, ' + \
+               'on top of the wait for each page to be ready.')
+    parser.add_argument('-a', '--async_engine', action = 'store_true', \
+        help = 'Run the bots as coroutines on an asyncio event loop, with their blocking ' + \
+               'browser calls on a pool of MAX_WORKERS threads.')
+    parser.add_argument('--phase_timeout', type = float, required = False, \
+        help = 'Number of seconds after which a single phase of a bot (sign in, searches, ' + \
+               'etc.) is abandoned (only used alongside "-a").')
+    parser.add_argument('--phase_budget', type = float, required = False, \
+        help = 'Number of seconds that each phase of a bot may spend retrying before it ' + \
+               'gives up on what it could not get done.')
+    parser.add_argument('--watchdog_timeout', type = float, required = False, \
+        help = 'Number of seconds after which a bot that has made no progress is ' + \
+               'considered stuck, and its webdriver is killed.')
+    parser.add_argument('--max_requeues', type = int, required = False, default = 1, \
+        help = 'Number of times that an account whose bot has failed (or has been ' + \
+               'killed) is retried on a new bot; default 1.')
+    parser.add_argument('--shard', required = False, \
+        help = 'Only run the accounts of shard "i/N" (0 <= i < N); accounts are ' + \
+               'assigned to shards by a hash of their email address.')
+    parser.add_argument('-n', '--processes', type = int, required = False, \
+        help = 'Split the accounts into this many shards, and run each shard in a ' + \
+               'process of its own.')
+    parser.add_argument('--report', required = False, \
+        help = 'Name of a JSON file to write the per-account point report to.')
+    parser.add_argument('-q', '--query_corpus', required = False, \
+        help = 'Name of a query corpus file (see bot/querycorpus.py) to draw search ' + \
+               'queries from; if it does not exist, it is built first.')
+    parser.add_argument('--session_dir', required = False, \
+        help = 'Directory in which to keep each account\'s (encrypted) session cookies ' + \
+               'across runs, so that later runs can skip the login form.')
+    parser.add_argument('--profile', required = False, \
+        help = 'Name of a JSON-lines file to append timing spans (driver start, sign in, ' + \
+               'each search, stats scrapes, etc.) to; a p50/p95 summary per phase is ' + \
+               'printed at the end of the run.')
+    parser.add_argument('--count_commands', action = 'store_true', \
+        help = 'Count every command that the browsers send to their webdrivers, and ' + \
+               'print the counts at the end of the run.')
+    parser.add_argument('--http_search', action = 'store_true', \
+        help = 'Send the searches as plain HTTP requests with each browser\'s cookies and ' + \
+               'user-agent, instead of typing them into the browser.')
+    parser.add_argument('--http_stats', action = 'store_true', \
+        help = 'Read the points by fetching and parsing the dashboard pages with each ' + \
+               'browser\'s cookies and user-agent, instead of scraping them in the browser.')
+    parser.add_argument('--journal', required = False, \
+        help = 'Name of a JSON-lines file in which to record every phase (sign in, searches, ' + \
+               'offers, etc.) that each account completes, along with its last known points.')
+    parser.add_argument('--resume', action = 'store_true', \
+        help = 'Skip the phases that JOURNAL records as completed (e.g., by a run that ' + \
+               'crashed); if "--journal" is not specified, FILENAME.journal is used.')
+    parser.add_argument('--progress', action = 'store_true', \
+        help = 'Print a line with the percentage of bots completed as each bot finishes.')
+    parser.add_argument('--max_search_rate', type = float, required = False, \
+        help = 'Maximum number of searches per second across all bots; the bots wait for ' + \
+               'their turn instead of sleeping between searches.')
+    parser.add_argument('--max_account_search_rate', type = float, required = False, \
+        help = 'Maximum number of searches per second of each account.')
+    parser.add_argument('--rate_limit_file', required = False, \
+        help = 'Name of a file through which to share "--max_search_rate" with other ' + \
+               'processes; "-n" uses FILENAME.ratelimit by default.')
+    parser.add_argument('--block_resources', action = 'store_true', \
+        help = 'Keep the browsers from downloading images, fonts, media, and ad and ' + \
+               'analytics scripts, and report how many requests were blocked.')
+    parser.add_argument('--block_types', required = False, \
+        help = 'Comma-separated resource types (image, font, media, stylesheet) for ' + \
+               '"--block_resources" to block, instead of ' + ','.join(DEFAULT_BLOCKED_TYPES) + '.')
+    parser.add_argument('--block_hosts', required = False, \
+        help = 'Comma-separated hosts for "--block_resources" to block, in addition to the ' + \
+               'default ad and analytics hosts.')
+    parser.add_argument('--allow_hosts', required = False, \
+        help = 'Comma-separated hosts for "--block_resources" never to block, in addition ' + \
+               'to the sign-in and dashboard hosts.')
     args = parser.parse_args()
+    if args.resume and not args.journal:
+        args.journal = args.filename + '.journal'
     creds = get_credentials(args.filename, args.email_addresses)
 
-    # Perform searches.
-    mgr = BingRewardsBotManager(PhantomJSBotConfig(30), creds, PhantomJSBotConfig(20), creds)
-    mgr.run()
+    # A shard always runs its own accounts, even if "-n" slipped through to it;
+    # otherwise, every worker would launch workers of its own.
+    if args.shard:
+        (shard_index, num_shards) = sharding.parse_shard(args.shard)
+        creds = sharding.get_shard(creds, shard_index, num_shards)
+    elif args.processes:
+        launch_shards(args)
+        return
+    run_bots(args, creds)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,11 @@
+import os
+import sys
+
+_THIS_DIR_NAME = os.path.dirname(__file__)
+_THIS_DIR_ABS_PATH = os.path.realpath(_THIS_DIR_NAME)
+
+# The bot modules import the modules of browser_automation_utils (e.g., retrypolicy)
+# by their top-level names.
+_BROWSER_AUTOMATION_UTILS_PATH = os.path.join(_THIS_DIR_ABS_PATH, '..', 'bot', 'account_manager', \
+    'browser_automation_utils')
+sys.path.append(_BROWSER_AUTOMATION_UTILS_PATH)
@@ -0,0 +1,118 @@
+import subprocess
+import sys
+import time
+
+import psutil
+
+from bot.account_manager import base
+from bot.account_manager.browser_automation_utils import browser
+from bot.account_manager.browser_automation_utils.browsertypes import BrowserType
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, window):
+        self.driver.current_window_handle = window
+
+class FakeTabDriver:
+    def __init__(self, never_ready_urls = ()):
+        self.never_ready_urls = set(never_ready_urls)
+        self.urls_by_window = {'main': None}
+        self.current_window_handle = 'main'
+        self.switch_to = FakeSwitchTo(self)
+        self.opened_urls = []
+
+    @property
+    def window_handles(self):
+        # Newest tab first, unlike the order that the tabs were opened in.
+        return sorted(self.urls_by_window, reverse = True)
+
+    def execute_script(self, script, *args):
+        if 'window.open' in script:
+            window = 'tab' + str(len(self.opened_urls))
+            self.urls_by_window[window] = args[0]
+            self.opened_urls.append(args[0])
+            return None
+        if self.urls_by_window[self.current_window_handle] in self.never_ready_urls:
+            return ['loading', 0]
+        return ['complete', 3]
+
+    def close(self):
+        del self.urls_by_window[self.current_window_handle]
+
+class FakeDriverPool:
+    resource_filter = None
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def acquire(self):
+        return self.driver
+
+class FakeService:
+    def __init__(self, process):
+        self.process = process
+
+class FakeProcessDriver:
+    def __init__(self, process):
+        self.service = FakeService(process)
+
+class FakeAccountManager(base.AbstractAccountManager):
+    def __init__(self, browser, links):
+        base.AbstractAccountManager.__init__(self, browser)
+        self.links = links
+
+    def get_special_offer_links(self):
+        return self.links
+
+def _make_browser(driver):
+    return browser.Browser(BrowserType.PhantomJS, driver_pool = FakeDriverPool(driver))
+
+def test_open_in_tabs_matches_urls_to_their_own_tabs(monkeypatch):
+    monkeypatch.setattr(browser, '_WAIT_TIME_SECONDS', 1)
+    urls = ['http://offer' + str(i) for i in range(0, 4)]
+    driver = FakeTabDriver(never_ready_urls = [urls[0]])
+    assert sorted(_make_browser(driver).open_in_tabs(urls, max_tabs = 4)) == urls[1:]
+    assert list(driver.urls_by_window) == ['main']
+    assert driver.current_window_handle == 'main'
+
+def test_open_in_tabs_overlaps_the_idle_waits():
+    urls = ['http://offer' + str(i) for i in range(0, 4)]
+    start_time = time.time()
+    assert sorted(_make_browser(FakeTabDriver()).open_in_tabs(urls, max_tabs = 4)) == urls
+    # One idle wait for the batch, instead of one per tab.
+    assert time.time() - start_time < 2 * browser._NETWORK_IDLE_SECONDS
+
+def test_retry_only_visits_offers_that_did_not_load(monkeypatch):
+    monkeypatch.setattr(browser, '_WAIT_TIME_SECONDS', 1)
+    links = ['http://offer' + str(i) for i in range(0, 3)]
+    account_manager = FakeAccountManager(_make_browser(FakeTabDriver(never_ready_urls = [links[1]])), links)
+    account_manager.accumulate_special_offer_points()
+    assert account_manager.visited_offer_links == set([links[0], links[2]])
+
+    driver = FakeTabDriver()
+    account_manager.browser = _make_browser(driver)
+    account_manager.accumulate_special_offer_points()
+    assert driver.opened_urls == [links[1]]
+    assert account_manager.visited_offer_links == set(links)
+
+def test_kill_driver_kills_the_browser_that_the_driver_started():
+    # Stands in for chromedriver and the browser process that it spawns.
+    browser_script = 'import time; time.sleep(60)'
+    driver_script = 'import subprocess, sys, time; subprocess.Popen([sys.executable, "-c", %r]); time.sleep(60)' \
+        % browser_script
+    driver_process = subprocess.Popen([sys.executable, '-c', driver_script])
+    deadline = time.time() + 10
+    while not psutil.Process(driver_process.pid).children() and time.time() < deadline:
+        time.sleep(0.05)
+    (browser_process,) = psutil.Process(driver_process.pid).children()
+    processes = (browser_process, psutil.Process(driver_process.pid))
+    try:
+        _make_browser(FakeProcessDriver(driver_process)).kill_driver()
+        driver_process.wait(10)
+        browser_process.wait(10)
+    finally:
+        for process in processes:
+            if process.is_running():
+                process.kill()
@@ -0,0 +1,27 @@
+from bot import desktop, journal, progress, ratelimit
+from bot.botconfig import BotConfig
+from bot.account_manager.browser_automation_utils.browsertypes import BrowserType
+from bot.account_manager.credentials.models import AccountCredentials
+from bot.account_manager.credentials.simplesecurity import Password
+
+def test_retry_bot_keeps_the_journal_and_rate_bucket_of_the_failed_bot(tmp_path):
+    run_journal = journal.RunJournal(str(tmp_path / 'run.journal'))
+    rate_limiter = ratelimit.RateLimiter(per_account_rate = 0.5)
+    bot_config = BotConfig(BrowserType.PhantomJS, 10, journal = run_journal, rate_limiter = rate_limiter)
+    failed_bot = desktop.DesktopBingRewardsBot(bot_config, AccountCredentials('alice@x.com', Password('a')))
+    rate_limiter.acquire('alice@x.com')
+    run_journal.record_phase('alice@x.com', failed_bot.device_class, 'searches')
+
+    # What BingRewardsBotManager does for a failed bot
+    retry_bots = []
+    failed_bot.add_progress_callback(lambda bot, kind, phase_name: \
+        retry_bots.append(bot.copy_for_retry()) if kind == progress.BOT_FINISHED else None)
+    failed_bot.finish()
+
+    (retry_bot,) = retry_bots
+    assert 'searches' not in [phase_name for (phase_name, phase) in retry_bot.get_pending_phases()]
+    assert 'alice@x.com' in rate_limiter.account_buckets
+    retry_bot.finish()
+    assert rate_limiter.account_buckets == {}
+    assert run_journal.completed_phases == {}
+    run_journal.close()
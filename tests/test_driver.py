@@ -0,0 +1,36 @@
+import sys
+
+import driver
+
+_SHARD_OPTIONS = ['-n', '--processes', '-e', '--email_addresses', '--shard', '--report', '--journal']
+
+def test_strip_options_removes_separate_values():
+    argv = ['-f', 'creds.db', '-n', '4', '--report', 'report.json', '-w', '2']
+    assert driver._strip_options(argv, _SHARD_OPTIONS) == ['-f', 'creds.db', '-w', '2']
+
+def test_strip_options_removes_attached_values():
+    argv = ['-f', 'creds.db', '-n4', '--processes=4', '--shard=0/2', '--http_search']
+    assert driver._strip_options(argv, _SHARD_OPTIONS) == ['-f', 'creds.db', '--http_search']
+
+def test_strip_options_removes_abbreviations():
+    argv = ['--proc', '4', '-f', 'creds.db', '--rep', 'report.json', '--resume']
+    assert driver._strip_options(argv, _SHARD_OPTIONS) == ['-f', 'creds.db', '--resume']
+
+def test_strip_options_keeps_other_options():
+    argv = ['-f', 'creds.db', '-s', '--max_search_rate', '2', '--rate_limit_file', 'rate']
+    assert driver._strip_options(argv, _SHARD_OPTIONS) == argv
+
+def _run_main(monkeypatch, argv):
+    calls = []
+    monkeypatch.setattr(sys, 'argv', ['driver.py'] + argv)
+    monkeypatch.setattr(driver, 'get_credentials', lambda filename, email_addresses: [])
+    monkeypatch.setattr(driver, 'launch_shards', lambda args: calls.append('launch_shards'))
+    monkeypatch.setattr(driver, 'run_bots', lambda args, creds: calls.append('run_bots'))
+    driver.main()
+    return calls
+
+def test_main_with_processes_launches_shards(monkeypatch):
+    assert _run_main(monkeypatch, ['-f', 'creds.db', '-n', '2']) == ['launch_shards']
+
+def test_main_with_shard_never_launches_shards(monkeypatch):
+    assert _run_main(monkeypatch, ['-f', 'creds.db', '-n4', '--shard', '0/4']) == ['run_bots']
\ No newline at end of file
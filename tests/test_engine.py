@@ -0,0 +1,64 @@
+import threading
+import time
+
+from bot import engine
+
+class FakeBot:
+    def __init__(self, email, phase_seconds = 0, device_class = 'Desktop'):
+        self.device_class = device_class
+        self.account_credentials = type('FakeCredentials', (), {'email': email})()
+        self.phase_seconds = phase_seconds
+        self.driver_killed = threading.Event()
+        self.failed = False
+        self.done = False
+        self.phases_run = []
+
+    def get_pending_phases(self):
+        return [('sign_in', None), ('search', None)]
+
+    def run_phase(self, phase_name, phase):
+        # Blocks like a WebDriver call on a hung driver, until the driver is killed.
+        if self.driver_killed.wait(self.phase_seconds):
+            raise ConnectionError('driver killed')
+        self.phases_run.append(phase_name)
+        self.finished_at = time.time()
+
+    def kill(self, reason):
+        self.driver_killed.set()
+
+    def finish(self):
+        self.done = True
+
+def _run_engine(bots, max_workers, phase_timeout, max_workers_per_device_class = None):
+    bot_engine = engine.AsyncBotEngine(bots, max_workers, max_workers_per_device_class, phase_timeout)
+    bot_engine.start()
+    bot_engine.thread.join(10)
+    assert not bot_engine.thread.is_alive()
+
+def test_phase_timeout_kills_driver_and_frees_the_only_worker():
+    stuck_bot = FakeBot('stuck@x.com', phase_seconds = 60)
+    next_bot = FakeBot('next@x.com')
+    start_time = time.time()
+    _run_engine([stuck_bot, next_bot], max_workers = 1, phase_timeout = 0.2)
+    assert time.time() - start_time < 5
+    assert stuck_bot.driver_killed.is_set()
+    assert stuck_bot.failed and stuck_bot.done
+    assert next_bot.done and next_bot.phases_run == ['sign_in', 'search']
+
+def test_bots_within_timeout_run_every_phase():
+    bots = [FakeBot('bot' + str(i) + '@x.com') for i in range(0, 4)]
+    _run_engine(bots, max_workers = 2, phase_timeout = 5)
+    assert all([fake_bot.done and not fake_bot.failed and fake_bot.phases_run == ['sign_in', 'search'] \
+        for fake_bot in bots])
+
+def test_saturated_device_class_does_not_hold_up_the_other():
+    mobile_bots = [FakeBot('mobile' + str(i) + '@x.com', 0.3, 'Mobile') for i in range(0, 2)]
+    desktop_bots = [FakeBot('desktop' + str(i) + '@x.com') for i in range(0, 2)]
+    _run_engine(mobile_bots + desktop_bots, max_workers = 2, phase_timeout = 5, \
+        max_workers_per_device_class = {'Mobile': 1})
+    assert all([fake_bot.done and fake_bot.phases_run == ['sign_in', 'search'] \
+        for fake_bot in mobile_bots + desktop_bots])
+    # The second worker skips the waiting mobile bot, and runs the desktop bots
+    # alongside the first mobile bot.
+    assert max([fake_bot.finished_at for fake_bot in desktop_bots]) < mobile_bots[0].finished_at
+    assert mobile_bots[0].finished_at < mobile_bots[1].finished_at
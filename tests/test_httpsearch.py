@@ -0,0 +1,37 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bot import httpsearch
+
+class OfferHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('Cookie', '')))
+        self.send_response(200 if self.path != '/missing' else 404)
+        self.send_header('Set-Cookie', 'visited' + self.path.replace('/', '_') + '=1')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+def test_get_pages_fetches_with_copies_of_the_session():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OfferHandler)
+    server.requests = []
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    base_url = 'http://127.0.0.1:' + str(server.server_address[1])
+    client = httpsearch.HttpSearchClient(base_url)
+    client.session.cookies.set('session', 'alice')
+    client.session.headers['User-Agent'] = 'test-agent'
+    try:
+        urls = [base_url + '/offer' + str(i) for i in range(0, 8)] + [base_url + '/missing']
+        assert client.get_pages(urls, max_concurrent = 4) == urls[:-1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        client.close()
+    assert len(server.requests) == len(urls)
+    assert all(['session=alice' in cookie for (path, cookie) in server.requests])
+    # The cookies that the offers set end up in the client's own session.
+    assert client.session.cookies.get('visited_offer0') == '1'
+    assert client.session.cookies.get('visited_missing') == '1'
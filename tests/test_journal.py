@@ -0,0 +1,47 @@
+from bot import journal
+
+def test_resume_loads_completed_phases_and_their_reports(tmp_path):
+    filename = str(tmp_path / 'run.journal')
+    run_journal = journal.RunJournal(filename)
+    run_journal.record_phase('alice@x.com', 'PC', 'searches', stats = {'total_points': 10})
+    run_journal.record_phase('alice@x.com', 'PC', 'report', reports = [{'total_points': 20}])
+    run_journal.close()
+    with open(filename, 'a') as journal_file_ptr:
+        # Cut short by a crash
+        journal_file_ptr.write('{"email": "alice@x.com", "dev')
+
+    resumed_journal = journal.RunJournal(filename, resume = True)
+    assert resumed_journal.get_completed_phases('alice@x.com', 'PC') == \
+        {'searches': [], 'report': [{'total_points': 20}]}
+    assert resumed_journal.get_completed_phases('alice@x.com', 'Mobile') == {}
+    resumed_journal.close()
+
+def test_account_is_forgotten_once_its_last_bot_finishes(tmp_path):
+    run_journal = journal.RunJournal(str(tmp_path / 'run.journal'))
+    # A bot, and the bot that retries the account after it has failed
+    run_journal.add_bot('alice@x.com', 'PC')
+    run_journal.record_phase('alice@x.com', 'PC', 'searches')
+    run_journal.add_bot('alice@x.com', 'PC')
+    run_journal.remove_bot('alice@x.com', 'PC')
+    assert list(run_journal.get_completed_phases('alice@x.com', 'PC')) == ['searches']
+    run_journal.remove_bot('alice@x.com', 'PC')
+    assert run_journal.completed_phases == {}
+    assert run_journal.num_account_bots == {}
+    run_journal.close()
+
+def test_resume_after_a_cut_short_line_keeps_every_phase(tmp_path):
+    filename = str(tmp_path / 'run.journal')
+    run_journal = journal.RunJournal(filename)
+    run_journal.record_phase('alice@x.com', 'PC', 'searches')
+    run_journal.close()
+    with open(filename, 'a') as journal_file_ptr:
+        # Cut short by a crash, and a line without the phase
+        journal_file_ptr.write('{"email": "alice@x.com", "device_class": "PC"}\n{"email": "alice@x.com", "dev')
+
+    resumed_journal = journal.RunJournal(filename, resume = True)
+    resumed_journal.record_phase('alice@x.com', 'PC', 'offers')
+    resumed_journal.close()
+    for i in range(0, 2):
+        resumed_journal = journal.RunJournal(filename, resume = True)
+        assert sorted(resumed_journal.get_completed_phases('alice@x.com', 'PC')) == ['offers', 'searches']
+        resumed_journal.close()
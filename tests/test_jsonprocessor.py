@@ -0,0 +1,104 @@
+import json
+
+from bot.account_manager.credentials import jsonprocessor
+from bot.account_manager.credentials.models import AccountCredentials, AccountCredentialsCollection
+from bot.account_manager.credentials.simplesecurity import Password
+
+def _make_collection(emails):
+    return AccountCredentialsCollection(emails, [Password('password of ' + email) for email in emails])
+
+def _make_line(email):
+    return json.dumps(AccountCredentials(email, Password('password of ' + email)).to_std_structure(), \
+        sort_keys = True) + '\n'
+
+def _make_store(tmp_path, emails):
+    filename = str(tmp_path / 'credentials.json')
+    jsonprocessor.JsonCredentialStore(filename).append(_make_collection(emails))
+    return filename
+
+def test_get_returns_latest_credentials(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com', 'bob@x.com'])
+    store = jsonprocessor.JsonCredentialStore(filename)
+    store.append(_make_collection(['alice@x.com']))
+    assert str(store.get('alice@x.com').password) == 'password of alice@x.com'
+    assert store.get('carol@x.com') is None
+    assert store.count() == 2
+
+def test_index_catches_up_with_appends_of_another_store(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com'])
+    jsonprocessor.JsonCredentialStore(filename).append(_make_collection(['bob@x.com']))
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert [creds.email for creds in store.iter_credentials()] == ['alice@x.com', 'bob@x.com']
+
+def test_index_is_rebuilt_after_hand_edit(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com', 'bob@x.com', 'carol@x.com'])
+    with open(filename, 'r') as json_file_ptr:
+        lines = json_file_ptr.readlines()
+    # Remove the first account, and append another one.
+    with open(filename, 'w') as json_file_ptr:
+        json_file_ptr.write(''.join(lines[1:]) + _make_line('dave@x.com'))
+
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert store.get('alice@x.com') is None
+    assert store.get('bob@x.com').email == 'bob@x.com'
+    assert store.get('dave@x.com').email == 'dave@x.com'
+    assert [creds.email for creds in store.iter_credentials()] == ['bob@x.com', 'carol@x.com', 'dave@x.com']
+    assert store.count() == 3
+
+def test_index_is_rebuilt_after_same_size_rewrite(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com', 'bob@x.com'])
+    with open(filename, 'r') as json_file_ptr:
+        lines = json_file_ptr.readlines()
+    with open(filename, 'w') as json_file_ptr:
+        json_file_ptr.write(lines[1] + lines[0])
+
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert [creds.email for creds in store.iter_credentials()] == ['bob@x.com', 'alice@x.com']
+
+def test_get_rebuilds_index_on_mismatch(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com', 'bob@x.com'])
+    store = jsonprocessor.JsonCredentialStore(filename)
+    # An index loaded before the file was edited
+    store._load_index()
+    with open(filename, 'r') as json_file_ptr:
+        lines = json_file_ptr.readlines()
+    with open(filename, 'w') as json_file_ptr:
+        json_file_ptr.write(lines[1] + lines[0])
+    assert store.get('alice@x.com').email == 'alice@x.com'
+    assert store.get('bob@x.com').email == 'bob@x.com'
+
+def test_index_is_rebuilt_after_truncation(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com', 'bob@x.com'])
+    with open(filename, 'w') as json_file_ptr:
+        json_file_ptr.write(_make_line('carol@x.com'))
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert [creds.email for creds in store.iter_credentials()] == ['carol@x.com']
+    assert store.get('alice@x.com') is None
+
+def test_reading_a_missing_file_creates_nothing(tmp_path):
+    filename = str(tmp_path / 'credentials.json')
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert list(store.iter_credentials()) == []
+    assert store.get('alice@x.com') is None
+    assert store.count() == 0
+    assert list(tmp_path.iterdir()) == []
+
+def test_migrate_legacy_format(tmp_path):
+    filename = str(tmp_path / 'credentials.json')
+    records = [AccountCredentials(email, Password('password of ' + email)).to_std_structure() \
+        for email in ['alice@x.com', 'bob@x.com']]
+    # Older versions appended one JSON array per save.
+    with open(filename, 'w') as json_file_ptr:
+        json_file_ptr.write(json.dumps(records[:1]) + json.dumps(records[1:]))
+
+    assert jsonprocessor.migrate_credentials(filename)
+    assert not jsonprocessor.migrate_credentials(filename)
+    store = jsonprocessor.JsonCredentialStore(filename)
+    assert [creds.email for creds in store.iter_credentials()] == ['alice@x.com', 'bob@x.com']
+    assert str(store.get('bob@x.com').password) == 'password of bob@x.com'
+    assert sorted([path.name for path in tmp_path.iterdir()]) == ['credentials.json', 'credentials.json.index']
+def test_save_returns_only_the_saved_credentials(tmp_path):
+    filename = _make_store(tmp_path, ['alice@x.com'])
+    saved = jsonprocessor.save_credentials(filename, 'bob@x.com, carol@x.com', 'b,c')
+    assert [creds.email for creds in saved] == ['bob@x.com', 'carol@x.com']
+    assert jsonprocessor.JsonCredentialStore(filename).count() == 3
@@ -0,0 +1,41 @@
+import os
+import random
+
+import pytest
+
+from bot import querycorpus
+
+def _build(tmp_path, terms):
+    filename = str(tmp_path / 'queries.corpus')
+    querycorpus.build_corpus(filename, terms)
+    return filename
+
+def test_build_and_load(tmp_path):
+    filename = _build(tmp_path, ['apple', ' Apple ', '', 'banana', 'crème brûlée'])
+    corpus = querycorpus.load_corpus(filename)
+    assert [corpus.get_term(i) for i in range(0, len(corpus))] == ['apple', 'banana', 'crème brûlée']
+    corpus.close()
+    assert os.listdir(str(tmp_path)) == ['queries.corpus']
+
+def test_build_rejects_empty_corpus(tmp_path):
+    filename = str(tmp_path / 'queries.corpus')
+    with pytest.raises(ValueError):
+        querycorpus.build_corpus(filename, ['', '   '])
+    assert os.listdir(str(tmp_path)) == []
+
+def test_load_rejects_empty_corpus(tmp_path):
+    filename = str(tmp_path / 'queries.corpus')
+    # A corpus file written before empty corpora were rejected
+    with open(filename, 'wb') as corpus_file_ptr:
+        corpus_file_ptr.write(querycorpus._HEADER.pack(querycorpus._MAGIC, querycorpus._VERSION, 0))
+        corpus_file_ptr.write(querycorpus._OFFSET.pack(0))
+    with pytest.raises(ValueError):
+        querycorpus.load_corpus(filename)
+
+def test_sampler_does_not_reuse_recent_terms(tmp_path):
+    corpus = querycorpus.load_corpus(_build(tmp_path, ['term' + str(i) for i in range(0, 10)]))
+    sampler = querycorpus.QuerySampler(corpus, window_size = 5, words_per_query = (1, 1), rng = random.Random(0))
+    queries = sampler.sample_n(200)
+    for i in range(0, len(queries)):
+        assert queries[i] not in queries[max(0, i - 5):i]
+    corpus.close()
\ No newline at end of file
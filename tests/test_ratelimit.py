@@ -0,0 +1,73 @@
+from bot import ratelimit
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def _use_fake_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, 'sleep', clock.sleep)
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: clock.now)
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: clock.now)
+    return clock
+
+def test_bucket_allows_burst_then_rate(monkeypatch):
+    clock = _use_fake_clock(monkeypatch)
+    bucket = ratelimit.TokenBucket(2, burst = 3)
+    assert [bucket.acquire() for i in range(0, 3)] == [0, 0, 0]
+    assert bucket.acquire() == 0.5
+    assert bucket.try_acquire() == 0.5
+    clock.sleep(10)
+    # Refilled up to the burst, not beyond.
+    assert [bucket.try_acquire() for i in range(0, 4)] == [0, 0, 0, 0.5]
+
+def test_acquire_calls_on_wait_at_least_once_a_second(monkeypatch):
+    clock = _use_fake_clock(monkeypatch)
+    bucket = ratelimit.TokenBucket(0.1)
+    bucket.acquire()
+    num_waits = []
+    assert bucket.acquire(on_wait = lambda: num_waits.append(clock.now)) == 10
+    assert len(num_waits) == 10
+    assert max(clock.sleeps) <= 1
+
+def test_throttle_and_recover(monkeypatch):
+    _use_fake_clock(monkeypatch)
+    bucket = ratelimit.TokenBucket(4)
+    bucket.throttle()
+    assert bucket.rate == 2
+    for i in range(0, 10):
+        bucket.throttle()
+    assert bucket.rate == 0.4
+    for i in range(0, 100):
+        bucket.recover(0.5)
+    assert bucket.rate == 4
+
+def test_file_buckets_share_state(monkeypatch, tmp_path):
+    _use_fake_clock(monkeypatch)
+    filename = str(tmp_path / 'rate')
+    (bucket, other_bucket) = (ratelimit.FileTokenBucket(filename, 1), ratelimit.FileTokenBucket(filename, 1))
+    assert bucket.try_acquire() == 0
+    assert other_bucket.try_acquire() == 1
+
+def test_rate_limiter_caps_accounts_separately(monkeypatch):
+    _use_fake_clock(monkeypatch)
+    limiter = ratelimit.RateLimiter(per_account_rate = 0.5)
+    assert limiter.acquire('alice@x.com') == 0
+    assert limiter.acquire('bob@x.com') == 0
+    assert limiter.acquire('alice@x.com') == 2
+def test_account_bucket_outlives_all_but_the_last_bot(monkeypatch):
+    _use_fake_clock(monkeypatch)
+    limiter = ratelimit.RateLimiter(per_account_rate = 0.5)
+    # The account's desktop and mobile bots
+    limiter.add_account('alice@x.com')
+    limiter.add_account('alice@x.com')
+    assert limiter.acquire('alice@x.com') == 0
+    limiter.remove_account('alice@x.com')
+    assert limiter.acquire('alice@x.com') == 2
+    limiter.remove_account('alice@x.com')
+    assert limiter.account_buckets == {}
@@ -0,0 +1,66 @@
+import json
+import re
+
+import pytest
+
+from bot.account_manager.browser_automation_utils import resourceblocking
+
+def _is_blocked_by_chrome(url, patterns):
+    # Network.setBlockedURLs patterns: "*" matches any run of characters.
+    return any([re.match('^' + '.*'.join([re.escape(part) for part in pattern.split('*')]) + '$', url) \
+        for pattern in patterns])
+
+def _log_entry(method, **params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+def test_chrome_patterns_block_types_with_and_without_query_strings():
+    patterns = resourceblocking.ResourceFilter().get_chrome_blocked_urls()
+    assert _is_blocked_by_chrome('https://www.bing.com/th?id=1.png', patterns)
+    assert _is_blocked_by_chrome('https://www.bing.com/logo.png?v=2', patterns)
+    assert _is_blocked_by_chrome('https://www.bing.com/fonts/a.woff2', patterns)
+    assert _is_blocked_by_chrome('https://stats.g.doubleclick.net/collect?v=1', patterns)
+    assert _is_blocked_by_chrome('https://googletagmanager.com/gtm.js', patterns)
+    assert not _is_blocked_by_chrome('https://www.bing.com/search?q=png', patterns)
+    assert not _is_blocked_by_chrome('https://www.bing.com/site.css?v=1', patterns)
+
+def test_chrome_patterns_only_cover_blocked_types():
+    patterns = resourceblocking.ResourceFilter(blocked_types = ['stylesheet'], blocked_hosts = []).get_chrome_blocked_urls()
+    assert _is_blocked_by_chrome('https://www.bing.com/site.css?v=1', patterns)
+    assert not _is_blocked_by_chrome('https://www.bing.com/logo.png', patterns)
+
+def test_phantomjs_filter_maps_extensions_and_sizes():
+    resource_filter = resourceblocking.ResourceFilter(blocked_types = ['image'], blocked_hosts = ['Ads.example.com'])
+    phantomjs_filter = resource_filter.get_phantomjs_filter()
+    assert phantomjs_filter['extension_types']['jpg'] == 'image'
+    assert 'woff' not in phantomjs_filter['extension_types']
+    assert set(phantomjs_filter['typical_sizes']) == set(['image', 'third_party'])
+    assert phantomjs_filter['blocked_hosts'] == ['ads.example.com']
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError):
+        resourceblocking.ResourceFilter(blocked_types = ['video'])
+
+def test_chrome_stats_count_blocked_requests_and_loaded_bytes():
+    resource_filter = resourceblocking.ResourceFilter()
+    resource_stats = resourceblocking.ChromeResourceStats(resource_filter)
+    stats = resource_stats.add_log_entries([
+        _log_entry('Network.loadingFinished', requestId = '1', encodedDataLength = 1000),
+        _log_entry('Network.loadingFailed', requestId = '2', type = 'Image', blockedReason = 'inspector'),
+        _log_entry('Network.loadingFailed', requestId = '3', type = 'Script', blockedReason = 'inspector'),
+        # Not blocked by the filter
+        _log_entry('Network.loadingFailed', requestId = '4', type = 'Image', errorText = 'net::ERR_ABORTED'),
+        _log_entry('Network.requestWillBeSent', requestId = '5')
+    ])
+    typical_sizes = resource_filter.get_typical_sizes()
+    assert stats == {
+        'num_blocked': 2,
+        'estimated_bytes_saved': typical_sizes['image'] + typical_sizes['third_party'],
+        'bytes_loaded': 1000,
+        'num_blocked_by_type': {'image': 1, 'third_party': 1}
+    }
+    # The counts are cumulative, and earlier snapshots do not change.
+    later_stats = resource_stats.add_log_entries([
+        _log_entry('Network.loadingFailed', requestId = '6', type = 'Image', blockedReason = 'inspector')
+    ])
+    assert later_stats['num_blocked_by_type'] == {'image': 2, 'third_party': 1}
+    assert stats['num_blocked_by_type'] == {'image': 1, 'third_party': 1}
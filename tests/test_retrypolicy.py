@@ -0,0 +1,43 @@
+from selenium.common import exceptions as selenium_exceptions
+
+from bot.account_manager.browser_automation_utils import retrypolicy
+from bot.account_manager.browser_automation_utils.retrypolicy import FailureType
+
+def _use_fake_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retrypolicy.time, 'sleep', sleeps.append)
+    return sleeps
+
+def test_classify_failure():
+    assert retrypolicy.classify_failure(retrypolicy.AuthenticationError('rejected')) is FailureType.Auth
+    assert retrypolicy.classify_failure(ConnectionError('driver killed')) is FailureType.DriverDead
+    assert retrypolicy.classify_failure(selenium_exceptions.WebDriverException( \
+        'invalid session id')) is FailureType.DriverDead
+    assert retrypolicy.classify_failure(selenium_exceptions.NoSuchElementException('no #id_rc')) is \
+        FailureType.ElementMissing
+    assert retrypolicy.classify_failure(selenium_exceptions.TimeoutException('slow page')) is \
+        FailureType.Transient
+    assert retrypolicy.is_driver_dead(ConnectionError('driver killed'))
+    assert not retrypolicy.is_driver_dead(selenium_exceptions.TimeoutException('slow page'))
+
+def test_delay_grows_exponentially_up_to_the_ceiling():
+    policy = retrypolicy.RetryPolicy(base_delay = 1, max_delay = 5)
+    for (num_retries, delay) in [(0, 1), (1, 2), (2, 4), (3, 5), (10, 5)]:
+        # Jittered within the upper half of the delay
+        assert all([delay / 2 <= policy.get_delay(num_retries) <= delay for i in range(0, 20)])
+
+def test_attempts_wait_before_every_retry(monkeypatch):
+    sleeps = _use_fake_sleep(monkeypatch)
+    policy = retrypolicy.RetryPolicy(max_attempts = 3, base_delay = 1, max_delay = 5)
+    assert list(policy.attempts()) == [0, 1, 2]
+    assert len(sleeps) == 2
+    assert 0.5 <= sleeps[0] <= 1 and 1 <= sleeps[1] <= 2
+
+def test_attempts_stop_once_the_phase_cannot_afford_the_wait(monkeypatch):
+    sleeps = _use_fake_sleep(monkeypatch)
+    policy = retrypolicy.RetryPolicy(max_attempts = 5, base_delay = 10, max_delay = 10)
+    with retrypolicy.phase_deadline(1):
+        assert list(policy.attempts()) == [0]
+        assert not retrypolicy.is_phase_deadline_expired()
+    assert sleeps == []
+    assert retrypolicy.get_phase_deadline() is None
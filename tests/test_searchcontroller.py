@@ -0,0 +1,42 @@
+from bot import searchcontroller
+
+def _stats(current, maximum = 30):
+    return {'current': current, 'maximum': maximum}
+
+def test_batch_closes_the_gap_at_the_estimated_rate():
+    controller = searchcontroller.SearchController(10)
+    # 0.5 points per search to start with, capped at the maximum batch size
+    assert controller.get_batch_size(_stats(27)) == 6
+    assert controller.get_batch_size(_stats(0)) == 10
+    assert controller.get_batch_size(_stats(29.9)) == 1
+
+def test_estimate_is_a_moving_average_of_observed_rates():
+    controller = searchcontroller.SearchController(10, smoothing = 0.5)
+    controller.record(10, 0, 10)
+    assert controller.points_per_search == 0.75
+    controller.record(6, 10, 16)
+    assert controller.points_per_search == 0.875
+    # Unreadable points say nothing about the rate.
+    controller.record(4, -1, 20)
+    assert controller.points_per_search == 0.875
+    assert controller.num_searches_performed == 20
+
+def test_stops_once_done_or_after_batches_without_progress():
+    controller = searchcontroller.SearchController(10, max_batches_without_progress = 2)
+    assert controller.is_done(_stats(30)) and not controller.is_done(_stats(29))
+    controller.record(10, 5, 5)
+    assert not controller.is_stalled()
+    controller.record(10, 5, 6)
+    controller.record(10, 6, 6)
+    assert not controller.is_stalled()
+    controller.record(10, 6, 6)
+    assert controller.is_stalled()
+    # Batches without progress keep the estimate.
+    assert controller.points_per_search == 0.5 * 0.1 + 0.5 * 0.5
+
+def test_searches_avoided_against_fixed_blocks():
+    controller = searchcontroller.SearchController(10)
+    controller.record(10, 0, 5)
+    controller.record(3, 5, 7)
+    # 13 searches were needed; the old loop would have run 2 blocks of 10.
+    assert controller.get_num_searches_avoided() == 7
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.mockbing import MockBingServer, _SESSION_COOKIE
+from bot.account_manager import base
+
+class FakeBrowser:
+    def __init__(self):
+        self.opened_urls = []
+        self.cookies = []
+
+    def get_user_agent(self):
+        return 'test-agent'
+
+    def open(self, url):
+        self.opened_urls.append(url)
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+        return len(cookies)
+
+    def delete_cookies(self):
+        self.cookies = []
+
+@pytest.fixture
+def mock_bing(monkeypatch):
+    server = MockBingServer()
+    server.start()
+    monkeypatch.setattr(base, 'DASHBOARD_URL', server.url + '/rewards/dashboard')
+    yield server
+    server.stop()
+
+def test_signed_in_session_is_restored_after_one_request(mock_bing):
+    account_manager = base.AbstractAccountManager(FakeBrowser())
+    cookies = [{'name': _SESSION_COOKIE, 'value': 'alice%40x.com', 'path': '/'}]
+    assert account_manager.restore_session(cookies)
+    assert mock_bing.get_stats()['requests'] == 1
+    assert account_manager.browser.cookies == cookies
+    assert account_manager.browser.opened_urls == [base.COOKIE_DOMAIN_URL]
+
+def test_stale_session_never_reaches_the_browser(mock_bing):
+    account_manager = base.AbstractAccountManager(FakeBrowser())
+    assert not account_manager.restore_session([{'name': 'expired', 'value': '1'}])
+    assert mock_bing.get_stats()['requests'] == 1
+    assert account_manager.browser.cookies == []
+    assert account_manager.browser.opened_urls == []
@@ -0,0 +1,49 @@
+import os
+import threading
+
+from bot.account_manager.credentials.sessionstore import SessionStore
+from bot.account_manager.credentials.simplesecurity import decrypt_bytes, encrypt_bytes, generate_key
+
+_COOKIES = [{'name': 'MUID', 'value': '1234', 'domain': '.bing.com', 'path': '/'}]
+
+def test_encrypt_decrypt_round_trip():
+    key = generate_key()
+    token = encrypt_bytes(key, b'session cookies')
+    assert decrypt_bytes(key, token) == b'session cookies'
+    assert decrypt_bytes(generate_key(), token) is None
+    assert decrypt_bytes(key, token[:-4] + 'AAAA') is None
+    assert decrypt_bytes(key, 'not a token') is None
+
+def test_save_and_load(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save('Alice@x.com', _COOKIES)
+    assert SessionStore(str(tmp_path)).load('alice@x.com') == _COOKIES
+    assert store.load('bob@x.com') is None
+    store.delete('alice@x.com')
+    assert store.load('alice@x.com') is None
+
+def _run_threads(target, num_threads = 8):
+    errors = []
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target = run) for i in range(0, num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def test_concurrent_saves_of_one_account(tmp_path):
+    store = SessionStore(str(tmp_path))
+    _run_threads(lambda: [store.save('alice@x.com', _COOKIES) for i in range(0, 20)])
+    assert store.load('alice@x.com') == _COOKIES
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')] == []
+
+def test_concurrent_stores_share_one_key(tmp_path):
+    keys = []
+    _run_threads(lambda: keys.append(SessionStore(str(tmp_path)).key))
+    assert len(set(keys)) == 1 and len(keys[0]) == 32
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')] == []
\ No newline at end of file
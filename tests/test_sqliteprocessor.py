@@ -0,0 +1,50 @@
+import sqlite3
+
+from bot.account_manager.credentials import sqliteprocessor
+from bot.account_manager.credentials.models import AccountCredentialsCollection
+from bot.account_manager.credentials.simplesecurity import Password
+
+def _make_collection(emails, password_prefix = 'password of '):
+    return AccountCredentialsCollection(emails, [Password(password_prefix + email) for email in emails])
+
+def _open_store(tmp_path):
+    return sqliteprocessor.CredentialStore(str(tmp_path / 'credentials.db'))
+
+def test_upsert_updates_existing_email(tmp_path):
+    store = _open_store(tmp_path)
+    store.upsert(_make_collection(['alice@x.com', 'bob@x.com']))
+    store.upsert(_make_collection(['alice@x.com'], 'new password of '))
+    assert store.count() == 2
+    assert str(store.get('alice@x.com').password) == 'new password of alice@x.com'
+    assert [creds.email for creds in store.iter_credentials(batch_size = 1)] == ['alice@x.com', 'bob@x.com']
+    store.close()
+
+def test_get_page(tmp_path):
+    store = _open_store(tmp_path)
+    store.upsert(_make_collection(['alice@x.com', 'bob@x.com', 'carol@x.com']))
+    assert [creds.email for creds in store.get_page(1, page_size = 2)] == ['carol@x.com']
+    store.close()
+
+def test_legacy_duplicates_are_removed_once(tmp_path, capsys):
+    filename = str(tmp_path / 'credentials.db')
+    # A database written before the unique index existed
+    db_conn = sqlite3.connect(filename)
+    db_conn.execute('CREATE TABLE credentials (credentials_id INTEGER PRIMARY KEY AUTOINCREMENT, ' + \
+        'email VARCHAR, password VARCHAR, salt VARCHAR)')
+    for (email, password) in [('alice@x.com', 'old'), ('bob@x.com', 'bob'), ('alice@x.com', 'new')]:
+        password = Password(password)
+        db_conn.execute('INSERT INTO credentials (email, password, salt) VALUES (?, ?, ?)', \
+            (email, password.password, password.salt))
+    db_conn.commit()
+    db_conn.close()
+
+    store = sqliteprocessor.CredentialStore(filename)
+    assert 'Removing 1 superseded duplicate credentials' in capsys.readouterr().out
+    assert store.count() == 2
+    assert str(store.get('alice@x.com').password) == 'new'
+    store.close()
+
+    store = sqliteprocessor.CredentialStore(filename)
+    assert capsys.readouterr().out == ''
+    assert store.count() == 2
+    store.close()
\ No newline at end of file
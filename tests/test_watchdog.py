@@ -0,0 +1,42 @@
+import time
+
+from bot import watchdog
+
+class FakeBrowser:
+    def __init__(self, alive = True):
+        self.alive = alive
+
+    def is_driver_alive(self):
+        return self.alive
+
+class FakeBot:
+    def __init__(self, last_heartbeat, browser = None):
+        self.last_heartbeat = last_heartbeat
+        self.browser = browser
+        self.kill_reasons = []
+
+    def kill(self, reason):
+        self.kill_reasons.append(reason)
+
+def test_check_kills_silent_bots_and_bots_with_dead_drivers():
+    bot_watchdog = watchdog.Watchdog(timeout = 10)
+    healthy_bot = FakeBot(time.time(), FakeBrowser())
+    silent_bot = FakeBot(time.time() - 60)
+    orphaned_bot = FakeBot(time.time(), FakeBrowser(alive = False))
+    for bot in (healthy_bot, silent_bot, orphaned_bot):
+        bot_watchdog.watch(bot)
+    assert bot_watchdog.check() == 2
+    assert healthy_bot.kill_reasons == []
+    assert silent_bot.kill_reasons == ['no heartbeat for 10 seconds']
+    assert orphaned_bot.kill_reasons == ['driver process exited']
+    # Killed bots are no longer watched, so they are only killed once.
+    assert bot_watchdog.check() == 0
+    assert bot_watchdog.bots == set([healthy_bot])
+
+def test_unwatched_bots_are_left_alone():
+    bot_watchdog = watchdog.Watchdog(timeout = 10)
+    bot = FakeBot(time.time() - 60)
+    bot_watchdog.watch(bot)
+    bot_watchdog.unwatch(bot)
+    assert bot_watchdog.check() == 0
+    assert bot.kill_reasons == []
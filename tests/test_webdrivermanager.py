@@ -0,0 +1,61 @@
+from bot.account_manager.browser_automation_utils import browsertypes, webdrivermanager
+from bot.account_manager.browser_automation_utils.browsertypes import BrowserType
+
+class FakeCommandExecutor:
+    def __init__(self):
+        self._commands = {}
+
+class FakeDriver:
+    def __init__(self):
+        self.command_executor = FakeCommandExecutor()
+        self.commands = []
+        self.quit_called = False
+
+    def execute(self, command, params):
+        self.commands.append((command, params))
+        return {'value': None}
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+    def execute_script(self, script):
+        self.commands.append(('execute_script', script))
+
+    def get(self, url):
+        self.commands.append(('get', url))
+
+    def quit(self):
+        self.quit_called = True
+
+def _make_pool(monkeypatch, browser_type):
+    monkeypatch.setattr(webdrivermanager, 'get_selenium_webdriver', \
+        lambda browser_type, mobile = False, resource_filter = None: FakeDriver())
+    return webdrivermanager.WebDriverPool(browser_type)
+
+def test_release_clears_phantomjs_cookies_and_session_storage(monkeypatch):
+    pool = _make_pool(monkeypatch, BrowserType.PhantomJS)
+    driver = pool.acquire()
+    pool.release(driver)
+    for origin in browsertypes._SESSION_ORIGINS:
+        visit_index = driver.commands.index(('get', origin + '/robots.txt'))
+        assert 'localStorage.clear()' in driver.commands[visit_index + 1][1]
+    # Cookies set by those visits go too.
+    clear_cookies_index = [i for (i, (command, params)) in enumerate(driver.commands) \
+        if command == 'executePhantomScript' and 'phantom.clearCookies()' in params['script']][-1]
+    assert clear_cookies_index > visit_index
+    assert pool.acquire() is driver
+
+def test_release_clears_chrome_cookies_of_every_domain(monkeypatch):
+    pool = _make_pool(monkeypatch, BrowserType.Chrome)
+    driver = pool.acquire()
+    pool.release(driver)
+    assert ('Network.clearBrowserCookies', {}) in driver.commands
+    assert pool.acquire() is driver
+
+def test_release_quits_drivers_that_cannot_be_reset(monkeypatch):
+    pool = _make_pool(monkeypatch, BrowserType.Firefox)
+    driver = pool.acquire()
+    pool.release(driver)
+    assert driver.quit_called
+    assert pool.acquire() is not driver
+    assert pool.get_stats()['recycled'] == 1
\ No newline at end of file
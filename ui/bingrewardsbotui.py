@@ -5,6 +5,7 @@ from PyQt5.QtCore import QThread, pyqtSignal
 
 from bot.botconfig import PhantomJSBotConfig
 from bot.manager import BingRewardsBotManager
+from bot.progress import RUN_FINISHED
 from baseui import ProgressBar, SubmitButton
 from credentialsui import CredentialsUI
 
@@ -13,12 +14,19 @@ class BotProgressMonitor(QThread):
 
 	def __init__(self, bot_mgr):
 		super().__init__()
-		self.bot_mgr = bot_mgr
+		# Subscribe right away, so that no progress event is missed once the
+		# BingRewardsBotManager is running.
+		self.progress_queue = bot_mgr.get_progress_queue()
 
 	def run(self):
 		last_observed_progress = 0
-		while last_observed_progress < 100:
-			current_progress = self.bot_mgr.get_percent_completed()
+		while True:
+			# Sleeps until the next progress event, instead of spinning.
+			event = self.progress_queue.get()
+			if event.kind == RUN_FINISHED:
+				self.update_progress.emit(100)
+				return
+			current_progress = int(event.percent_completed)
 			if last_observed_progress != current_progress:
 				self.update_progress.emit(current_progress)
 				last_observed_progress = current_progress
@@ -42,12 +50,12 @@ class BingRewardsBotWidget(QWidget):
 		# Run BingRewardsBotManager.
 		creds = self.credentials_ui.get_credentials_collection()
 		mgr = BingRewardsBotManager(PhantomJSBotConfig(30), creds, PhantomJSBotConfig(20), creds)
-		mgr.run()
 
 		# Monitor the BingRewardsBotManager's progress, and update the progress bar accordingly.
 		self.progress_monitor = BotProgressMonitor(mgr)
 		self.progress_monitor.update_progress.connect(self.update_progress_bar)
 		self.progress_monitor.start()
+		mgr.run()
 
 		self.run_bot_button.disable()
 